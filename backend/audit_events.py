@@ -0,0 +1,145 @@
+"""
+Audit events for RankBeacon SEO Exorcist
+Fan-out of live audit progress to WebSocket subscribers
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+AUDIT_EVENTS_QUEUE_SIZE = int(os.getenv("AUDIT_EVENTS_QUEUE_SIZE", "256"))  # per subscriber
+AUDIT_EVENTS_HISTORY = int(os.getenv("AUDIT_EVENTS_HISTORY", "200"))  # replayed to late subscribers
+
+
+class Subscription:
+    """
+    One subscriber's bounded view of a topic
+
+    A slow consumer never blocks the audit or other subscribers: when the
+    queue is full the oldest event is dropped and counted, and the consumer
+    is told how many it missed before the next event it receives.
+    """
+
+    def __init__(self, topic: str, max_queue: int = AUDIT_EVENTS_QUEUE_SIZE):
+        self.topic = topic
+        self.max_queue = max(1, max_queue)
+        self.dropped = 0
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def push(self, event: Dict[str, Any]):
+        if self._closed:
+            return
+        if len(self._events) >= self.max_queue:
+            self._events.popleft()
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    def close(self):
+        """Stop after the events already queued have been consumed"""
+        self._closed = True
+        self._ready.set()
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        reported_dropped = 0
+        while True:
+            if not self._events:
+                if self._closed:
+                    return
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self.dropped > reported_dropped:
+                yield {"type": "dropped", "count": self.dropped - reported_dropped}
+                reported_dropped = self.dropped
+            yield self._events.popleft()
+
+
+class EventBroadcaster:
+    """Topic-based publish/subscribe with per-topic replay of recent events"""
+
+    def __init__(self, history: int = AUDIT_EVENTS_HISTORY):
+        self.history = history
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, topic: str, max_queue: int = AUDIT_EVENTS_QUEUE_SIZE) -> Subscription:
+        """Subscribe to a topic; events already published for it are replayed first"""
+        subscription = Subscription(topic, max_queue)
+        for event in self._history.get(topic, ()):
+            subscription.push(event)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.topic]
+                self._history.pop(subscription.topic, None)
+
+    def publish(self, topic: str, event: Dict[str, Any]):
+        """Deliver to every subscriber of the topic; free when nobody is listening"""
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        self.stats["published"] += 1
+        self._history.setdefault(topic, deque(maxlen=self.history)).append(event)
+        for subscription in subscribers:
+            subscription.push(event)
+            self.stats["delivered"] += 1
+
+    def end(self, topic: str):
+        """Forget a finished topic's replay history"""
+        self._history.pop(topic, None)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        if topic is not None:
+            return len(self._subscribers.get(topic, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"topics": len(self._subscribers), "subscribers": self.subscriber_count(), **self.stats}
+
+
+broadcaster = EventBroadcaster()
+
+_current_topic: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("audit_topic", default=None)
+
+
+@contextmanager
+def audit_topic(topic: str) -> Iterator[None]:
+    """
+    Route emit() calls made in this context (and tasks started from it) to a topic
+    """
+    token = _current_topic.set(topic)
+    try:
+        yield
+    finally:
+        _current_topic.reset(token)
+
+
+def listening() -> bool:
+    """True if the audit running in this context has subscribers (skip building costly payloads otherwise)"""
+    topic = _current_topic.get()
+    return topic is not None and broadcaster.subscriber_count(topic) > 0
+
+
+def emit(event_type: str, **data: Any):
+    """Publish an event for the audit running in this context, if anyone is subscribed"""
+    topic = _current_topic.get()
+    if topic is not None:
+        broadcaster.publish(topic, {"type": event_type, "ts": round(time.time(), 3), **data})
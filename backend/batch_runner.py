@@ -0,0 +1,107 @@
+"""
+Batch runner for RankBeacon SEO Exorcist
+Bounded, host-fair concurrent execution for batch analysis
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Generic, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+BATCH_PER_HOST_CONCURRENCY = int(os.getenv("BATCH_PER_HOST_CONCURRENCY", "2"))
+
+T = TypeVar("T")
+
+
+@dataclass
+class BatchOutcome(Generic[T]):
+    """One finished item: exactly one of result / error is set"""
+    index: int
+    item: T
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class HostFairPool:
+    """
+    Runs a batch of jobs with a global concurrency cap and a per-host cap
+
+    Jobs are grouped by host and started round-robin across hosts, so a
+    batch with 500 URLs on one site and 5 on another doesn't make the small
+    site wait behind the big one, and no single site gets more than
+    per_host requests at a time.
+    """
+
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY, per_host: int = BATCH_PER_HOST_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+
+    async def run(
+        self,
+        items: Sequence[T],
+        work: Callable[[T], Awaitable[Any]],
+        host_of: Callable[[T], str]
+    ) -> AsyncIterator[BatchOutcome[T]]:
+        """
+        Run work(item) for every item, yielding outcomes as they complete
+
+        Args:
+            items: Batch to process
+            work: Coroutine function run once per item
+            host_of: Groups items for per-host fairness
+
+        Yields:
+            BatchOutcome records in completion order; exceptions raised by
+            work are captured on the outcome rather than propagated
+        """
+        queues: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        for index, item in enumerate(items):
+            queues.setdefault(host_of(item), deque()).append(index)
+
+        active: Dict[str, int] = {host: 0 for host in queues}
+        running: Dict[asyncio.Task, int] = {}
+        hosts: List[str] = list(queues)
+
+        def start_more():
+            # One pass per round: each host with work and spare capacity starts one job
+            while len(running) < self.concurrency:
+                started = False
+                for host in hosts:
+                    if len(running) >= self.concurrency:
+                        break
+                    if queues[host] and active[host] < self.per_host:
+                        index = queues[host].popleft()
+                        active[host] += 1
+                        running[asyncio.ensure_future(work(items[index]))] = index
+                        started = True
+                if not started:
+                    return
+
+        try:
+            start_more()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    active[host_of(items[index])] -= 1
+                    if task.cancelled():
+                        outcome = BatchOutcome(index, items[index], error=asyncio.CancelledError())
+                    elif task.exception() is not None:
+                        outcome = BatchOutcome(index, items[index], error=task.exception())
+                    else:
+                        outcome = BatchOutcome(index, items[index], result=task.result())
+                    start_more()
+                    yield outcome
+        finally:
+            # Consumer went away (client disconnect) - stop the remaining work
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
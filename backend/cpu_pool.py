@@ -0,0 +1,117 @@
+"""
+CPU offload for RankBeacon SEO Exorcist
+Runs HTML parsing and rule evaluation off the event loop
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Defaults (override with environment variables)
+CPU_POOL_MODE = os.getenv("CPU_POOL_MODE", "process")  # process | thread | inline
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Work on inputs smaller than this runs inline - a small parse is cheaper than the round trip
+CPU_POOL_INLINE_BYTES = int(os.getenv("CPU_POOL_INLINE_BYTES", "65536"))
+
+CPU_POOL_MODES = ("process", "thread", "inline")
+
+_executor: Optional[Executor] = None
+_mode = "inline"
+_stats = {"inline": 0, "offloaded": 0, "pool_restarts": 0, "offload_ms": 0.0}
+
+
+def _warm_up() -> int:
+    # Importing the parser and rules in each worker up front keeps the first real call fast
+    import html_features  # noqa: F401
+    import seo_rules  # noqa: F401
+    return os.getpid()
+
+
+def start_cpu_pool(mode: str = CPU_POOL_MODE, workers: int = CPU_POOL_WORKERS):
+    """
+    Create the shared executor
+
+    Process workers are spawned rather than forked so they don't inherit
+    the server's event loop, sockets or SQLite handles. Until this is
+    called (scripts, tests) offload() runs everything inline.
+    """
+    global _executor, _mode
+    if mode not in CPU_POOL_MODES:
+        raise ValueError(f"CPU_POOL_MODE must be one of {', '.join(CPU_POOL_MODES)}, got '{mode}'")
+    if _executor is not None:
+        return
+
+    workers = max(1, workers)
+    if mode == "process":
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        for _ in range(workers):
+            _executor.submit(_warm_up)
+    elif mode == "thread":
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu-pool")
+    _mode = mode
+    logger.info(f"🧮 CPU offload: {mode}" + (f" with {workers} workers" if _executor else ""))
+
+
+def close_cpu_pool():
+    """Shut the executor down (lifespan shutdown)"""
+    global _executor, _mode
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _mode = "inline"
+
+
+async def offload(func: Callable[..., T], *args: Any, size: int = 0) -> T:
+    """
+    Run a CPU-bound function without blocking the event loop
+
+    Args:
+        func: Module-level function (process workers must be able to pickle it)
+        args: Arguments; keep them compact - they are pickled to the worker
+        size: Input size in bytes; below CPU_POOL_INLINE_BYTES the call runs inline
+
+    Returns:
+        Whatever func returns
+    """
+    if _executor is None or size < CPU_POOL_INLINE_BYTES:
+        _stats["inline"] += 1
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    executor = _executor
+    try:
+        result = await loop.run_in_executor(executor, functools.partial(func, *args))
+    except BrokenProcessPool:
+        # A worker died (OOM on a huge page, segfault in a C parser); replace the pool
+        # once - every call that was in flight on it lands here, and the later ones
+        # just retry on the pool the first one started
+        if _executor is executor:
+            logger.error(f"❌ CPU pool broke while running {getattr(func, '__name__', func)} - restarting it")
+            _restart()
+        result = await loop.run_in_executor(_executor, functools.partial(func, *args))
+    _stats["offloaded"] += 1
+    _stats["offload_ms"] = round(_stats["offload_ms"] + (time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def get_stats() -> Dict[str, Any]:
+    workers = getattr(_executor, "_max_workers", 0) if _executor is not None else 0
+    return {"mode": _mode, "workers": workers, "inline_bytes": CPU_POOL_INLINE_BYTES, **_stats}
+
+
+def _restart():
+    mode, workers = _mode, getattr(_executor, "_max_workers", CPU_POOL_WORKERS)
+    close_cpu_pool()
+    start_cpu_pool(mode, workers)
+    _stats["pool_restarts"] += 1
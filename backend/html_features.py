@@ -0,0 +1,308 @@
+"""
+Single-pass HTML feature extraction for RankBeacon SEO Exorcist
+Walks the document once (SAX-style) and records everything the SEO checks need
+"""
+
+import html.parser
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# lxml's event-driven parser is much faster than html.parser (optional)
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+MAIN_CONTENT_TAGS = ('article', 'main', 'section')
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+# Block elements that implicitly end an open <p> (html.parser won't do it for us)
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'div', 'dl', 'fieldset',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'pre', 'section', 'table', 'td', 'th', 'ul'
+))
+
+# Caps that keep the record compact on huge pages
+MAX_PARAGRAPHS = 10
+MAX_MISSING_ALT_SRCS = 20
+MAX_TEXT_SAMPLE = 5000
+MAX_MAIN_CONTENT = 2000
+
+
+@dataclass
+class PageFeatures:
+    """Compact record of the page features SEO checks consume"""
+    html_length: int = 0
+    title: Optional[str] = None  # None when there is no <title> tag
+    meta: Dict[str, str] = field(default_factory=dict)  # name/property -> content
+    heading_counts: Dict[str, int] = field(default_factory=lambda: {tag: 0 for tag in HEADING_TAGS})
+    h1_texts: List[str] = field(default_factory=list)
+    image_count: int = 0
+    images_missing_alt: int = 0
+    missing_alt_srcs: List[str] = field(default_factory=list)
+    links: List[Tuple[str, str]] = field(default_factory=list)  # (href, anchor text)
+    json_ld: List[str] = field(default_factory=list)
+    paragraphs: List[str] = field(default_factory=list)  # first few <p> texts
+    main_content_text: str = ""  # text of the first <article>/<main>/<section>
+    text_sample: str = ""  # leading visible text, whitespace-normalized
+    word_count: int = 0
+
+    @property
+    def meta_description(self) -> Optional[str]:
+        return self.meta.get('description')
+
+    @property
+    def has_meta_description_tag(self) -> bool:
+        return 'description' in self.meta
+
+
+def _clean(text: str) -> str:
+    return ' '.join(text.split())
+
+
+class _FeatureCollector:
+    """
+    Parser-agnostic event handler
+    Receives start/end/data events and fills in a PageFeatures record
+    """
+
+    def __init__(self, html_length: int):
+        self.features = PageFeatures(html_length=html_length)
+        self._skip_depth = 0  # inside script/style/template
+        self._script_is_json_ld = False
+        self._script_buffer: List[str] = []
+        self._title_buffer: Optional[List[str]] = None
+        self._h1_buffer: Optional[List[str]] = None
+        self._h1_depth = 0
+        self._anchor: Optional[Tuple[str, List[str]]] = None
+        self._paragraph: Optional[List[str]] = None
+        self._main_tag: Optional[str] = None
+        self._main_depth = 0
+        self._main_buffer: List[str] = []
+        self._main_length = 0
+        self._main_done = False
+        self._text_sample: List[str] = []
+        self._text_sample_len = 0
+        self._ends_mid_word = False
+
+    # Events -------------------------------------------------------------
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]):
+        tag = tag.lower()
+        features = self.features
+
+        if tag in NON_TEXT_TAGS:
+            self._skip_depth += 1
+            if tag == 'script' and (attrs.get('type') or '').lower() == 'application/ld+json':
+                self._script_is_json_ld = True
+                self._script_buffer = []
+            return
+
+        if tag in BLOCK_TAGS:
+            self._close_paragraph()
+
+        if tag == 'title' and features.title is None and self._title_buffer is None:
+            self._title_buffer = []
+        elif tag == 'meta':
+            key = (attrs.get('name') or attrs.get('property') or '').lower()
+            if key and key not in features.meta:
+                features.meta[key] = attrs.get('content') or ''
+        elif tag in HEADING_TAGS:
+            features.heading_counts[tag] += 1
+            if tag == 'h1':
+                self._h1_depth += 1
+                if self._h1_depth == 1:
+                    self._h1_buffer = []
+        elif tag == 'img':
+            features.image_count += 1
+            if not attrs.get('alt'):
+                features.images_missing_alt += 1
+                if len(features.missing_alt_srcs) < MAX_MISSING_ALT_SRCS:
+                    features.missing_alt_srcs.append(attrs.get('src') or '')
+        elif tag == 'a':
+            self._close_anchor()  # anchors can't nest
+            if attrs.get('href') is not None:
+                self._anchor = (attrs['href'], [])
+        elif tag == 'p':
+            self._close_paragraph()  # paragraphs can't nest
+            if len(features.paragraphs) < MAX_PARAGRAPHS:
+                self._paragraph = []
+
+        if tag in MAIN_CONTENT_TAGS and not self._main_done:
+            if self._main_tag is None:
+                self._main_tag = tag
+                self._main_depth = 1
+            elif tag == self._main_tag:
+                self._main_depth += 1
+
+    def end(self, tag: str):
+        tag = tag.lower()
+
+        if tag in NON_TEXT_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            if tag == 'script' and self._script_is_json_ld:
+                self.features.json_ld.append(''.join(self._script_buffer).strip())
+                self._script_is_json_ld = False
+            return
+
+        if tag == 'title' and self._title_buffer is not None:
+            self.features.title = ''.join(self._title_buffer)
+            self._title_buffer = None
+        elif tag == 'h1' and self._h1_depth:
+            self._h1_depth -= 1
+            if self._h1_depth == 0 and self._h1_buffer is not None:
+                self.features.h1_texts.append(_clean(''.join(self._h1_buffer)))
+                self._h1_buffer = None
+        elif tag == 'a':
+            self._close_anchor()
+        elif tag == 'p' or tag in BLOCK_TAGS:
+            self._close_paragraph()
+
+        if tag == self._main_tag and not self._main_done:
+            self._main_depth -= 1
+            if self._main_depth == 0:
+                self.features.main_content_text = _clean(''.join(self._main_buffer))[:MAX_MAIN_CONTENT]
+                self._main_done = True
+
+    def data(self, text: str):
+        if self._skip_depth:
+            if self._script_is_json_ld:
+                self._script_buffer.append(text)
+            return
+        if not text:
+            return
+
+        # Count words the way "".join(all text).split() would, so a word
+        # split across two text nodes (e.g. "foo<b>bar</b>") counts once
+        words = len(text.split())
+        if words and self._ends_mid_word and not text[0].isspace():
+            words -= 1
+        self.features.word_count += words
+        self._ends_mid_word = not text[-1].isspace()
+
+        if self._title_buffer is not None:
+            self._title_buffer.append(text)
+        if self._h1_buffer is not None:
+            self._h1_buffer.append(text)
+        if self._anchor is not None:
+            self._anchor[1].append(text)
+        if self._paragraph is not None:
+            self._paragraph.append(text)
+        if self._main_tag is not None and not self._main_done:
+            if self._main_length < MAX_MAIN_CONTENT * 4:
+                self._main_buffer.append(text)
+                self._main_length += len(text)
+        if self._text_sample_len < MAX_TEXT_SAMPLE:
+            self._text_sample.append(text)
+            self._text_sample_len += len(text)
+
+    def close(self) -> PageFeatures:
+        self._close_anchor()
+        self._close_paragraph()
+        features = self.features
+        if self._title_buffer is not None:
+            features.title = ''.join(self._title_buffer)
+        if self._h1_buffer is not None:
+            features.h1_texts.append(_clean(''.join(self._h1_buffer)))
+        if self._main_tag is not None and not self._main_done:
+            features.main_content_text = _clean(''.join(self._main_buffer))[:MAX_MAIN_CONTENT]
+        features.text_sample = _clean(''.join(self._text_sample))[:MAX_TEXT_SAMPLE]
+        return features
+
+    # Helpers ------------------------------------------------------------
+
+    def _close_anchor(self):
+        if self._anchor is not None:
+            href, text = self._anchor
+            self.features.links.append((href, _clean(''.join(text))))
+            self._anchor = None
+
+    def _close_paragraph(self):
+        if self._paragraph is not None:
+            self.features.paragraphs.append(_clean(''.join(self._paragraph)))
+            self._paragraph = None
+
+
+class _LxmlTarget:
+    """lxml parser target forwarding events to the collector"""
+
+    def __init__(self, collector: _FeatureCollector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        if isinstance(tag, str):
+            self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        if isinstance(tag, str):
+            self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.collector.close()
+
+
+class _StdlibParser(html.parser.HTMLParser):
+    """html.parser fallback forwarding events to the collector"""
+
+    def __init__(self, collector: _FeatureCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        if tag.lower() not in ('img', 'meta', 'br', 'hr', 'input', 'link'):
+            self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def extract_page_features(html_content: str, use_lxml: Optional[bool] = None) -> PageFeatures:
+    """
+    Extract SEO features from HTML in a single pass
+
+    Args:
+        html_content: Raw HTML document
+        use_lxml: Force the lxml (True) or html.parser (False) backend;
+            defaults to lxml when it is installed
+
+    Returns:
+        PageFeatures record
+    """
+    if use_lxml is None:
+        use_lxml = LXML_AVAILABLE
+
+    collector = _FeatureCollector(len(html_content))
+    if use_lxml and LXML_AVAILABLE and html_content.strip():
+        parser = etree.HTMLParser(target=_LxmlTarget(collector), recover=True)
+        try:
+            parser.feed(html_content)
+            return parser.close()
+        except etree.ParserError as e:
+            # lxml gives up on some pathological documents - start over
+            logger.warning(f"lxml feature extraction failed, using html.parser: {e}")
+            collector = _FeatureCollector(len(html_content))
+
+    parser = _StdlibParser(collector)
+    parser.feed(html_content)
+    parser.close()
+    return collector.close()
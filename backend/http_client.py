@@ -0,0 +1,370 @@
+"""
+Shared HTTP client for RankBeacon SEO Exorcist
+One pooled, keep-alive httpx client reused by every fetch path
+"""
+
+import asyncio
+import codecs
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, Mapping, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Pool settings (override with environment variables)
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+
+# HTML bodies are cut off after this many (decompressed) bytes - Googlebot
+# itself only indexes the first 15 MB, and 50 MB pages were OOMing workers
+HTML_MAX_BYTES = int(os.getenv("HTML_MAX_BYTES", str(15 * 1024 * 1024)))
+HTML_SNIFF_BYTES = 4096  # prefix scanned for a <meta charset> before decoding starts
+
+# Cheap substring signals gathered while the body streams (matched case-insensitively)
+HTML_MARKERS = {
+    "js_redirect": "window.location",
+    "noscript": "<noscript",
+    "next": "__next_data__",
+    "react": "data-react",
+    "angular": "ng-version",
+    "angularjs": "ng-app",
+    "nuxt": "__nuxt__",
+    "vue": "data-v-app",
+    "gatsby": "___gatsby",
+    "svelte": "svelte-",
+    "ember": "ember-application",
+}
+
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+# Per the HTML spec these labels mean windows-1252
+CP1252_LABELS = {"iso-8859-1", "iso8859-1", "latin1", "latin-1", "us-ascii", "ascii"}
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees the host slot once the body is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper enforcing a per-host concurrency cap
+    httpx only limits the pool globally, so one slow customer domain
+    could otherwise take every connection in the pool
+
+    A host's semaphore only lives while requests hold or wait for it, so
+    crawling millions of distinct hosts doesn't grow the map forever
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self.max_per_host = max_per_host
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}  # requests holding or waiting for each host's slot
+
+    def _checkout(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+            self._host_users[host] = 0
+        self._host_users[host] += 1
+        return self._host_slots[host]
+
+    def _checkin(self, host: str):
+        self._host_users[host] -= 1
+        if not self._host_users[host]:
+            del self._host_users[host]
+            del self._host_slots[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = f"{request.url.scheme}://{request.url.host}:{request.url.port}"
+        slot = self._checkout(host)
+        try:
+            await slot.acquire()
+        except BaseException:
+            self._checkin(host)
+            raise
+
+        def release():
+            slot.release()
+            self._checkin(host)
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def build_client(
+    max_connections: int = MAX_CONNECTIONS,
+    max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = KEEPALIVE_EXPIRY,
+    timeout: float = DEFAULT_TIMEOUT,
+    http2: Optional[bool] = None
+) -> httpx.AsyncClient:
+    """
+    Build a pooled AsyncClient
+
+    Args:
+        max_connections: Total connections across all hosts
+        max_connections_per_host: Concurrent requests allowed per host
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection stays in the pool
+        timeout: Default request timeout in seconds
+        http2: Force HTTP/2 on or off (defaults to on when `h2` is installed)
+    """
+    if http2 is None:
+        http2 = ENABLE_HTTP2
+    http2 = http2 and HTTP2_AVAILABLE
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+    transport = HostLimitedTransport(
+        httpx.AsyncHTTPTransport(limits=limits, http2=http2),
+        max_per_host=max_connections_per_host
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=timeout,
+        follow_redirects=True,
+        headers=DEFAULT_HEADERS
+    )
+
+
+# Application-lifetime client (created by the FastAPI lifespan hook)
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the shared client if it is not running yet"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+        logger.info(f"🌐 Shared HTTP client started (http2={HTTP2_AVAILABLE and ENABLE_HTTP2})")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and drop its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("🌐 Shared HTTP client closed")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared client
+    Falls back to lazily creating one when called outside the app lifespan
+    (e.g. scripts or tests calling endpoint functions directly)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+@dataclass
+class HTMLBody:
+    """A decoded HTML body plus what was learned while streaming it"""
+    text: str
+    encoding: str
+    size: int  # bytes read (after decompression)
+    truncated: bool  # True if the body was cut off at the byte budget
+    content_hash: str  # sha256 of the bytes read
+    markers: FrozenSet[str]  # HTML_MARKERS names found in the body
+
+
+def sniff_encoding(head: bytes, header_charset: Optional[str] = None) -> str:
+    """
+    Pick the body encoding: BOM, then the Content-Type charset, then a
+    <meta charset> in the first few KB, then UTF-8
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = META_CHARSET_RE.search(head[:HTML_SNIFF_BYTES])
+    for label in (header_charset, match.group(1).decode("ascii") if match else None):
+        if not label:
+            continue
+        label = label.strip().strip('"\'').lower()
+        if label in CP1252_LABELS:
+            return "cp1252"
+        try:
+            return codecs.lookup(label).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+async def read_html(
+    chunks: AsyncIterator[bytes],
+    header_charset: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    markers: Mapping[str, str] = HTML_MARKERS
+) -> HTMLBody:
+    """
+    Stream an HTML body within a byte budget
+
+    Bytes are decoded incrementally and never held in full; the hash and
+    marker scan happen chunk by chunk, so a 50 MB page costs at most
+    max_bytes of text and no second pass.
+
+    Args:
+        chunks: Raw (decompressed) body chunks
+        header_charset: charset from the Content-Type header, if any
+        max_bytes: Stop reading after this many bytes (default HTML_MAX_BYTES)
+        markers: name -> lowercase substring to look for
+    """
+    max_bytes = HTML_MAX_BYTES if max_bytes is None else max_bytes
+    hasher = hashlib.sha256()
+    decoder = None
+    encoding = "utf-8"
+    head = b""
+    parts = []
+    size = 0
+    truncated = False
+    found = set()
+    overlap = max((len(marker) for marker in markers.values()), default=1) - 1
+    tail = ""
+
+    def scan(text: str):
+        nonlocal tail
+        window = tail + text.lower()
+        for name, marker in markers.items():
+            if name not in found and marker in window:
+                found.add(name)
+        tail = window[-overlap:] if overlap else ""
+
+    async for chunk in chunks:
+        if size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+            truncated = True
+        size += len(chunk)
+        hasher.update(chunk)
+        if decoder is None:
+            # Hold the first few KB back until the encoding is known
+            head += chunk
+            if len(head) < HTML_SNIFF_BYTES and not truncated:
+                continue
+            encoding = sniff_encoding(head, header_charset)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            chunk, head = head, b""
+        text = decoder.decode(chunk)
+        scan(text)
+        parts.append(text)
+        if truncated:
+            break
+
+    if decoder is None:
+        encoding = sniff_encoding(head, header_charset)
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    text = decoder.decode(head, final=True)
+    scan(text)
+    parts.append(text)
+
+    return HTMLBody(
+        text="".join(parts),
+        encoding=encoding,
+        size=size,
+        truncated=truncated,
+        content_hash=hasher.hexdigest(),
+        markers=frozenset(found)
+    )
+
+
+async def fetch_html(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: Optional[int] = None
+) -> Tuple[httpx.Response, HTMLBody]:
+    """
+    GET a page, streaming its body through read_html
+
+    Returns:
+        The response (status, headers and final URL; its body is consumed)
+        and the decoded HTMLBody
+    """
+    async with client.stream("GET", url, headers=headers) as response:
+        body = await read_html(response.aiter_bytes(), response.charset_encoding, max_bytes)
+    if body.truncated:
+        logger.warning(f"✂️ {url} is larger than {body.size} bytes - analyzing only the first {body.size}")
+    return response, body
+
+
+def content_hash(body: bytes) -> str:
+    """Stable fingerprint of a response body"""
+    return hashlib.sha256(body).hexdigest()
+
+
+def conditional_headers(validators: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since headers from stored validators"""
+    headers: Dict[str, str] = {}
+    if not validators:
+        return headers
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(response: httpx.Response, body_hash: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    ETag, Last-Modified and body hash of a response, for the next conditional fetch
+    Pass body_hash for streamed responses whose content was not kept
+    """
+    return {
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "content_hash": body_hash or content_hash(response.content),
+    }
@@ -0,0 +1,394 @@
+"""
+Background jobs for RankBeacon SEO Exorcist
+SQLite-backed job queue and asyncio workers for long-running audits
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "")  # empty = in-memory, this process only
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1.0"))
+JOBS_HEARTBEAT_INTERVAL = float(os.getenv("JOBS_HEARTBEAT_INTERVAL", "15"))
+JOBS_STALE_AFTER = float(os.getenv("JOBS_STALE_AFTER", "120"))  # running jobs without a heartbeat are requeued
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RETENTION = int(os.getenv("JOBS_RETENTION", "86400"))  # finished jobs stay pollable this long
+JOBS_PROGRESS_INTERVAL = float(os.getenv("JOBS_PROGRESS_INTERVAL", "0.5"))  # min seconds between progress writes
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+# handler(params) -> JSON-serializable result
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Job:
+    """One unit of background work and its progress"""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = "queued"
+    progress: float = 0.0  # 0..1
+    message: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore:
+    """
+    Durable job queue backed by SQLite
+
+    With a file path, several API/worker processes can share one queue:
+    claims run in an IMMEDIATE transaction so each job goes to one worker.
+    """
+
+    COLUMNS = (
+        "id", "kind", "params", "status", "progress", "message", "result", "error",
+        "attempts", "created_at", "started_at", "finished_at"
+    )
+
+    def __init__(self, path: str = JOBS_DB_PATH, max_attempts: int = JOBS_MAX_ATTEMPTS):
+        self.path = path or ":memory:"
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, "
+            "status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT NOT NULL DEFAULT '', "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "worker TEXT, heartbeat_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def create(self, kind: str, params: Dict[str, Any]) -> Job:
+        """Queue a new job (params must be JSON-serializable)"""
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params, created_at=time.time())
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job.id, kind, json.dumps(params), job.created_at)
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recent jobs first, optionally filtered by status"""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        args: Tuple[Any, ...] = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self.conn.execute(query, args + (limit,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Atomically move the oldest queued job to running for this worker"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (worker, now, now, row[0])
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def update_progress(self, job_id: str, progress: float, message: str = ""):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                (min(1.0, max(0.0, progress)), message, time.time(), job_id)
+            )
+
+    def heartbeat(self, job_ids: List[str]):
+        """Mark running jobs as still alive"""
+        if not job_ids:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """Record a running job's outcome; False if it was cancelled or requeued meanwhile"""
+        with self._lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END "
+                "WHERE id = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), status, job_id)
+            ).rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+        return self.get(job_id)
+
+    def requeue(self, worker: Optional[str] = None, stale_before: Optional[float] = None) -> int:
+        """
+        Return interrupted running jobs to the queue
+
+        Args:
+            worker: Requeue this worker's running jobs (graceful shutdown)
+            stale_before: Requeue running jobs whose last heartbeat is older (crashed workers)
+
+        Jobs that already used max_attempts are failed instead.
+        """
+        if worker is not None:
+            condition, args = "worker = ?", (worker,)
+        elif stale_before is not None:
+            condition, args = "heartbeat_at < ?", (stale_before,)
+        else:
+            return 0
+        with self._lock:
+            failed = self.conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = 'Worker lost too many times', finished_at = ? "
+                f"WHERE status = 'running' AND attempts >= ? AND {condition}",
+                (time.time(), self.max_attempts) + args
+            ).rowcount
+            requeued = self.conn.execute(
+                f"UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND {condition}",
+                args
+            ).rowcount
+        if failed:
+            logger.warning(f"⚠️ Failed {failed} jobs that were interrupted {self.max_attempts} times")
+        return requeued
+
+    def prune(self, older_than: float = JOBS_RETENTION) -> int:
+        """Delete finished jobs older than the retention window"""
+        with self._lock:
+            return self.conn.execute(
+                f"DELETE FROM jobs WHERE status IN {FINISHED_STATUSES} AND finished_at < ?",
+                (time.time() - older_than,)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in JOB_STATUSES} | dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _to_job(self, row: Tuple[Any, ...]) -> Job:
+        values = dict(zip(self.COLUMNS, row))
+        values["params"] = json.loads(values["params"])
+        values["result"] = json.loads(values["result"]) if values["result"] is not None else None
+        return Job(**values)
+
+
+# (runner, job id) of the job the current task is working for
+_current_job: contextvars.ContextVar[Optional[Tuple["JobRunner", str]]] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+def report_progress(progress: float, message: str = ""):
+    """
+    Report progress of the job running in this context
+
+    Safe to call from any code path: outside a job it does nothing, so
+    shared pipeline code can report without knowing how it was invoked.
+    """
+    current = _current_job.get()
+    if current is not None:
+        runner, job_id = current
+        runner._report(job_id, progress, message)
+
+
+class JobRunner:
+    """
+    Executes queued jobs on a fixed number of asyncio workers
+
+    Handlers are registered per job kind. Workers claim jobs from the store,
+    wake immediately on local submits and poll for jobs queued by other
+    processes. Running jobs heartbeat so a crashed process's jobs are
+    picked up again by whoever is still alive.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOBS_WORKERS,
+        poll_interval: float = JOBS_POLL_INTERVAL,
+        heartbeat_interval: float = JOBS_HEARTBEAT_INTERVAL
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.handlers: Dict[str, JobHandler] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._last_report: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.stats = {"completed": 0, "failed": 0, "cancelled": 0}
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Decorator registering the handler for a job kind"""
+        def register(func: JobHandler) -> JobHandler:
+            if kind in self.handlers:
+                raise ValueError(f"Job kind '{kind}' is already registered")
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        """Queue a job; raises ValueError for unknown kinds"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}' (expected one of {', '.join(sorted(self.handlers))})")
+        job = self.store.create(kind, params)
+        logger.info(f"📥 Queued {kind} job {job.id}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job, interrupting it if this process is running it"""
+        job = self.store.cancel(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def start(self):
+        """Recover jobs from crashed workers and start the worker tasks"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        recovered = self.store.requeue(stale_before=time.time() - JOBS_STALE_AFTER)
+        if recovered:
+            logger.info(f"♻️ Requeued {recovered} jobs from lost workers")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"👷 Started {self.workers} job workers")
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to the queue"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        requeued = self.store.requeue(worker=self.worker_id)
+        if requeued:
+            logger.info(f"♻️ Returned {requeued} interrupted jobs to the queue")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "running": len(self._running),
+            "jobs": self.store.counts(),
+            **self.stats
+        }
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            job = self.store.claim(self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.store.finish(job.id, "failed", error=f"No handler for job kind '{job.kind}'")
+            return
+
+        logger.info(f"🏃 Running {job.kind} job {job.id} (attempt {job.attempts})")
+        # The handler task inherits the context, so report_progress finds this job
+        token = _current_job.set((self, job.id))
+        task = asyncio.ensure_future(handler(job.params))
+        _current_job.reset(token)
+        self._running[job.id] = task
+        try:
+            result = await task
+            if self.store.finish(job.id, "succeeded", result=result):
+                self.stats["completed"] += 1
+                logger.info(f"✅ Job {job.id} succeeded")
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            self.stats["cancelled"] += 1
+            logger.info(f"🛑 Job {job.id} cancelled")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"❌ Job {job.id} failed: {e}")
+            self.store.finish(job.id, "failed", error=str(e) or type(e).__name__)
+        finally:
+            self._running.pop(job.id, None)
+            self._last_report.pop(job.id, None)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.store.heartbeat(list(self._running))
+            self.store.prune()
+
+    def _report(self, job_id: str, progress: float, message: str):
+        # Throttled: a 10,000 page crawl shouldn't mean 10,000 writes
+        now = time.monotonic()
+        if progress < 1 and now - self._last_report.get(job_id, 0) < JOBS_PROGRESS_INTERVAL:
+            return
+        self._last_report[job_id] = now
+        self.store.update_progress(job_id, progress, message)
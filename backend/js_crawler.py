@@ -5,17 +5,199 @@ Handles SPAs and JavaScript-rendered content
 
 import asyncio
 import logging
-from typing import Optional, Dict, Any
-from playwright.async_api import async_playwright, Browser, Page, TimeoutError as PlaywrightTimeout
+import os
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, FrozenSet, Iterable
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
+# Playwright is optional; without it the module still imports (pool logic,
+# request blocking) but rendering raises
+try:
+    from playwright.async_api import (
+        async_playwright, Browser, BrowserContext, Page, Route,
+        Error as PlaywrightError, TimeoutError as PlaywrightTimeout
+    )
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    async_playwright = None
+    Browser = BrowserContext = Page = Route = Any
+
+    class PlaywrightError(Exception):
+        """Stand-in for playwright's Error"""
+
+    class PlaywrightTimeout(PlaywrightError):
+        """Stand-in for playwright's TimeoutError"""
+
+# Pool settings (override with environment variables)
+JS_RENDER_POOL_SIZE = int(os.getenv("JS_RENDER_POOL_SIZE", "4"))
+JS_RENDER_MAX_QUEUE = int(os.getenv("JS_RENDER_MAX_QUEUE", "32"))
+JS_RENDER_QUEUE_TIMEOUT = float(os.getenv("JS_RENDER_QUEUE_TIMEOUT", "30"))
+JS_RENDER_PAGES_PER_CONTEXT = int(os.getenv("JS_RENDER_PAGES_PER_CONTEXT", "50"))
+
+# Render settling: stop once the DOM and network have been quiet this long
+JS_SETTLE_IDLE_MS = int(os.getenv("JS_SETTLE_IDLE_MS", "500"))
+JS_SETTLE_POLL_MS = int(os.getenv("JS_SETTLE_POLL_MS", "100"))
+
+# Lightweight render mode: skip everything the DOM-only analysis doesn't need
+JS_RENDER_BLOCK_RESOURCES = os.getenv("JS_RENDER_BLOCK_RESOURCES", "true").lower() == "true"
+JS_RENDER_BLOCKED_TYPES = os.getenv("JS_RENDER_BLOCKED_TYPES", "image,media,font")
+JS_RENDER_DENY_DOMAINS = os.getenv("JS_RENDER_DENY_DOMAINS", "")  # extra domains to block
+JS_RENDER_ALLOW_DOMAINS = os.getenv("JS_RENDER_ALLOW_DOMAINS", "")  # never blocked
+
+# Analytics, tag managers and ad networks - they never change the SEO-relevant DOM
+TRACKER_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'adservice.google.com', 'connect.facebook.net',
+    'hotjar.com', 'segment.io', 'segment.com', 'mixpanel.com', 'amplitude.com', 'clarity.ms',
+    'bat.bing.com', 'snap.licdn.com', 'analytics.tiktok.com', 'criteo.com', 'criteo.net',
+    'taboola.com', 'outbrain.com', 'nr-data.net', 'js-agent.newrelic.com', 'fullstory.com',
+    'quantserve.com', 'scorecardresearch.com', 'adnxs.com', 'amazon-adsystem.com'
+)
+
+VIEWPORT = {"width": 1920, "height": 1080}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+# Records the time of the last DOM mutation (installed once per page)
+INSTALL_MUTATION_OBSERVER_JS = """
+() => {
+    if (window.__rankbeaconLastMutation !== undefined) return;
+    window.__rankbeaconLastMutation = performance.now();
+    new MutationObserver(() => { window.__rankbeaconLastMutation = performance.now(); })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+}
+"""
+
+# Cheap probe: how long the DOM has been quiet plus a signature of the
+# SEO-relevant elements, so we can stop once those stop changing
+SETTLE_PROBE_JS = """
+() => {
+    const meta = document.querySelector('meta[name="description"]');
+    const main = document.querySelector('main, article, [role="main"]') || document.body;
+    const h1s = Array.from(document.querySelectorAll('h1')).map(h => h.textContent.trim());
+    return {
+        quietMs: performance.now() - (window.__rankbeaconLastMutation || 0),
+        hasContent: !!(document.title || h1s.length || (main && main.innerText.trim().length > 0)),
+        signature: JSON.stringify([
+            document.title,
+            meta ? meta.getAttribute('content') : '',
+            h1s,
+            main ? main.innerText.length : 0,
+            document.querySelectorAll('a[href]').length,
+            document.querySelectorAll('img').length
+        ])
+    };
+}
+"""
+
+# Everything the analysis needs from the rendered page in one round trip
+COLLECT_PAGE_JS = """
+() => {
+    const meta = document.querySelector('meta[name="description"]');
+    const doctype = document.doctype ? '<!DOCTYPE ' + document.doctype.name + '>' : '';
+    return {
+        html: doctype + document.documentElement.outerHTML,
+        title: document.title,
+        meta_description: meta ? meta.getAttribute('content') : null,
+        links_count: document.querySelectorAll('a[href]').length,
+        images_count: document.querySelectorAll('img').length,
+        h1_count: document.querySelectorAll('h1').length
+    };
+}
+"""
+
+
+def _csv_set(value: str) -> FrozenSet[str]:
+    return frozenset(item.strip().lower() for item in value.split(',') if item.strip())
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    """True if host is one of the domains or a subdomain of one"""
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class RequestBlocker:
+    """
+    Route handler for lightweight renders
+    Aborts images, media, fonts (and stylesheets unless keep_css) and any
+    request to a denied tracker/ad domain; allow-listed domains always load
+    """
+    
+    def __init__(
+        self,
+        blocked_types: Iterable[str] = _csv_set(JS_RENDER_BLOCKED_TYPES),
+        deny_domains: Iterable[str] = (),
+        allow_domains: Iterable[str] = (),
+        keep_css: bool = False
+    ):
+        self.blocked_types = set(blocked_types)
+        if not keep_css:
+            self.blocked_types.add('stylesheet')
+        self.deny_domains = set(TRACKER_DOMAINS) | _csv_set(JS_RENDER_DENY_DOMAINS) | set(deny_domains)
+        self.allow_domains = _csv_set(JS_RENDER_ALLOW_DOMAINS) | set(allow_domains)
+        self.blocked = 0
+    
+    def should_block(self, url: str, resource_type: str) -> bool:
+        host = (urlsplit(url).hostname or '').lower()
+        if _host_matches(host, self.allow_domains):
+            return False
+        return resource_type in self.blocked_types or _host_matches(host, self.deny_domains)
+    
+    async def handle(self, route: Route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many renders are already waiting for a browser context"""
+
+
+@dataclass
+class _ContextSlot:
+    """One pool slot; the context is (re)created lazily when it is missing or stale"""
+    context: Optional[BrowserContext] = None
+    generation: int = 0  # browser generation the context belongs to
+    pages_served: int = 0
+
+
 class JavaScriptCrawler:
-    """Headless browser crawler for JavaScript-rendered sites"""
+    """
+    Headless browser crawler for JavaScript-rendered sites
     
-    def __init__(self):
+    Renders run in a fixed pool of pre-warmed browser contexts. Callers
+    queue for a free context (bounded, so bursts fail fast instead of
+    piling up), contexts are recycled after a number of pages to cap
+    memory, and a crashed Chromium is relaunched transparently.
+    """
+    
+    def __init__(
+        self,
+        pool_size: int = JS_RENDER_POOL_SIZE,
+        max_queue: int = JS_RENDER_MAX_QUEUE,
+        queue_timeout: float = JS_RENDER_QUEUE_TIMEOUT,
+        pages_per_context: int = JS_RENDER_PAGES_PER_CONTEXT
+    ):
         self.browser: Optional[Browser] = None
         self._playwright = None
+        self.pool_size = max(1, pool_size)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.pages_per_context = max(1, pages_per_context)
+        self._slots: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self._generation = 0
+        self._browser_lock = asyncio.Lock()
+        self.stats = {
+            "renders": 0, "recycled_contexts": 0, "browser_launches": 0,
+            "rejected": 0, "blocked_requests": 0
+        }
         
     async def __aenter__(self):
         """Context manager entry"""
@@ -27,55 +209,252 @@ class JavaScriptCrawler:
         await self.close()
         
     async def start(self):
-        """Initialize the browser"""
-        if not self.browser:
-            self._playwright = await async_playwright().start()
-            self.browser = await self._playwright.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox']
-            )
-            logger.info("🌐 Playwright browser started")
+        """Initialize the browser and pre-warm the context pool"""
+        if self._slots is not None and self.browser:
+            return
+        await self._ensure_browser()
+        self._slots = asyncio.Queue()
+        for _ in range(self.pool_size):
+            slot = _ContextSlot()
+            try:
+                await self._prepare(slot)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not pre-warm browser context: {e}")
+            self._slots.put_nowait(slot)
+        logger.info(f"🌐 Playwright browser started with {self.pool_size} contexts")
     
     async def close(self):
         """Close the browser"""
+        if self._slots is not None:
+            while not self._slots.empty():
+                await self._discard(self._slots.get_nowait())
+            self._slots = None
         if self.browser:
-            await self.browser.close()
+            try:
+                await self.browser.close()
+            except Exception:
+                pass  # already gone
             self.browser = None
         if self._playwright:
             await self._playwright.stop()
             self._playwright = None
             logger.info("🌐 Playwright browser closed")
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy and lifetime counters"""
+        return {
+            "pool_size": self.pool_size,
+            "idle_contexts": self._slots.qsize() if self._slots is not None else 0,
+            "waiting": self._waiting,
+            **self.stats
+        }
+    
+    # Pool management -----------------------------------------------------
+    
+    async def _ensure_browser(self):
+        """Launch Chromium, or relaunch it after a crash"""
+        async with self._browser_lock:
+            if self.browser and self.browser.is_connected():
+                return
+            if self._playwright is None:
+                if not PLAYWRIGHT_AVAILABLE:
+                    raise RuntimeError("JS rendering needs playwright (pip install playwright)")
+                self._playwright = await async_playwright().start()
+            if self.browser:
+                logger.warning("💥 Chromium disconnected - relaunching")
+            self.browser = await self._playwright.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-setuid-sandbox']
+            )
+            self._generation += 1
+            self.stats["browser_launches"] += 1
+    
+    async def _prepare(self, slot: _ContextSlot):
+        """Give the slot a live context on the current browser"""
+        if slot.context is not None and slot.generation == self._generation and not self._browser_crashed():
+            return
+        await self._discard(slot)
+        await self._ensure_browser()
+        slot.context = await self.browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+        slot.generation = self._generation
+        slot.pages_served = 0
+    
+    async def _discard(self, slot: _ContextSlot):
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass  # context died with its browser
+            slot.context = None
+    
+    async def _acquire(self) -> _ContextSlot:
+        """Wait for a free context, failing fast when the queue is full"""
+        if self._slots is None:
+            await self.start()
+        if self._slots.empty() and self._waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise RenderQueueFull(f"{self._waiting} renders already queued")
+        
+        self._waiting += 1
+        try:
+            slot = await asyncio.wait_for(self._slots.get(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise RenderQueueFull(f"No browser context free after {self.queue_timeout}s")
+        finally:
+            self._waiting -= 1
+        
+        try:
+            await self._prepare(slot)
+        except BaseException:
+            self._slots.put_nowait(slot)
+            raise
+        return slot
+    
+    async def _release(self, slot: _ContextSlot, healthy: bool = True):
+        """Return a context to the pool, recycling it when it has served enough pages"""
+        slot.pages_served += 1
+        if not healthy or slot.pages_served >= self.pages_per_context:
+            # Closing the context frees its renderer memory; a fresh one is made on next use
+            await self._discard(slot)
+            self.stats["recycled_contexts"] += 1
+        if self._slots is not None:
+            self._slots.put_nowait(slot)
+    
+    def _browser_crashed(self) -> bool:
+        return self.browser is None or not self.browser.is_connected()
+    
+    async def _wait_until_settled(self, page: Page, in_flight: set, deadline: float) -> bool:
+        """
+        Wait until the page has finished rendering, or the deadline passes
+        
+        The page counts as settled when its SEO-relevant elements (title,
+        meta description, h1s, main content, link/image counts) have stopped
+        changing for the idle window and either the DOM and network are both
+        quiet, or the elements have stayed stable for three idle windows
+        (pages with endless analytics beacons or animations never go fully
+        quiet). A page with no content at all needs both.
+        
+        A client-side navigation (JS redirect) destroys the document the
+        probe runs in; the observer is reinstalled on the new document and
+        the stability clock restarts.
+        
+        Returns:
+            True if the page settled before the deadline
+        """
+        loop = asyncio.get_running_loop()
+        idle = JS_SETTLE_IDLE_MS / 1000
+        observing = False
+        
+        signature = None
+        stable_since = loop.time()
+        while True:
+            try:
+                if not observing:
+                    await page.evaluate(INSTALL_MUTATION_OBSERVER_JS)
+                    observing = True
+                probe = await page.evaluate(SETTLE_PROBE_JS)
+            except PlaywrightError as e:
+                if page.is_closed():
+                    raise
+                logger.debug(f"Page navigated while settling, starting over: {e}")
+                observing = False
+                signature = None
+                stable_since = loop.time()
+                probe = None
+            now = loop.time()
+            if probe is not None:
+                if probe['signature'] != signature:
+                    signature = probe['signature']
+                    stable_since = now
+                
+                stable_for = now - stable_since
+                if stable_for >= idle:
+                    quiet = probe['quietMs'] >= JS_SETTLE_IDLE_MS and not in_flight
+                    if probe['hasContent'] and (quiet or stable_for >= idle * 3):
+                        return True
+                    if quiet and stable_for >= idle * 3:
+                        return True  # genuinely empty page
+            
+            if now >= deadline:
+                return False
+            await asyncio.sleep(min(JS_SETTLE_POLL_MS / 1000, max(0, deadline - now)))
+    
+    # Rendering -----------------------------------------------------------
+    
     async def fetch_rendered_html(
         self, 
         url: str, 
         wait_for_selector: Optional[str] = None,
-        timeout: int = 30000
+        timeout: int = 30000,
+        block_resources: Optional[bool] = None,
+        keep_css: bool = False
     ) -> Dict[str, Any]:
         """
         Fetch fully rendered HTML after JavaScript execution
         
+        Renders in a pooled context; if Chromium crashes mid-render the
+        browser is relaunched and the render retried once.
+        
         Args:
             url: URL to fetch
             wait_for_selector: Optional CSS selector to wait for before capturing
             timeout: Maximum wait time in milliseconds
+            block_resources: Lightweight mode - abort images, media, fonts,
+                stylesheets and trackers (defaults to JS_RENDER_BLOCK_RESOURCES)
+            keep_css: Load stylesheets even in lightweight mode (layout-dependent checks)
             
         Returns:
             Dict with html, title, meta_description, and other metadata
         """
-        if not self.browser:
-            await self.start()
-        
-        page: Page = await self.browser.new_page()
+        for attempt in range(2):
+            slot = await self._acquire()
+            healthy = True
+            try:
+                if block_resources is None:
+                    block_resources = JS_RENDER_BLOCK_RESOURCES
+                blocker = RequestBlocker(keep_css=keep_css) if block_resources else None
+                result = await self._render(slot.context, url, wait_for_selector, timeout, blocker)
+                self.stats["renders"] += 1
+                return result
+            except Exception:
+                healthy = False
+                if attempt == 0 and self._browser_crashed():
+                    logger.warning(f"💥 Browser crashed while rendering {url} - retrying")
+                    continue
+                raise
+            finally:
+                await self._release(slot, healthy)
+    
+    async def _render(
+        self,
+        context: BrowserContext,
+        url: str,
+        wait_for_selector: Optional[str],
+        timeout: int,
+        blocker: Optional[RequestBlocker] = None
+    ) -> Dict[str, Any]:
+        """Render one page in the given context"""
+        page: Page = await context.new_page()
         
         try:
-            # Set viewport and user agent
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-            
             logger.info(f"🔍 Fetching JavaScript-rendered content from {url}")
             
-            # Navigate to the page
-            response = await page.goto(url, wait_until='networkidle', timeout=timeout)
+            if blocker is not None:
+                await page.route("**/*", blocker.handle)
+            
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            deadline = started + timeout / 1000
+            
+            # Track in-flight requests so we know when the network goes quiet
+            in_flight = set()
+            page.on("request", in_flight.add)
+            page.on("requestfinished", in_flight.discard)
+            page.on("requestfailed", in_flight.discard)
+            
+            # Navigate; the adaptive settle below replaces networkidle + fixed sleep
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
             
             if not response:
                 raise Exception("Failed to load page")
@@ -83,65 +462,30 @@ class JavaScriptCrawler:
             # Wait for specific selector if provided
             if wait_for_selector:
                 try:
-                    await page.wait_for_selector(wait_for_selector, timeout=5000)
+                    remaining_ms = max(0, deadline - loop.time()) * 1000
+                    await page.wait_for_selector(wait_for_selector, timeout=min(5000, remaining_ms))
                 except PlaywrightTimeout:
                     logger.warning(f"⚠️ Selector '{wait_for_selector}' not found, continuing anyway")
             
-            # Wait for body to be populated (common for SPAs)
-            try:
-                await page.wait_for_selector('body', timeout=5000)
-                # Wait for network to be mostly idle
-                await page.wait_for_load_state('domcontentloaded')
-            except PlaywrightTimeout:
-                pass
-            
-            # Wait a bit more for any dynamic content
-            await page.wait_for_timeout(3000)
-            
-            # Extract content
-            html = await page.content()
-            title = await page.title()
-            
-            # Get meta description
-            meta_desc = await page.evaluate("""
-                () => {
-                    const meta = document.querySelector('meta[name="description"]');
-                    return meta ? meta.getAttribute('content') : null;
-                }
-            """)
-            
-            # Get all links
-            links = await page.evaluate("""
-                () => {
-                    return Array.from(document.querySelectorAll('a[href]')).length;
-                }
-            """)
+            settled = await self._wait_until_settled(page, in_flight, deadline)
             
-            # Get all images
-            images = await page.evaluate("""
-                () => {
-                    return Array.from(document.querySelectorAll('img')).length;
-                }
-            """)
+            # Extract content and metadata in a single round trip
+            result = await page.evaluate(COLLECT_PAGE_JS)
+            html = result['html']
             
-            # Get h1 count
-            h1_count = await page.evaluate("""
-                () => {
-                    return document.querySelectorAll('h1').length;
-                }
-            """)
-            
-            logger.info(f"✅ Successfully fetched {len(html)} chars of rendered HTML")
+            settle_ms = round((loop.time() - started) * 1000)
+            logger.info(
+                f"✅ Successfully fetched {len(html)} chars of rendered HTML in {settle_ms}ms"
+                f"{'' if settled else ' (settle timeout)'}"
+            )
             
             return {
-                'html': html,
-                'title': title,
-                'meta_description': meta_desc,
+                **result,
                 'status_code': response.status,
                 'url': page.url,  # Final URL after redirects
-                'links_count': links,
-                'images_count': images,
-                'h1_count': h1_count,
+                'render_ms': settle_ms,
+                'settled': settled,
+                'blocked_requests': blocker.blocked if blocker is not None else 0,
             }
             
         except PlaywrightTimeout:
@@ -151,30 +495,55 @@ class JavaScriptCrawler:
             logger.error(f"❌ Error fetching {url}: {e}")
             raise
         finally:
-            await page.close()
+            if blocker is not None:
+                self.stats["blocked_requests"] += blocker.blocked
+            try:
+                await page.close()
+            except Exception:
+                pass  # page died with its context/browser
 
 
 # Singleton instance for reuse
 _crawler_instance: Optional[JavaScriptCrawler] = None
+_crawler_lock = asyncio.Lock()
 
 async def get_crawler() -> JavaScriptCrawler:
     """Get or create the global crawler instance"""
     global _crawler_instance
-    if _crawler_instance is None:
-        _crawler_instance = JavaScriptCrawler()
-        await _crawler_instance.start()
+    async with _crawler_lock:
+        if _crawler_instance is None:
+            crawler = JavaScriptCrawler()
+            await crawler.start()
+            _crawler_instance = crawler
     return _crawler_instance
 
-async def fetch_with_js(url: str, timeout: int = 30000) -> Dict[str, Any]:
+async def close_crawler():
+    """Shut down the global crawler (app shutdown)"""
+    global _crawler_instance
+    async with _crawler_lock:
+        if _crawler_instance is not None:
+            await _crawler_instance.close()
+            _crawler_instance = None
+
+async def fetch_with_js(
+    url: str,
+    timeout: int = 30000,
+    block_resources: Optional[bool] = None,
+    keep_css: bool = False
+) -> Dict[str, Any]:
     """
     Convenience function to fetch a URL with JavaScript rendering
     
     Args:
         url: URL to fetch
         timeout: Maximum wait time in milliseconds
+        block_resources: Lightweight render mode (defaults to JS_RENDER_BLOCK_RESOURCES)
+        keep_css: Keep stylesheets for layout-dependent checks
         
     Returns:
         Dict with rendered HTML and metadata
     """
     crawler = await get_crawler()
-    return await crawler.fetch_rendered_html(url, timeout=timeout)
+    return await crawler.fetch_rendered_html(
+        url, timeout=timeout, block_resources=block_resources, keep_css=keep_css
+    )
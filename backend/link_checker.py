@@ -0,0 +1,154 @@
+"""
+Concurrent broken-link checker for RankBeacon SEO Exorcist
+Checks every outbound link at once under global and per-host caps
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+LINK_CHECK_BUDGET = int(os.getenv("LINK_CHECK_BUDGET", "1000"))
+LINK_CHECK_CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", "50"))
+LINK_CHECK_PER_HOST = int(os.getenv("LINK_CHECK_PER_HOST", "6"))
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", "10"))
+
+# Statuses servers commonly return when they simply refuse HEAD
+HEAD_REJECTED_STATUSES = {403, 405, 501}
+
+SKIPPED_SCHEMES = ('javascript:', 'mailto:', 'tel:', 'data:', '#')
+
+
+@dataclass
+class LinkStatus:
+    """Outcome of checking a single link"""
+    url: str
+    status: Union[int, str]  # HTTP status code or "unreachable"
+    method: str  # "HEAD" or "GET" (ranged fallback)
+
+    @property
+    def is_broken(self) -> bool:
+        return not isinstance(self.status, int) or self.status >= 400
+
+
+def collect_links(anchors: List[Tuple[str, str]], page_url: str) -> Dict[str, str]:
+    """
+    Resolve and dedupe anchor hrefs
+
+    Args:
+        anchors: (href, anchor text) pairs in document order
+        page_url: URL of the page the anchors came from
+
+    Returns:
+        Ordered mapping of absolute URL -> text of its first anchor
+    """
+    links: Dict[str, str] = {}
+    for href, text in anchors:
+        href = href.strip()
+        if not href or href.startswith(SKIPPED_SCHEMES):
+            continue
+        absolute = urljoin(page_url, href).split('#')[0]
+        if urlparse(absolute).scheme not in ('http', 'https'):
+            continue
+        if absolute not in links:
+            links[absolute] = text
+    return links
+
+
+class LinkChecker:
+    """
+    Checks links concurrently with bounded fan-out
+    A global semaphore caps total in-flight checks and a per-host
+    semaphore keeps us polite to any single server
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_concurrency: int = LINK_CHECK_CONCURRENCY,
+        max_per_host: int = LINK_CHECK_PER_HOST,
+        timeout: float = LINK_CHECK_TIMEOUT
+    ):
+        self.client = client
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def check_all(self, urls: List[str]) -> List[LinkStatus]:
+        """Check every URL concurrently, preserving input order"""
+        unique_urls = list(dict.fromkeys(urls))
+        return list(await asyncio.gather(*(self.check(url) for url in unique_urls)))
+
+    async def check(self, url: str) -> LinkStatus:
+        """Check a single URL, falling back from HEAD to a ranged GET"""
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+
+        # Take the host slot first so links queued behind one busy host
+        # don't hold global slots other hosts could be using
+        async with self._host_slots[host], self._global_slots:
+            try:
+                response = await self.client.head(url, timeout=self.timeout)
+                if response.status_code not in HEAD_REJECTED_STATUSES:
+                    return LinkStatus(url=url, status=response.status_code, method="HEAD")
+
+                # Server rejected HEAD - ask for a single byte instead
+                status = await self._ranged_get(url)
+                return LinkStatus(url=url, status=status, method="GET")
+            except Exception as e:
+                logger.debug(f"Link check failed for {url}: {e}")
+                return LinkStatus(url=url, status="unreachable", method="HEAD")
+
+    async def _ranged_get(self, url: str) -> int:
+        """GET only the first byte; the body is never downloaded"""
+        async with self.client.stream(
+            "GET", url, headers={"Range": "bytes=0-0"}, timeout=self.timeout
+        ) as response:
+            return response.status_code
+
+
+async def find_broken(
+    client: httpx.AsyncClient,
+    anchors: List[Tuple[str, str]],
+    page_url: str,
+    budget: Optional[int] = None,
+    **checker_options
+) -> Dict[str, object]:
+    """
+    Check all links found on a page
+
+    Args:
+        client: Shared HTTP client
+        anchors: (href, anchor text) pairs from the page
+        page_url: URL of the page the anchors came from
+        budget: Maximum number of unique links to check
+
+    Returns:
+        Dict with broken links and how many links were found/checked
+    """
+    budget = budget if budget is not None else LINK_CHECK_BUDGET
+    links = collect_links(anchors, page_url)
+    to_check = list(links)[:budget]
+
+    checker = LinkChecker(client, **checker_options)
+    results = await checker.check_all(to_check)
+
+    broken = [
+        {"url": r.url, "status": r.status, "text": links[r.url][:50]}
+        for r in results if r.is_broken
+    ]
+    return {
+        "broken_links": broken,
+        "total_links_found": len(links),
+        "total_links_checked": len(to_check),
+        "budget_exhausted": len(links) > len(to_check)
+    }
@@ -3,34 +3,68 @@ RankBeacon SEO Exorcist - FastAPI Backend
 AI-powered SEO monitoring with supernatural twist
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from contextlib import asynccontextmanager
 import asyncio
 import httpx
+import json
 from datetime import datetime
 import logging
+import time
+
+from http_client import (
+    start_http_client, close_http_client, get_http_client,
+    conditional_headers, response_validators, fetch_html
+)
+from html_features import extract_page_features, PageFeatures
+from seo_rules import default_engine, run_default_rules, RuleContext
+from performance_optimizer import cache_manager, SingleFlight
+from site_crawler import SiteCrawler, httpx_fetcher, CRAWL_MAX_PAGES, CRAWL_MAX_PAGES_LIMIT
+from url_utils import normalize_url, site_host
+from spa_detector import detect_spa, rendering_changed
+from batch_runner import HostFairPool, BATCH_MAX_URLS
+from jobs import JobRunner, JobStore, report_progress
+from audit_events import broadcaster, audit_topic, emit, listening
+from cpu_pool import offload, start_cpu_pool, close_cpu_pool
+from ranking_history import RankingHistoryStore, RANKING_HISTORY_PATH
 
 # Configure logging first
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import JS crawler (optional)
-try:
-    from js_crawler import fetch_with_js
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
+# JS crawler (rendering needs the optional playwright package)
+from js_crawler import fetch_with_js, close_crawler, RenderQueueFull, PLAYWRIGHT_AVAILABLE
+if not PLAYWRIGHT_AVAILABLE:
     logger.warning("⚠️ Playwright not available - JS rendering disabled")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown"""
+    await start_http_client()
+    start_cpu_pool()
+    await job_runner.start()
+    yield
+    await job_runner.stop()
+    close_cpu_pool()
+    await close_http_client()
+    if PLAYWRIGHT_AVAILABLE:
+        await close_crawler()
+    await cache_manager.close()
+    job_runner.store.close()
+    if ranking_history.path:
+        await ranking_history.flush()
+
 app = FastAPI(
     title="RankBeacon SEO Exorcist API",
     description="AI-powered SEO monitoring with supernatural twist 👻",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend communication
@@ -42,6 +76,15 @@ if allowed_origins == "*":
 else:
     allow_origins = allowed_origins.split(",")
 
+# Coalesces concurrent analyses of the same URL and options
+analysis_flights = SingleFlight()
+
+# Long-running audits (deep crawls, competitor analysis) run as background jobs
+job_runner = JobRunner(JobStore())
+
+# Daily keyword positions for the predictive endpoints (memory-mapped when persisted)
+ranking_history = RankingHistoryStore.load(RANKING_HISTORY_PATH) if RANKING_HISTORY_PATH else RankingHistoryStore()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allow_origins if allow_origins != ["*"] else [
@@ -58,9 +101,24 @@ app.add_middleware(
 # Pydantic models
 class WebsiteAnalysisRequest(BaseModel):
     url: HttpUrl
-    depth: int = 1
-    include_competitors: bool = False
+    depth: int = 1  # 1 = this page only; N follows internal links up to N-1 clicks deep
+    max_pages: int = CRAWL_MAX_PAGES  # Page budget when depth > 1
+    include_competitors: bool = False  # Queue a competitor analysis job alongside
+    competitor_urls: List[HttpUrl] = []
     use_js_rendering: bool = True  # Enable JavaScript rendering by default
+    profile: str = "full"  # "fast" for bulk monitoring, "full" for complete audits
+    rules: Optional[List[str]] = None  # Run only these rules (overrides profile)
+    skip_rules: Optional[List[str]] = None  # Rules to skip
+
+class BatchAnalysisRequest(BaseModel):
+    urls: List[HttpUrl]
+    # Options applied to every URL (same meaning as WebsiteAnalysisRequest)
+    depth: int = 1
+    max_pages: int = CRAWL_MAX_PAGES
+    use_js_rendering: bool = True
+    profile: str = "full"
+    rules: Optional[List[str]] = None
+    skip_rules: Optional[List[str]] = None
 
 class SEOEntity(BaseModel):
     type: str  # ghost, zombie, monster, specter
@@ -79,9 +137,10 @@ class SEOAnalysisResponse(BaseModel):
     analysis_timestamp: datetime
     exorcism_available: bool
     warning: Optional[str] = None  # Warning message for JS rendering issues
-
-# In-memory storage for demo (replace with Redis/PostgreSQL in production)
-analysis_cache: Dict[str, SEOAnalysisResponse] = {}
+    rule_timings: Optional[Dict[str, float]] = None  # Per-rule execution time (ms)
+    pages_analyzed: int = 1
+    content_unchanged: bool = False  # Page unchanged since last analysis; entities reused
+    competitor_job_id: Optional[str] = None  # Poll /api/jobs/{id} when include_competitors is set
 
 @app.get("/")
 async def root():
@@ -92,8 +151,12 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "analyze": "/api/analyze",
+            "analyze_batch": "/api/analyze/batch",
+            "analyze_live": "/ws/analyze",
             "entities": "/api/entities/{url}",
             "exorcise": "/api/exorcise",
+            "rules": "/api/rules",
+            "jobs": "/api/jobs",
             "docs": "/api/docs"
         }
     }
@@ -104,74 +167,269 @@ async def analyze_website(request: WebsiteAnalysisRequest, background_tasks: Bac
     Perform comprehensive SEO analysis and detect supernatural entities
     """
     url_str = str(request.url)
+    cache_variant = analysis_cache_variant(request)
+    validate_analysis_options(request)
+    
+    # Check cache first (memory, then the optional shared and disk tiers)
+    cached = await cache_manager.get_analysis_entry(url_str, cache_variant)
+    if cached is not None:
+        data, fresh = cached
+        if not fresh:
+            # Stale: answer now, refresh once in the background for whoever comes next
+            await revalidate_analysis(request, cache_variant)
+        logger.info(f"📋 Returning {'cached' if fresh else 'stale'} analysis for {url_str}")
+        analysis = SEOAnalysisResponse(**data)
+    else:
+        # Concurrent requests for the same page and options share one analysis;
+        # its progress events go to everyone watching that flight over /ws/analyze
+        flight_key = analysis_flight_key(request)
+        with audit_topic(flight_key):
+            analysis = await analysis_flights.do(flight_key, lambda: run_analysis(request, cache_variant))
+        broadcaster.end(flight_key)
+    
+    # Queue competitive analysis as a job; the response carries its id for polling
+    if request.include_competitors:
+        job = job_runner.submit("competitors", CompetitorAnalysisRequest(
+            your_url=request.url, competitor_urls=request.competitor_urls
+        ).model_dump(mode="json"))
+        analysis = analysis.model_copy(update={"competitor_job_id": job.id})
+    
+    return analysis
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Analyze many URLs in parallel, streaming results as NDJSON
+    
+    One line per URL as it completes ({"type": "result"} or {"type": "error"},
+    with the URL's index in the request), then a final {"type": "summary"}.
+    URLs run through a bounded pool that takes turns between sites.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="urls must not be empty")
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    
+    options = request.model_dump(exclude={"urls"})  # no competitor jobs from batches
+    analysis_requests = [WebsiteAnalysisRequest(url=url, **options) for url in request.urls]
+    validate_analysis_options(analysis_requests[0])  # bad options fail the whole batch up front
+    # Pull results other workers already have into this worker's memory in one shared-tier round trip
+    await cache_manager.get_analyses([str(r.url) for r in analysis_requests], analysis_cache_variant(analysis_requests[0]))
+    
+    logger.info(f"📦 Starting batch analysis of {len(analysis_requests)} URLs")
+    return StreamingResponse(stream_batch_analysis(analysis_requests), media_type="application/x-ndjson")
+
+async def stream_batch_analysis(analysis_requests: List[WebsiteAnalysisRequest]) -> AsyncIterator[str]:
+    """Run a batch through the host-fair pool, yielding one NDJSON line per outcome plus a summary"""
+    start = time.perf_counter()
+    succeeded = failed = 0
+    
+    outcomes = HostFairPool().run(
+        analysis_requests,
+        lambda analysis_request: analyze_website(analysis_request, BackgroundTasks()),
+        lambda analysis_request: site_host(str(analysis_request.url))
+    )
+    async for outcome in outcomes:
+        url_str = str(outcome.item.url)
+        if outcome.error is None:
+            succeeded += 1
+            record = {
+                "type": "result",
+                "index": outcome.index,
+                "url": url_str,
+                "analysis": outcome.result.model_dump(mode="json")
+            }
+        else:
+            failed += 1
+            error = outcome.error
+            record = {
+                "type": "error",
+                "index": outcome.index,
+                "url": url_str,
+                "status_code": error.status_code if isinstance(error, HTTPException) else 500,
+                "detail": error.detail if isinstance(error, HTTPException) else str(error)
+            }
+        yield json.dumps(record) + "\n"
+    
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"📦 Batch finished: {succeeded} analyzed, {failed} failed in {elapsed_ms}ms")
+    yield json.dumps({
+        "type": "summary",
+        "total": len(analysis_requests),
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_ms": elapsed_ms
+    }) + "\n"
+
+@app.websocket("/ws/analyze")
+async def analyze_websocket(websocket: WebSocket):
+    """
+    Live analysis over a WebSocket
+    
+    The client sends one WebsiteAnalysisRequest as JSON and receives progress
+    events (started, fetched, parsed, rendering, rendered, entities, page,
+    unchanged, ...) as the audit runs, then {"type": "complete"} with the full
+    analysis or {"type": "error"}. Clients asking for the same page and
+    options share one audit; each gets its own bounded event queue, so a
+    slow client misses events ({"type": "dropped"}) instead of stalling others.
+    """
+    await websocket.accept()
+    try:
+        request = WebsiteAnalysisRequest(**await websocket.receive_json())
+        validate_analysis_options(request)
+    except WebSocketDisconnect:
+        return
+    except (ValueError, HTTPException) as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        await websocket.send_json({"type": "error", "status_code": 400, "detail": detail})
+        await websocket.close(code=1008)
+        return
+    
+    # Subscribe before starting so no event is missed
+    subscription = broadcaster.subscribe(analysis_flight_key(request))
+    analysis_task = asyncio.create_task(analyze_website(request, BackgroundTasks()))
+    analysis_task.add_done_callback(lambda _: subscription.close())
+    
+    async def forward_events():
+        async for event in subscription:
+            await websocket.send_json(event)
+    
+    async def wait_for_disconnect():
+        # Nothing more is expected from the client; receiving just tells us when it leaves
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    forward_task = asyncio.create_task(forward_events())
+    disconnect_task = asyncio.create_task(wait_for_disconnect())
+    try:
+        await asyncio.wait({forward_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        if disconnect_task.done() or forward_task.exception() is not None:
+            logger.info(f"🔌 WebSocket client left during analysis of {request.url}")
+            return
+        try:
+            analysis = await analysis_task
+            await websocket.send_json({"type": "complete", "analysis": analysis.model_dump(mode="json")})
+        except HTTPException as e:
+            await websocket.send_json({"type": "error", "status_code": e.status_code, "detail": e.detail})
+        await websocket.close()
+    finally:
+        broadcaster.unsubscribe(subscription)
+        # Leaving cancels only this caller's wait; a shared audit continues for the others
+        for task in (analysis_task, forward_task, disconnect_task):
+            task.cancel()
+        await asyncio.gather(analysis_task, forward_task, disconnect_task, return_exceptions=True)
+
+async def run_analysis(request: WebsiteAnalysisRequest, cache_variant: str) -> SEOAnalysisResponse:
+    """
+    Fetch, render, crawl and analyze a site, then cache the result
+    Runs once per in-flight key; coalesced callers share its result or error
+    """
+    url_str = str(request.url)
     logger.info(f"👻 Starting SEO exorcism for {url_str}")
     
     try:
-        # Check cache first
-        if url_str in analysis_cache:
-            logger.info(f"📋 Returning cached analysis for {url_str}")
-            return analysis_cache[url_str]
+        # Single-page re-analysis: send the validators from last time so an
+        # unchanged page costs one cheap round trip instead of a full parse
+        validators = await cache_manager.get_validators(url_str, cache_variant) if request.depth == 1 else None
         
-        # Perform basic website crawling with proper headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
+        # Perform basic website crawling on the shared pooled client
+        emit("started", url=url_str, depth=request.depth)
+        client = get_http_client()
+        start = time.perf_counter()
+        response, page = await fetch_html(client, url_str, headers=conditional_headers(validators))
+        emit("fetched", url=str(response.url), status_code=response.status_code, bytes=page.size,
+             truncated=page.truncated, fetch_ms=round((time.perf_counter() - start) * 1000, 3))
+        if response.status_code == 304 and validators:
+            fresh = {key: value for key, value in response_validators(response, page.content_hash).items()
+                     if value and key != "content_hash"}
+            return await reuse_unchanged_analysis(url_str, cache_variant, {**validators, **fresh}, "304 Not Modified")
+        response.raise_for_status()
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(url_str, headers=headers)
-            response.raise_for_status()
-            
-            # Check if we got a minimal HTML with JS redirect
-            if len(response.text) < 500 and 'window.location' in response.text:
-                logger.info(f"🔄 Detected JS redirect, attempting to follow...")
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Try to extract redirect URL from common patterns
-                script_tags = soup.find_all('script')
-                for script in script_tags:
-                    if script.string and 'window.location' in script.string:
-                        # Simple extraction for window.location.href="..."
-                        import re
-                        match = re.search(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', script.string)
-                        if match:
-                            redirect_path = match.group(1)
-                            # Handle relative URLs
-                            if redirect_path.startswith('/'):
-                                from urllib.parse import urlparse
-                                parsed = urlparse(url_str)
-                                redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_path}"
-                            else:
-                                redirect_url = redirect_path
-                            
-                            logger.info(f"🔄 Following redirect to: {redirect_url}")
-                            response = await client.get(redirect_url, headers=headers)
-                            response.raise_for_status()
-                            break
+        fetched_validators = response_validators(response, page.content_hash)
+        if validators and fetched_validators["content_hash"] == validators.get("content_hash"):
+            return await reuse_unchanged_analysis(url_str, cache_variant, {**validators, **fetched_validators}, "same content hash")
+        
+        # Check if we got a minimal HTML with JS redirect
+        js_redirected = False
+        if page.size < 500 and "js_redirect" in page.markers:
+            logger.info(f"🔄 Detected JS redirect, attempting to follow...")
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(page.text, 'html.parser')
             
-        logger.info(f"📄 Fetched {len(response.text)} characters of HTML")
+            # Try to extract redirect URL from common patterns
+            script_tags = soup.find_all('script')
+            for script in script_tags:
+                if script.string and 'window.location' in script.string:
+                    # Simple extraction for window.location.href="..."
+                    import re
+                    match = re.search(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', script.string)
+                    if match:
+                        redirect_path = match.group(1)
+                        # Handle relative URLs
+                        if redirect_path.startswith('/'):
+                            from urllib.parse import urlparse
+                            parsed = urlparse(url_str)
+                            redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_path}"
+                        else:
+                            redirect_url = redirect_path
+                        
+                        logger.info(f"🔄 Following redirect to: {redirect_url}")
+                        response, page = await fetch_html(client, redirect_url)
+                        response.raise_for_status()
+                        js_redirected = True
+                        break
+        
+        logger.info(f"📄 Fetched {page.size} bytes of HTML ({page.encoding})")
+        
+        # Parse the static HTML first - the SPA detector reads its features
+        start = time.perf_counter()
+        features = await offload(extract_page_features, page.text, size=page.size)
+        extract_ms = (time.perf_counter() - start) * 1000
         
         # Check if this is a heavily JS-rendered site
-        is_js_heavy = (
-            len(response.text) < 1000 and 
-            ('<div id="root"></div>' in response.text or 
-             '<div id="app"></div>' in response.text or
-             'defer' in response.text.lower())
-        )
+        spa = detect_spa(page.text, features, markers=page.markers)
+        is_js_heavy = spa.is_spa
+        emit("parsed", url=url_str, extract_ms=round(extract_ms, 3), word_count=features.word_count,
+             spa_score=spa.score)
+        if is_js_heavy:
+            logger.info(f"🕸️ SPA score {spa.score} for {url_str} (signals: {spa.signals})")
         
         # Use JavaScript rendering if needed and enabled
-        html_content = response.text
         js_rendering_warning = None
+        js_rendered = False
+        render_decision = await cache_manager.get_render_decision(url_str) if is_js_heavy else None
         
-        if is_js_heavy and request.use_js_rendering and PLAYWRIGHT_AVAILABLE:
+        if is_js_heavy and request.use_js_rendering and render_decision and not render_decision["changed"]:
+            # The last render on this site found nothing the static HTML didn't have
+            logger.info(f"⏭️ Skipping JavaScript rendering for {url_str} - it didn't change the last analysis of this site")
+            emit("render_skipped", url=url_str, reason="rendering didn't change this site's last analysis")
+            is_js_heavy = False
+        elif is_js_heavy and request.use_js_rendering and PLAYWRIGHT_AVAILABLE:
             logger.info(f"🎭 Using JavaScript rendering for {url_str}")
+            emit("rendering", url=url_str)
             try:
-                js_result = await fetch_with_js(url_str, timeout=30000)
-                html_content = js_result['html']
+                # Lightweight render: stylesheets only load when a layout-dependent rule is selected
+                keep_css = default_engine.needs_css(
+                    default_engine.select(request.profile, request.rules, request.skip_rules)
+                )
+                js_result = await fetch_with_js(url_str, timeout=30000, keep_css=keep_css)
                 is_js_heavy = False  # We now have the rendered content
-                logger.info(f"✅ JavaScript rendering successful - {len(html_content)} chars")
+                js_rendered = True
+                logger.info(f"✅ JavaScript rendering successful - {len(js_result['html'])} chars, "
+                            f"{js_result.get('blocked_requests', 0)} requests blocked")
+                
+                start = time.perf_counter()
+                rendered_features = await offload(extract_page_features, js_result['html'], size=len(js_result['html']))
+                extract_ms += (time.perf_counter() - start) * 1000
+                await cache_manager.set_render_decision(
+                    url_str, rendering_changed(features, rendered_features), spa.score
+                )
+                features = rendered_features
+                emit("rendered", url=url_str, render_ms=js_result.get('render_ms'),
+                     blocked_requests=js_result.get('blocked_requests', 0), word_count=features.word_count)
+            except RenderQueueFull as e:
+                logger.warning(f"⚠️ Render pool saturated ({e}) - analyzing static HTML")
+                js_rendering_warning = "JavaScript rendering is at capacity - analyzing static HTML only"
             except Exception as e:
                 logger.error(f"❌ JavaScript rendering failed: {e}")
                 logger.warning(f"⚠️ Falling back to static HTML analysis")
@@ -183,9 +441,33 @@ async def analyze_website(request: WebsiteAnalysisRequest, background_tasks: Bac
             logger.warning(f"⚠️ Detected JavaScript-heavy site - analysis may be limited")
             js_rendering_warning = "This site appears to be JavaScript-heavy. Enable JS rendering for more accurate analysis."
         
-        # Analyze the HTML content
-        entities = await detect_seo_entities(url_str, html_content, is_js_heavy)
+        if page.truncated:
+            truncation_warning = f"Page HTML was cut off after {page.size:,} bytes - content past that point was not analyzed."
+            js_rendering_warning = f"{js_rendering_warning} {truncation_warning}" if js_rendering_warning else truncation_warning
+        
+        # Analyze the page
+        rule_timings = {"extract_features": round(extract_ms, 3)}
+        entities, page_timings = await evaluate_page_features(
+            url_str, features, is_js_heavy,
+            request.profile, request.rules, request.skip_rules
+        )
+        add_timings(rule_timings, page_timings)
         haunting_score = calculate_haunting_score(entities)
+        pages_analyzed = 1
+        if listening():
+            emit("entities", url=url_str, haunting_score=haunting_score,
+                 entities=[entity.model_dump(mode="json") for entity in entities])
+        
+        # Deeper audits crawl the rest of the site, analyzing pages as they arrive
+        if request.depth > 1:
+            crawl = await crawl_and_analyze(
+                str(response.url), [href for href, _ in features.links], request
+            )
+            entities.extend(crawl["entities"])
+            add_timings(rule_timings, crawl["timings"])
+            page_scores = [haunting_score] + crawl["scores"]
+            haunting_score = round(sum(page_scores) / len(page_scores))
+            pages_analyzed += crawl["pages"]
         
         analysis = SEOAnalysisResponse(
             url=url_str,
@@ -194,19 +476,25 @@ async def analyze_website(request: WebsiteAnalysisRequest, background_tasks: Bac
             recommendations=generate_exorcism_recommendations(entities),
             analysis_timestamp=datetime.now(),
             exorcism_available=len(entities) > 0,
-            warning=js_rendering_warning
+            warning=js_rendering_warning,
+            rule_timings=rule_timings,
+            pages_analyzed=pages_analyzed
         )
         
         # Cache the result
-        analysis_cache[url_str] = analysis
+        analysis_data = analysis.model_dump(mode="json")
+        await cache_manager.set_analysis(url_str, analysis_data, variant=cache_variant)
+        if request.depth == 1 and not js_rendered and not js_redirected:
+            # JS-rendered content can change while the HTML shell stays the same, and
+            # a redirect stub's validators say nothing about the page it points to
+            await cache_manager.set_validators(url_str, {**fetched_validators, "analysis": analysis_data}, cache_variant)
         
-        # Schedule background competitive analysis if requested
-        if request.include_competitors:
-            background_tasks.add_task(analyze_competitors, url_str)
-        
-        logger.info(f"✅ Analysis complete for {url_str} - Haunting Score: {haunting_score}")
+        logger.info(f"✅ Analysis complete for {url_str} ({pages_analyzed} pages) - Haunting Score: {haunting_score}")
         return analysis
         
+    except asyncio.CancelledError:
+        logger.info(f"🛑 Analysis of {url_str} cancelled - no requests waiting on it")
+        raise
     except httpx.RequestError as e:
         logger.error(f"❌ Failed to crawl {url_str}: {e}")
         raise HTTPException(status_code=400, detail=f"Failed to crawl website: {str(e)}")
@@ -214,17 +502,86 @@ async def analyze_website(request: WebsiteAnalysisRequest, background_tasks: Bac
         logger.error(f"💀 Unexpected error analyzing {url_str}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during analysis")
 
+async def reuse_unchanged_analysis(
+    url_str: str,
+    cache_variant: str,
+    validators: Dict[str, Any],
+    reason: str
+) -> SEOAnalysisResponse:
+    """Serve the previous analysis of a page that hasn't changed, refreshing its cache entries"""
+    analysis = SEOAnalysisResponse(**validators["analysis"])
+    analysis.analysis_timestamp = datetime.now()
+    analysis.content_unchanged = True
+    
+    analysis_data = analysis.model_dump(mode="json")
+    await cache_manager.set_analysis(url_str, analysis_data, variant=cache_variant)
+    await cache_manager.set_validators(url_str, {**validators, "analysis": analysis_data}, cache_variant)
+    
+    logger.info(f"♻️ {url_str} unchanged ({reason}) - reusing previous analysis")
+    emit("unchanged", url=url_str, reason=reason)
+    return analysis
+
+def validate_analysis_options(request: WebsiteAnalysisRequest):
+    """Reject unknown rules/profiles and out-of-range crawl budgets with a 400"""
+    try:
+        default_engine.select(request.profile, request.rules, request.skip_rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.depth < 1 or not 1 <= request.max_pages <= CRAWL_MAX_PAGES_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"depth must be >= 1 and max_pages between 1 and {CRAWL_MAX_PAGES_LIMIT}"
+        )
+
+async def revalidate_analysis(request: WebsiteAnalysisRequest, cache_variant: str):
+    """Start the background refresh of a stale analysis, unless this or another worker already is"""
+    flight_key = analysis_flight_key(request)
+    if analysis_flights.running(flight_key) or not await cache_manager.claim_refresh(str(request.url), cache_variant):
+        return
+    analysis_flights.start(flight_key, lambda: run_analysis(request, cache_variant))
+    logger.info(f"🔄 Refreshing stale analysis for {request.url} in the background")
+
+def analysis_flight_key(request: WebsiteAnalysisRequest) -> str:
+    """Identity of an analysis run: same page and options share one flight and one event stream"""
+    url_str = str(request.url)
+    return f"{normalize_url(url_str) or url_str}|{analysis_cache_variant(request)}|js={request.use_js_rendering}"
+
+def analysis_cache_variant(request: WebsiteAnalysisRequest) -> str:
+    """Cache variant for an analysis; crawls and partial rule runs are cached separately"""
+    parts = []
+    if request.depth > 1:
+        parts.append(f"depth={request.depth}|max_pages={request.max_pages}")
+    if request.profile != "full" or request.rules or request.skip_rules:
+        rules = ",".join(sorted(request.rules or []))
+        skip_rules = ",".join(sorted(request.skip_rules or []))
+        parts.append(f"profile={request.profile}|rules={rules}|skip={skip_rules}")
+    return "|".join(parts)
+
+@app.get("/api/rules")
+async def list_rules():
+    """List available SEO rules and the profiles they belong to"""
+    return {
+        "profiles": {
+            profile: [rule.name for rule in default_engine.select(profile)]
+            for profile in ("fast", "full")
+        },
+        "rules": [
+            {"name": rule.name, "requires": list(rule.requires), "profiles": list(rule.profiles)}
+            for rule in default_engine.rules.values()
+        ]
+    }
+
 @app.get("/api/entities/{url:path}")
 async def get_entities(url: str):
     """Get detected SEO entities for a specific URL"""
-    if url not in analysis_cache:
+    analysis = await cache_manager.get_analysis(url)
+    if analysis is None:
         raise HTTPException(status_code=404, detail="No analysis found for this URL")
     
-    analysis = analysis_cache[url]
     return {
         "url": url,
-        "entities": analysis.entities,
-        "last_updated": analysis.analysis_timestamp
+        "entities": analysis["entities"],
+        "last_updated": analysis["analysis_timestamp"]
     }
 
 @app.post("/api/exorcise")
@@ -287,203 +644,151 @@ async def health_check():
 @app.get("/api/debug/fetch")
 async def debug_fetch(url: str):
     """Debug endpoint to see what HTML we're actually fetching"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-    }
+    client = get_http_client()
+    response, page = await fetch_html(client, url)
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        response = await client.get(url, headers=headers)
-        
-        # Check for JS redirect
-        if len(response.text) < 500 and 'window.location' in response.text:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            script_tags = soup.find_all('script')
-            for script in script_tags:
-                if script.string and 'window.location' in script.string:
-                    import re
-                    match = re.search(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', script.string)
-                    if match:
-                        redirect_path = match.group(1)
-                        if redirect_path.startswith('/'):
-                            from urllib.parse import urlparse
-                            parsed = urlparse(url)
-                            redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_path}"
-                        else:
-                            redirect_url = redirect_path
-                        response = await client.get(redirect_url, headers=headers)
-                        break
-        
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # Check for JS redirect
+    if page.size < 500 and "js_redirect" in page.markers:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(page.text, 'html.parser')
+        script_tags = soup.find_all('script')
+        for script in script_tags:
+            if script.string and 'window.location' in script.string:
+                import re
+                match = re.search(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', script.string)
+                if match:
+                    redirect_path = match.group(1)
+                    if redirect_path.startswith('/'):
+                        from urllib.parse import urlparse
+                        parsed = urlparse(url)
+                        redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_path}"
+                    else:
+                        redirect_url = redirect_path
+                    response, page = await fetch_html(client, redirect_url)
+                    break
+    
+    features = await offload(extract_page_features, page.text, size=page.size)
     
     return {
         "url": url,
         "status_code": response.status_code,
-        "html_length": len(response.text),
-        "title": soup.find('title').string if soup.find('title') else None,
-        "h1_count": len(soup.find_all('h1')),
-        "meta_description": soup.find('meta', attrs={'name': 'description'}).get('content') if soup.find('meta', attrs={'name': 'description'}) else None,
-        "link_count": len(soup.find_all('a')),
-        "image_count": len(soup.find_all('img')),
-        "html_preview": response.text[:1000]
+        "html_length": len(page.text),
+        "html_bytes": page.size,
+        "encoding": page.encoding,
+        "truncated": page.truncated,
+        "title": features.title,
+        "h1_count": features.heading_counts['h1'],
+        "meta_description": features.meta_description,
+        "link_count": len(features.links),
+        "image_count": features.image_count,
+        "html_preview": page.text[:1000]
     }
 
 # Helper functions
-async def detect_seo_entities(url: str, html_content: str, is_js_heavy: bool = False) -> List[SEOEntity]:
-    """
-    Analyze HTML content and detect SEO entities (ghosts, zombies, etc.)
-    Enhanced with more detailed analysis
-    """
+async def evaluate_page_features(
+    url: str,
+    features: PageFeatures,
+    is_js_heavy: bool = False,
+    profile: str = "full",
+    rules: Optional[List[str]] = None,
+    skip_rules: Optional[List[str]] = None
+) -> Tuple[List[SEOEntity], Dict[str, float]]:
+    """Run the selected rules over already-extracted page features (in the CPU pool for big pages)"""
     entities = []
-    from bs4 import BeautifulSoup
+    timings: Dict[str, float] = {}
     
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Debug logging
-        logger.info(f"🔍 Parsing HTML - Length: {len(html_content)} chars")
-        
-        # Add warning for JS-heavy sites
-        if is_js_heavy:
-            entities.append(SEOEntity(
-                type="phantom",
-                severity="high",
-                title="JavaScript-Rendered Content Detected",
-                description="This site uses heavy JavaScript rendering. Our crawler sees limited content. Consider server-side rendering (SSR) or static site generation (SSG) for better SEO.",
-                url=url,
-                fix_suggestion="Implement SSR/SSG with Next.js, Nuxt.js, or pre-rendering. Ensure critical content is in initial HTML for search engines."
-            ))
-        
-        # Check for missing title
-        title = soup.find('title')
-        logger.info(f"📝 Title found: {title.string if title else 'None'}")
-        if not title or not title.string or len(title.string.strip()) == 0:
-            entities.append(SEOEntity(
-                type="specter",
-                severity="critical",
-                title="Missing Title Tag Specter",
-                description="Page is missing a title tag - critical for SEO",
-                url=url,
-                fix_suggestion="Add <title>Your Page Title Here</title> in the <head> section"
-            ))
-        elif len(title.string) < 30:
-            entities.append(SEOEntity(
-                type="specter",
-                severity="medium",
-                title="Short Title Tag",
-                description=f"Title is only {len(title.string)} characters (recommended: 50-60)",
-                url=url,
-                fix_suggestion="Expand title to 50-60 characters with relevant keywords"
-            ))
-        
-        # Check for missing meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if not meta_desc or not meta_desc.get('content'):
-            # Generate contextual suggestion
-            suggested_desc = "Your compelling page description here"
-            
-            # Try to extract from page content
-            first_p = soup.find('p')
-            if first_p:
-                p_text = first_p.get_text().strip()
-                p_text = ' '.join(p_text.split())
-                if len(p_text) > 50:
-                    suggested_desc = p_text[:157] + "..." if len(p_text) > 157 else p_text
-            
-            entities.append(SEOEntity(
-                type="specter",
-                severity="high",
-                title="Missing Meta Description Specter",
-                description="No meta description found - impacts click-through rates by up to 30%",
-                url=url,
-                fix_suggestion=f'Add a compelling meta description (150-160 characters) that:\n• Summarizes your page content\n• Includes target keywords naturally\n• Encourages clicks with value proposition\n\nSuggested: "{suggested_desc}"\n\nAdd this in your <head> section:\n<meta name="description" content="{suggested_desc}">'
-            ))
-        
-        # Check for missing H1
-        h1_tags = soup.find_all('h1')
-        if len(h1_tags) == 0:
-            entities.append(SEOEntity(
-                type="zombie",
-                severity="high",
-                title="Missing H1 Zombie",
-                description="No H1 heading found - important for page structure",
-                url=url,
-                fix_suggestion="Add a single <h1> tag with your main page heading"
-            ))
-        elif len(h1_tags) > 1:
-            entities.append(SEOEntity(
-                type="zombie",
-                severity="medium",
-                title="Multiple H1 Tags",
-                description=f"Found {len(h1_tags)} H1 tags (recommended: 1 per page)",
-                url=url,
-                fix_suggestion="Use only one H1 tag per page, use H2-H6 for subheadings"
-            ))
-        
-        # Check for images without alt text
-        images = soup.find_all('img')
-        images_without_alt = [img for img in images if not img.get('alt')]
-        if images_without_alt:
-            entities.append(SEOEntity(
-                type="phantom",
-                severity="medium",
-                title="Images Missing Alt Text",
-                description=f"{len(images_without_alt)} of {len(images)} images lack alt text",
-                url=url,
-                fix_suggestion="Add descriptive alt attributes to all images for accessibility and SEO"
-            ))
-        
-        # Check for broken internal links (simplified check)
-        links = soup.find_all('a', href=True)
-        if len(links) < 3:
-            entities.append(SEOEntity(
-                type="zombie",
-                severity="medium",
-                title="Orphaned Page - Few Internal Links",
-                description=f"Only {len(links)} links found - page may be isolated",
-                url=url,
-                fix_suggestion="Add more internal links to improve site navigation and SEO"
-            ))
-        
-        # Check for missing schema markup
-        schema_script = soup.find('script', type='application/ld+json')
-        if not schema_script:
-            entities.append(SEOEntity(
-                type="specter",
-                severity="low",
-                title="Missing Schema Markup",
-                description="No structured data (Schema.org) found",
-                url=url,
-                fix_suggestion="Add JSON-LD structured data for rich snippets"
-            ))
-        
-        # Check content length
-        text_content = soup.get_text()
-        word_count = len(text_content.split())
-        if word_count < 300:
-            entities.append(SEOEntity(
-                type="phantom",
-                severity="high",
-                title="Thin Content Phantom",
-                description=f"Only {word_count} words found (recommended: 300+ for most pages)",
-                url=url,
-                fix_suggestion="Add more comprehensive, valuable content to improve rankings"
-            ))
+        result = await offload(
+            run_default_rules,
+            features,
+            RuleContext(url=url, is_js_heavy=is_js_heavy),
+            profile,
+            rules,
+            skip_rules,
+            size=features.html_length
+        )
+        entities = [SEOEntity(**entity) for entity in result.entities]
+        timings.update(result.timings_ms)
+        if result.errors:
+            raise RuntimeError(f"rules failed: {', '.join(result.errors)}")
         
     except Exception as e:
-        logger.error(f"Error parsing HTML: {e}")
-        entities.append(SEOEntity(
-            type="ghost",
-            severity="high",
-            title="Analysis Error",
-            description="Could not fully analyze page structure",
-            url=url,
-            fix_suggestion="Ensure page is accessible and has valid HTML"
-        ))
-    
-    return entities
+        logger.error(f"Error analyzing page features: {e}")
+        entities.append(analysis_error_entity(url))
+    
+    return entities, timings
+
+def analysis_error_entity(url: str) -> SEOEntity:
+    return SEOEntity(
+        type="ghost",
+        severity="high",
+        title="Analysis Error",
+        description="Could not fully analyze page structure",
+        url=url,
+        fix_suggestion="Ensure page is accessible and has valid HTML"
+    )
+
+def add_timings(totals: Dict[str, float], timings: Dict[str, float]):
+    """Accumulate per-rule timings (ms) across pages"""
+    for name, elapsed_ms in timings.items():
+        totals[name] = round(totals.get(name, 0) + elapsed_ms, 3)
+
+async def crawl_and_analyze(
+    start_url: str,
+    seed_links: List[str],
+    request: WebsiteAnalysisRequest
+) -> Dict[str, Any]:
+    """
+    Crawl the site behind an already-analyzed start page
+    
+    Each page is run through the rule engine as soon as the crawler yields
+    it, so only the compact per-page results are kept in memory.
+    
+    Returns:
+        Dict with entities, per-page haunting scores, summed rule timings
+        and the number of pages crawled (excluding the start page)
+    """
+    crawler = SiteCrawler(
+        httpx_fetcher(get_http_client()),
+        max_pages=request.max_pages,
+        max_depth=request.depth - 1
+    )
+    entities: List[SEOEntity] = []
+    scores: List[int] = []
+    timings: Dict[str, float] = {}
+    pages = 0
+    
+    start = time.perf_counter()
+    async for page in crawler.crawl(start_url, seed_links=seed_links):
+        pages += 1
+        if page.is_broken:
+            status = page.status_code or "unreachable"
+            page_entities = [SEOEntity(
+                type="ghost",
+                severity="high",
+                title="Broken Internal Page",
+                description=f"Internal link leads to a page returning {status}",
+                url=page.url,
+                fix_suggestion="Restore the page, 301-redirect it to a relevant page, or remove links pointing to it"
+            )]
+        elif page.features is None:
+            continue  # Non-HTML resource
+        else:
+            page_entities, page_timings = await evaluate_page_features(
+                page.url, page.features, False,
+                request.profile, request.rules, request.skip_rules
+            )
+            add_timings(timings, page_timings)
+        entities.extend(page_entities)
+        scores.append(calculate_haunting_score(page_entities))
+        report_progress(pages / max(1, request.max_pages - 1), f"Crawled {pages} pages")
+        if listening():
+            emit("page", url=page.url, depth=page.depth, status_code=page.status_code, pages=pages,
+                 haunting_score=scores[-1], entities=[entity.model_dump(mode="json") for entity in page_entities])
+    
+    timings["crawl"] = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"🕸️ Crawled {pages} additional pages of {start_url} in {timings['crawl'] / 1000:.1f}s")
+    return {"entities": entities, "scores": scores, "timings": timings, "pages": pages}
 
 def calculate_haunting_score(entities: List[SEOEntity]) -> int:
     """Calculate overall haunting score based on detected entities"""
@@ -514,13 +819,6 @@ def generate_exorcism_recommendations(entities: List[SEOEntity]) -> List[str]:
     
     return recommendations
 
-async def analyze_competitors(url: str):
-    """Background task for competitive analysis"""
-    logger.info(f"🔍 Starting competitive analysis for {url}")
-    # Implement competitor analysis logic
-    await asyncio.sleep(5)  # Mock processing time
-    logger.info(f"✅ Competitive analysis complete for {url}")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -542,6 +840,28 @@ class CompetitorAnalysisRequest(BaseModel):
 class AlgorithmDetectionRequest(BaseModel):
     url: HttpUrl
 
+class RankingPoint(BaseModel):
+    keyword: str
+    date: datetime
+    position: float
+    url: str = ""
+    search_volume: int = 0
+    ctr: float = 0.0
+
+class RankingHistoryRequest(BaseModel):
+    points: List[RankingPoint]
+
+@app.post("/api/rankings/history")
+async def add_ranking_history(request: RankingHistoryRequest):
+    """
+    Record daily keyword positions for predictions and algorithm detection
+    A day already recorded for a keyword is overwritten
+    """
+    added = ranking_history.append_points(request.points)
+    if ranking_history.path:
+        ranking_history.schedule_save()  # debounced; shutdown flushes the rest
+    return {"added": added, **ranking_history.get_stats()}
+
 @app.post("/api/predict-rankings")
 async def predict_rankings(request: PredictRankingsRequest):
     """
@@ -555,8 +875,7 @@ async def predict_rankings(request: PredictRankingsRequest):
             PerformanceForecaster
         )
         
-        # Generate mock historical data for demo
-        # In production, this would come from a database
+        # Keywords without tracked history get simulated demo data
         from datetime import timedelta
         historical_data = []
         base_date = datetime.now() - timedelta(days=30)
@@ -575,38 +894,40 @@ async def predict_rankings(request: PredictRankingsRequest):
         model = PredictiveRankingModel()
         forecaster = PerformanceForecaster()
         
-        # Generate predictions
-        predictions = []
-        keywords = request.keywords if request.keywords else ["example keyword"]
-        
-        for keyword in keywords[:5]:  # Limit to 5 keywords
-            prediction = model.predict_ranking(historical_data, days_ahead=30)
-            if prediction:
-                predictions.append({
-                    "keyword": keyword,
-                    "current_position": prediction.current_position,
-                    "predicted_position": prediction.predicted_position,
-                    "confidence_lower": prediction.confidence_lower,
-                    "confidence_upper": prediction.confidence_upper,
-                    "confidence_level": round(prediction.confidence_level * 100),
-                    "trend": prediction.trend,
-                    "prediction_date": prediction.prediction_date.isoformat()
-                })
+        # Generate predictions for every keyword in one vectorized pass
+        keywords = (
+            request.keywords or ranking_history.keywords(url=site_host(str(request.url))) or ["example keyword"]
+        )[:5]  # Limit to 5 keywords
+        tracked = [keyword for keyword in keywords if keyword in ranking_history]
+        demo = [keyword for keyword in keywords if keyword not in ranking_history]
+        predicted = model.predict_from_history(ranking_history, tracked, days_ahead=30) if tracked else []
+        by_keyword = {
+            prediction.keyword: prediction
+            for prediction in predicted + model.predict_rankings({keyword: historical_data for keyword in demo}, days_ahead=30)
+            if prediction
+        }
+        results = [by_keyword[keyword] for keyword in keywords if keyword in by_keyword]
+        predictions = [
+            {
+                "keyword": prediction.keyword,
+                "current_position": prediction.current_position,
+                "predicted_position": prediction.predicted_position,
+                "confidence_lower": prediction.confidence_lower,
+                "confidence_upper": prediction.confidence_upper,
+                "confidence_level": round(prediction.confidence_level * 100),
+                "trend": prediction.trend,
+                "prediction_date": prediction.prediction_date.isoformat()
+            }
+            for prediction in results
+        ]
         
         # Generate traffic forecast
-        if predictions:
-            traffic_forecast = forecaster.forecast_traffic([
-                type('obj', (object,), {
-                    'current_position': p['current_position'],
-                    'predicted_position': p['predicted_position']
-                })() for p in predictions
-            ])
-        else:
-            traffic_forecast = None
+        traffic_forecast = forecaster.forecast_traffic(results, history=ranking_history) if results else None
         
         return {
             "url": str(request.url),
             "predictions": predictions,
+            "demo_keywords": demo,
             "traffic_forecast": traffic_forecast,
             "generated_at": datetime.now().isoformat()
         }
@@ -633,27 +954,36 @@ async def detect_algorithm_updates(request: AlgorithmDetectionRequest):
             RankingDataPoint
         )
         
-        # Generate mock historical data showing volatility
-        from datetime import timedelta
-        historical_data = []
-        base_date = datetime.now() - timedelta(days=14)
+        detector = AlgorithmUpdateDetector()
         
-        # Simulate algorithm update impact (sudden drop)
-        for i in range(14):
-            if i < 7:
-                position = 8  # Stable before update
-            else:
-                position = 15  # Dropped after update
-            
-            historical_data.append(RankingDataPoint(
-                date=base_date + timedelta(days=i),
-                keyword="example keyword",
-                position=position,
-                url=str(request.url)
-            ))
+        # Check every tracked keyword for the site and report the strongest signal
+        updates = [
+            detector.detect_from_history(ranking_history, keyword)
+            for keyword in ranking_history.keywords(url=site_host(str(request.url)))
+        ]
+        update = max((u for u in updates if u), key=lambda u: u.confidence, default=None)
         
-        detector = AlgorithmUpdateDetector()
-        update = detector.detect_algorithm_update(historical_data)
+        # Without tracked history, fall back to simulated demo data
+        if not updates:
+            from datetime import timedelta
+            historical_data = []
+            base_date = datetime.now() - timedelta(days=14)
+            
+            # Simulate algorithm update impact (sudden drop)
+            for i in range(14):
+                if i < 7:
+                    position = 8  # Stable before update
+                else:
+                    position = 15  # Dropped after update
+                
+                historical_data.append(RankingDataPoint(
+                    date=base_date + timedelta(days=i),
+                    keyword="example keyword",
+                    position=position,
+                    url=str(request.url)
+                ))
+            
+            update = detector.detect_algorithm_update(historical_data)
         
         if update:
             return {
@@ -684,6 +1014,45 @@ async def detect_algorithm_updates(request: AlgorithmDetectionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/algorithm-volatility")
+async def algorithm_volatility(url: Optional[str] = None, days: int = 90):
+    """
+    Scan the tracked portfolio for industry-wide ranking shifts
+    Returns the daily volatility index and every detected update
+    """
+    from predictive_analytics import AlgorithmUpdateDetector
+    
+    keywords = ranking_history.keywords(url=site_host(url) if url else None)
+    latest = [ranking_history.latest(keyword) for keyword in keywords]
+    last_day = max((series.dates[0] for series in latest if series is not None), default=None)
+    if last_day is None:
+        raise HTTPException(status_code=404, detail="No ranking history recorded" + (f" for {url}" if url else ""))
+    start = last_day - (max(1, days) - 1)
+    
+    # The store isn't thread-safe: copy the window out on the loop, run only the NumPy scan in a thread
+    names, calendar, positions = ranking_history.aligned(keywords, start)
+    urls = [ranking_history.url(name) for name in names]
+    scan = await asyncio.to_thread(AlgorithmUpdateDetector().scan_positions, names, calendar, positions, urls)
+    return {
+        "keywords_scanned": scan.keywords_scanned,
+        "volatility_index": [
+            {"date": day.date().isoformat(), "index": index, "affected_share": share}
+            for day, index, share in zip(scan.dates, scan.volatility_index, scan.affected_share)
+        ],
+        "updates": [
+            {
+                "date": update.date.date().isoformat(),
+                "name": update.name,
+                "confidence": update.confidence,
+                "impact_score": update.impact_score,
+                "affected_keywords": update.affected_keywords,
+                "affected_domains": update.affected_domains,
+                "recovery_strategy": update.recovery_strategy
+            }
+            for update in scan.updates
+        ]
+    }
+
 @app.post("/api/analyze-competitors")
 async def analyze_competitors(request: CompetitorAnalysisRequest):
     """
@@ -691,72 +1060,79 @@ async def analyze_competitors(request: CompetitorAnalysisRequest):
     MCP Tool: analyze_competitors
     """
     try:
-        # Analyze your site
-        your_analysis = await analyze_website(
-            WebsiteAnalysisRequest(url=request.your_url, depth=1),
-            BackgroundTasks()
-        )
-        
-        # Analyze competitors
-        competitor_results = []
-        for comp_url in request.competitor_urls[:3]:  # Limit to 3 competitors
-            try:
-                comp_analysis = await analyze_website(
-                    WebsiteAnalysisRequest(url=comp_url, depth=1),
-                    BackgroundTasks()
-                )
-                
-                # Calculate threat level
-                score_diff = your_analysis.haunting_score - comp_analysis.haunting_score
-                if score_diff > 20:
-                    threat_level = "Low - You're ahead"
-                elif score_diff > 0:
-                    threat_level = "Medium - Close competition"
-                elif score_diff > -20:
-                    threat_level = "High - They're ahead"
-                else:
-                    threat_level = "Critical - Significant gap"
-                
-                competitor_results.append({
-                    "url": str(comp_url),
-                    "score": comp_analysis.haunting_score,
-                    "threat_level": threat_level,
-                    "entity_count": len(comp_analysis.entities)
-                })
-            except Exception as e:
-                logger.error(f"Error analyzing competitor {comp_url}: {e}")
-                continue
-        
-        # Identify gaps and opportunities
-        gaps = [
-            "Content depth - competitors have more comprehensive pages",
-            "Schema markup - competitors using structured data",
-            "Internal linking - competitors have better site structure",
-            "Page speed - competitors load faster",
-            "Mobile optimization - competitors have better mobile UX"
-        ]
-        
-        opportunities = [
-            "Add FAQ schema to capture featured snippets",
-            "Improve internal linking between related pages",
-            "Optimize images to improve page speed",
-            "Create pillar content for main topics",
-            "Build backlinks from industry publications"
-        ]
-        
-        return {
-            "your_url": str(request.your_url),
-            "your_score": your_analysis.haunting_score,
-            "competitors": competitor_results,
-            "gaps": gaps[:3],
-            "opportunities": opportunities[:5],
-            "analysis_date": datetime.now().isoformat()
-        }
-        
+        return await run_competitor_analysis(request)
     except Exception as e:
         logger.error(f"Competitor analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_competitor_analysis(request: CompetitorAnalysisRequest) -> Dict[str, Any]:
+    """Score your site against up to 3 competitors (shared by the endpoint and job)"""
+    competitor_urls = request.competitor_urls[:3]  # Limit to 3 competitors
+    steps = len(competitor_urls) + 1
+    
+    # Analyze your site
+    your_analysis = await analyze_website(
+        WebsiteAnalysisRequest(url=request.your_url, depth=1),
+        BackgroundTasks()
+    )
+    report_progress(1 / steps, "Analyzed your site")
+    
+    # Analyze competitors
+    competitor_results = []
+    for done, comp_url in enumerate(competitor_urls, start=2):
+        try:
+            comp_analysis = await analyze_website(
+                WebsiteAnalysisRequest(url=comp_url, depth=1),
+                BackgroundTasks()
+            )
+            
+            # Calculate threat level
+            score_diff = your_analysis.haunting_score - comp_analysis.haunting_score
+            if score_diff > 20:
+                threat_level = "Low - You're ahead"
+            elif score_diff > 0:
+                threat_level = "Medium - Close competition"
+            elif score_diff > -20:
+                threat_level = "High - They're ahead"
+            else:
+                threat_level = "Critical - Significant gap"
+            
+            competitor_results.append({
+                "url": str(comp_url),
+                "score": comp_analysis.haunting_score,
+                "threat_level": threat_level,
+                "entity_count": len(comp_analysis.entities)
+            })
+        except Exception as e:
+            logger.error(f"Error analyzing competitor {comp_url}: {e}")
+        report_progress(done / steps, f"Analyzed {done - 1} of {len(competitor_urls)} competitors")
+    
+    # Identify gaps and opportunities
+    gaps = [
+        "Content depth - competitors have more comprehensive pages",
+        "Schema markup - competitors using structured data",
+        "Internal linking - competitors have better site structure",
+        "Page speed - competitors load faster",
+        "Mobile optimization - competitors have better mobile UX"
+    ]
+    
+    opportunities = [
+        "Add FAQ schema to capture featured snippets",
+        "Improve internal linking between related pages",
+        "Optimize images to improve page speed",
+        "Create pillar content for main topics",
+        "Build backlinks from industry publications"
+    ]
+    
+    return {
+        "your_url": str(request.your_url),
+        "your_score": your_analysis.haunting_score,
+        "competitors": competitor_results,
+        "gaps": gaps[:3],
+        "opportunities": opportunities[:5],
+        "analysis_date": datetime.now().isoformat()
+    }
+
 
 @app.post("/api/page-speed")
 async def check_page_speed(request: Dict[str, str]):
@@ -815,7 +1191,7 @@ async def check_page_speed(request: Dict[str, str]):
 
 
 @app.post("/api/broken-links")
-async def find_broken_links(request: Dict[str, str]):
+async def find_broken_links(request: Dict[str, Any]):
     """
     Find all broken links (ghosts) on a website
     MCP Tool: find_broken_links
@@ -823,45 +1199,29 @@ async def find_broken_links(request: Dict[str, str]):
     url = request.get("url")
     if not url:
         raise HTTPException(status_code=400, detail="URL is required")
+    budget = request.get("max_links")
+    if budget is not None and (isinstance(budget, bool) or not isinstance(budget, int) or budget < 1):
+        raise HTTPException(status_code=400, detail="max_links must be a positive integer")
     
     try:
-        # Fetch and analyze the page
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(url)
-            html = response.text
-        
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        from link_checker import find_broken
         
-        # Find all links
-        links = soup.find_all('a', href=True)
-        broken_links = []
+        # Fetch and analyze the page
+        client = get_http_client()
+        response, page = await fetch_html(client, url)
+        features = await offload(extract_page_features, page.text, size=page.size)
         
-        # Check first 20 links for demo (full crawl would take too long)
-        for link in links[:20]:
-            href = link['href']
-            if href.startswith(('http://', 'https://')):
-                try:
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        check_response = await client.head(href)
-                        if check_response.status_code >= 400:
-                            broken_links.append({
-                                "url": href,
-                                "status": check_response.status_code,
-                                "text": link.get_text(strip=True)[:50]
-                            })
-                except Exception:
-                    broken_links.append({
-                        "url": href,
-                        "status": "unreachable",
-                        "text": link.get_text(strip=True)[:50]
-                    })
+        # Check every link concurrently, up to the configured budget
+        anchors = features.links
+        result = await find_broken(client, anchors, str(response.url), budget=budget)
         
         return {
             "url": url,
-            "broken_links": broken_links,
-            "total_links_checked": min(len(links), 20),
-            "ghost_count": len(broken_links)
+            "broken_links": result["broken_links"],
+            "total_links_found": result["total_links_found"],
+            "total_links_checked": result["total_links_checked"],
+            "budget_exhausted": result["budget_exhausted"],
+            "ghost_count": len(result["broken_links"])
         }
         
     except Exception as e:
@@ -880,49 +1240,129 @@ async def get_seo_recommendations(request: Dict[str, str]):
         raise HTTPException(status_code=400, detail="URL is required")
     
     try:
-        # Get analysis first
-        analysis = await analyze_website(
-            WebsiteAnalysisRequest(url=url, depth=1),
-            BackgroundTasks()
-        )
-        
-        # Generate prioritized recommendations
-        quick_wins = []
-        long_term = []
-        
-        for entity in analysis.entities:
-            if entity.severity in ["critical", "high"]:
-                quick_wins.append(f"{entity.title}: {entity.fix_suggestion}")
-            else:
-                long_term.append(f"{entity.title}: {entity.fix_suggestion}")
-        
-        # Add general recommendations
-        if not quick_wins:
-            quick_wins = [
-                "Add meta descriptions to all pages",
-                "Optimize images with alt text",
-                "Improve internal linking structure",
-                "Fix broken links (404 errors)",
-                "Add schema markup for rich snippets"
-            ]
-        
-        if not long_term:
-            long_term = [
-                "Create comprehensive pillar content",
-                "Build high-quality backlinks",
-                "Improve Core Web Vitals scores",
-                "Implement progressive web app features",
-                "Develop content marketing strategy"
-            ]
-        
-        return {
-            "url": url,
-            "haunting_score": analysis.haunting_score,
-            "quick_wins": quick_wins[:5],
-            "long_term": long_term[:5],
-            "priority": "high" if analysis.haunting_score > 60 else "medium"
-        }
-        
+        return await build_recommendations(url)
     except Exception as e:
         logger.error(f"Recommendations error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+async def build_recommendations(url: str) -> Dict[str, Any]:
+    """Quick wins and long-term fixes for a URL (shared by the endpoint and job)"""
+    # Get analysis first
+    analysis = await analyze_website(
+        WebsiteAnalysisRequest(url=url, depth=1),
+        BackgroundTasks()
+    )
+    
+    # Generate prioritized recommendations
+    quick_wins = []
+    long_term = []
+    
+    for entity in analysis.entities:
+        if entity.severity in ["critical", "high"]:
+            quick_wins.append(f"{entity.title}: {entity.fix_suggestion}")
+        else:
+            long_term.append(f"{entity.title}: {entity.fix_suggestion}")
+    
+    # Add general recommendations
+    if not quick_wins:
+        quick_wins = [
+            "Add meta descriptions to all pages",
+            "Optimize images with alt text",
+            "Improve internal linking structure",
+            "Fix broken links (404 errors)",
+            "Add schema markup for rich snippets"
+        ]
+    
+    if not long_term:
+        long_term = [
+            "Create comprehensive pillar content",
+            "Build high-quality backlinks",
+            "Improve Core Web Vitals scores",
+            "Implement progressive web app features",
+            "Develop content marketing strategy"
+        ]
+    
+    return {
+        "url": url,
+        "haunting_score": analysis.haunting_score,
+        "quick_wins": quick_wins[:5],
+        "long_term": long_term[:5],
+        "priority": "high" if analysis.haunting_score > 60 else "medium"
+    }
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# Submit long-running audits, then poll GET /api/jobs/{id} for progress
+# ============================================================================
+
+class RecommendationsRequest(BaseModel):
+    url: HttpUrl
+
+class JobRequest(BaseModel):
+    kind: str  # "analyze", "competitors" or "recommendations"
+    params: Dict[str, Any]
+
+# Params of each job kind are validated against the matching request model
+JOB_PARAM_MODELS = {
+    "analyze": WebsiteAnalysisRequest,
+    "competitors": CompetitorAnalysisRequest,
+    "recommendations": RecommendationsRequest,
+}
+
+@job_runner.handler("analyze")
+async def analyze_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    analysis = await analyze_website(WebsiteAnalysisRequest(**params), BackgroundTasks())
+    return analysis.model_dump(mode="json")
+
+@job_runner.handler("competitors")
+async def competitors_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    return await run_competitor_analysis(CompetitorAnalysisRequest(**params))
+
+@job_runner.handler("recommendations")
+async def recommendations_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    return await build_recommendations(str(RecommendationsRequest(**params).url))
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue an analysis, competitor analysis or recommendations job
+    Returns immediately with the job id; audit cost no longer blocks the request
+    """
+    model = JOB_PARAM_MODELS.get(request.kind)
+    if model is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job kind '{request.kind}' (expected one of {', '.join(JOB_PARAM_MODELS)})"
+        )
+    try:
+        params = model(**request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.kind == "analyze":
+        validate_analysis_options(params)
+    
+    job = job_runner.submit(request.kind, params.model_dump(mode="json"))
+    return {"job_id": job.id, "status": job.status, "poll_url": f"/api/jobs/{job.id}"}
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Recent jobs, newest first"""
+    jobs = job_runner.store.list(status=status, limit=min(max(1, limit), 500))
+    return {"jobs": [job.to_dict() for job in jobs], "stats": job_runner.get_stats()}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, progress (0-1) and, once finished, its result or error"""
+    job = job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -3,30 +3,188 @@ Performance Optimization Module for RankBeacon SEO Exorcist
 Task 10.2: Implement caching strategies and optimize performance
 """
 
-from typing import Dict, Any, Optional, List, Callable
-from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Callable, Tuple, Awaitable, TypeVar
 from functools import wraps
 import hashlib
+import heapq
 import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
 import time
+import zlib
 import asyncio
 from collections import OrderedDict
 
+from url_utils import normalize_url, site_host
+
+logger = logging.getLogger(__name__)
+
+# The shared cache tier talks to Redis through the optional `redis` package (its asyncio client)
+try:
+    import redis
+    import redis.asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+T = TypeVar("T")
+
+# Cache settings (override with environment variables)
+CACHE_TTL_ANALYSIS = int(os.getenv("CACHE_TTL_ANALYSIS", "3600"))
+# After CACHE_TTL_ANALYSIS an analysis is stale: still served, refreshed in the background, for this much longer
+CACHE_STALE_ANALYSIS = int(os.getenv("CACHE_STALE_ANALYSIS", "21600"))
+CACHE_TTL_JITTER = float(os.getenv("CACHE_TTL_JITTER", "0.1"))  # TTLs are shortened by up to this fraction
+CACHE_REFRESH_LEASE = int(os.getenv("CACHE_REFRESH_LEASE", "120"))  # seconds one worker owns a background refresh
+CACHE_TTL_PREDICTION = int(os.getenv("CACHE_TTL_PREDICTION", "86400"))
+CACHE_TTL_COMPETITOR = int(os.getenv("CACHE_TTL_COMPETITOR", "21600"))
+CACHE_TTL_VALIDATORS = int(os.getenv("CACHE_TTL_VALIDATORS", "604800"))
+CACHE_TTL_RENDER_DECISION = int(os.getenv("CACHE_TTL_RENDER_DECISION", "604800"))
+CACHE_ANALYSIS_MAX_ENTRIES = int(os.getenv("CACHE_ANALYSIS_MAX_ENTRIES", "1000"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))  # default bound for every TTL cache
+# Approximate memory budgets per in-memory cache layer (JSON-serialized size)
+CACHE_ANALYSIS_MAX_BYTES = int(os.getenv("CACHE_ANALYSIS_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_LAYER_MAX_BYTES = int(os.getenv("CACHE_LAYER_MAX_BYTES", str(64 * 1024 * 1024)))
+# Admission policy for the analysis and entity caches: lru (admit everything) or tinylfu
+CACHE_ADMISSION = os.getenv("CACHE_ADMISSION", "lru")
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH", "")  # empty = memory only
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "100000"))
+# Cache tier shared by every worker: redis://host:port/db, memory:// (single process), empty = off
+CACHE_SHARED_URL = os.getenv("CACHE_SHARED_URL", "")
+CACHE_SHARED_TIMEOUT = float(os.getenv("CACHE_SHARED_TIMEOUT", "0.25"))  # seconds per round trip
+CACHE_SHARED_RETRY = float(os.getenv("CACHE_SHARED_RETRY", "5"))  # seconds to skip the tier after an error
+CACHE_SHARED_COMPRESS_BYTES = int(os.getenv("CACHE_SHARED_COMPRESS_BYTES", "16384"))
+
+
+def json_size(value: Any) -> int:
+    """Approximate memory cost of a cached value: the length of its compact JSON"""
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+def encode_cache_value(value: Any, compress_bytes: int = CACHE_SHARED_COMPRESS_BYTES) -> bytes:
+    """
+    Serialize a value for the shared tier
+    
+    Compact JSON, zlib-compressed once it is bigger than compress_bytes
+    (full audits shrink several times over, which is network time saved on
+    every worker's read). A one-byte tag says which.
+    """
+    payload = json.dumps(value, separators=(",", ":")).encode()
+    if len(payload) > compress_bytes:
+        return b"z" + zlib.compress(payload, 1)
+    return b"j" + payload
+
+
+def decode_cache_value(payload: bytes) -> Any:
+    """Inverse of encode_cache_value"""
+    body = payload[1:]
+    if payload[:1] == b"z":
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+class TinyLFU:
+    """
+    Frequency-based cache admission filter (TinyLFU)
+    
+    A count-min sketch estimates how often each key has been requested
+    recently. When a full cache would have to evict to admit a new key, the
+    newcomer only gets in if it has been requested more often than the
+    entry it would displace, so a batch job touching thousands of one-off
+    URLs can't flush the entries interactive users keep coming back to.
+    Counters are halved every sample_factor x capacity requests, so
+    yesterday's favourites fade.
+    """
+    
+    DEPTH = 4
+    MAX_COUNT = 15  # 4-bit counters, as in the paper
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+    HALVE = bytes(i >> 1 for i in range(256))
+    
+    def __init__(self, capacity: int, sample_factor: int = 10):
+        self.width = 1 << max(4, (max(1, capacity) - 1).bit_length())
+        self.table = bytearray(self.DEPTH * self.width)
+        self.sample_size = sample_factor * max(1, capacity)
+        self.additions = 0
+        self.agings = 0
+    
+    def record(self, key: str):
+        """Count one request for key"""
+        table = self.table
+        for slot in self._slots(key):
+            if table[slot] < self.MAX_COUNT:
+                table[slot] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            # Periodic aging: halve every counter
+            self.table = bytearray(table.translate(self.HALVE))
+            self.additions //= 2
+            self.agings += 1
+    
+    def frequency(self, key: str) -> int:
+        """Estimated recent request count (never an undercount, before aging)"""
+        table = self.table
+        return min(table[slot] for slot in self._slots(key))
+    
+    def admit(self, candidate: str, victim: str) -> bool:
+        """Should candidate replace victim?"""
+        return self.frequency(candidate) > self.frequency(victim)
+    
+    def _slots(self, key: str) -> List[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        mask = self.width - 1
+        return [
+            row * self.width + ((((h * seed) & 0xFFFFFFFFFFFFFFFF) >> 32) & mask)
+            for row, seed in enumerate(self.SEEDS)
+        ]
+
+
+def admission_policy(name: str, capacity: int) -> Optional[TinyLFU]:
+    """Admission filter for a cache layer from its CACHE_ADMISSION name"""
+    if name == "tinylfu":
+        return TinyLFU(capacity)
+    if name != "lru":
+        logger.warning(f"⚠️ Unknown cache admission policy '{name}' - admitting everything (lru)")
+    return None
+
 
 class LRUCache:
     """
     Least Recently Used (LRU) Cache implementation
-    Automatically evicts least recently used items when capacity is reached
+    Automatically evicts least recently used items when capacity is reached,
+    or when the entries' approximate size would exceed max_bytes
     """
     
-    def __init__(self, capacity: int = 1000):
+    def __init__(
+        self,
+        capacity: int = 1000,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = json_size,
+        admission: Optional[TinyLFU] = None
+    ):
         self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.admission = admission  # optional filter deciding whether new keys may evict
         self.cache: OrderedDict = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.bytes = 0
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.rejections = 0  # values larger than the whole budget, never stored
+        self.admission_rejections = 0  # new keys the admission filter kept out
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
+        if self.admission is not None:
+            self.admission.record(key)
         if key in self.cache:
             self.hits += 1
             # Move to end (most recently used)
@@ -37,24 +195,42 @@ class LRUCache:
     
     def set(self, key: str, value: Any):
         """Set value in cache"""
-        if key in self.cache:
-            # Update existing key
-            self.cache.move_to_end(key)
-        else:
-            # Add new key
-            if len(self.cache) >= self.capacity:
-                # Remove least recently used item
-                self.cache.popitem(last=False)
+        size = self.sizeof(value)
+        is_new = key not in self.cache
+        self.delete(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejections += 1
+            return
+        if is_new and self.admission is not None and self._full(size) \
+                and not self.admission.admit(key, next(iter(self.cache))):
+            self.admission_rejections += 1
+            return
+        # Remove least recently used items until the new one fits
+        while self.cache and self._full(size):
+            evicted, _ = self.cache.popitem(last=False)
+            self.bytes -= self._sizes.pop(evicted)
+            self.evictions += 1
         self.cache[key] = value
+        self._sizes[key] = size
+        self.bytes += size
+    
+    def _full(self, incoming: int) -> bool:
+        """Would storing incoming more bytes break the entry or byte bound?"""
+        return len(self.cache) >= self.capacity or (
+            self.max_bytes is not None and self.bytes + incoming > self.max_bytes
+        )
     
     def delete(self, key: str):
         """Delete key from cache"""
         if key in self.cache:
             del self.cache[key]
+            self.bytes -= self._sizes.pop(key)
     
     def clear(self):
         """Clear entire cache"""
         self.cache.clear()
+        self._sizes.clear()
+        self.bytes = 0
         self.hits = 0
         self.misses = 0
     
@@ -69,86 +245,603 @@ class LRUCache:
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": round(hit_rate, 2),
-            "utilization": round(len(self.cache) / self.capacity * 100, 2)
+            "utilization": round(len(self.cache) / self.capacity * 100, 2),
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "admission_rejections": self.admission_rejections,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
         }
 
 
+class _TTLEntry:
+    """A cached value and its deadlines on the cache's monotonic clock"""
+    
+    __slots__ = ("value", "expires_at", "created_at", "size", "fresh_until")
+    
+    def __init__(
+        self, value: Any, expires_at: float, created_at: float, size: int = 0, fresh_until: Optional[float] = None
+    ):
+        self.value = value
+        self.expires_at = expires_at  # hard deadline: removed
+        self.created_at = created_at
+        self.size = size
+        self.fresh_until = expires_at if fresh_until is None else fresh_until  # soft deadline: stale
+
+
 class TTLCache:
     """
     Time-To-Live (TTL) Cache implementation
-    Automatically expires items after specified duration
+    Automatically expires items after specified duration; when max_size or
+    max_bytes (approximate serialized size) is reached the least recently
+    used entries are evicted
+    
+    Deadlines come from a monotonic clock, so wall-clock (NTP) jumps can't
+    expire everything at once. A min-heap of deadlines lets every write
+    reclaim a few expired entries, so memory is freed without waiting for
+    reads or full scans, and the counters behind get_stats are kept as
+    entries come and go.
+    
+    With stale_ttl set, ttl is a soft deadline: the entry is kept (and
+    get_entry reports it stale) for stale_ttl seconds more, so callers can
+    serve it while they refresh it.
     """
     
-    def __init__(self, default_ttl: int = 3600):
+    EXPIRE_STEP = 8  # expired entries reclaimed per write (more than one keeps ahead of inserts)
+    
+    def __init__(
+        self,
+        default_ttl: int = 3600,
+        max_size: Optional[int] = CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = json_size,
+        admission: Optional[TinyLFU] = None,
+        stale_ttl: float = 0
+    ):
         self.default_ttl = default_ttl  # seconds
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.stale_ttl = stale_ttl  # seconds an entry outlives its ttl as stale
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.admission = admission  # optional filter deciding whether new keys may evict
+        self.clock = clock
+        self.cache: "OrderedDict[str, _TTLEntry]" = OrderedDict()
+        self._deadlines: List[Tuple[float, str]] = []  # heap; stale items are skipped when popped
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0  # values larger than the whole budget, never stored
+        self.admission_rejections = 0  # new keys the admission filter kept out
+        self.stale_hits = 0
+        self.bytes = 0
     
     def get(self, key: str) -> Optional[Any]:
-        """Get value from cache if not expired"""
-        if key in self.cache:
-            entry = self.cache[key]
-            if datetime.now() < entry["expires_at"]:
+        """Get value from cache if not expired (stale values included)"""
+        found = self.get_entry(key)
+        return found[0] if found is not None else None
+    
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Get a value and whether it is still fresh
+        
+        Returns:
+            (value, fresh) - fresh is False once the soft deadline has
+            passed - or None if the key is missing or hard-expired
+        """
+        if self.admission is not None:
+            self.admission.record(key)
+        entry = self.cache.get(key)
+        if entry is not None:
+            now = self.clock()
+            if now < entry.expires_at:
                 self.hits += 1
-                return entry["value"]
-            else:
-                # Expired, remove it
-                del self.cache[key]
+                self.cache.move_to_end(key)
+                fresh = now < entry.fresh_until
+                if not fresh:
+                    self.stale_hits += 1
+                return entry.value, fresh
+            # Expired, remove it
+            self._remove(key)
+            self.expirations += 1
         
         self.misses += 1
         return None
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Set value in cache with TTL"""
-        ttl = ttl or self.default_ttl
-        self.cache[key] = {
-            "value": value,
-            "expires_at": datetime.now() + timedelta(seconds=ttl),
-            "created_at": datetime.now()
-        }
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Set value in cache with TTL
+        
+        Args:
+            ttl: Seconds until stale (default_ttl if None); the entry is
+                removed stale_ttl seconds later. May be negative for a value
+                that is already stale but not yet expired.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        now = self.clock()
+        size = self.sizeof(value)
+        self._reclaim(now, self.EXPIRE_STEP)
+        is_new = key not in self.cache
+        self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejections += 1
+            return
+        if is_new and self.admission is not None and self._full(size):
+            victim_key, victim = next(iter(self.cache.items()))
+            # An expired victim is garbage anyway - only live entries are worth defending
+            if now < victim.expires_at and not self.admission.admit(key, victim_key):
+                self.admission_rejections += 1
+                return
+        # Evict least recently used entries to make room
+        while self.cache and self._full(size):
+            _, evicted = self.cache.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+        entry = _TTLEntry(value, now + ttl + self.stale_ttl, now, size, fresh_until=now + ttl)
+        self.cache[key] = entry
+        self.bytes += size
+        heapq.heappush(self._deadlines, (entry.expires_at, key))
+        if len(self._deadlines) > 2 * len(self.cache) + 64:
+            # Overwrites and deletes leave stale deadlines behind; rebuild in O(n) now and then
+            self._deadlines = [(entry.expires_at, key) for key, entry in self.cache.items()]
+            heapq.heapify(self._deadlines)
     
     def delete(self, key: str):
         """Delete key from cache"""
-        if key in self.cache:
-            del self.cache[key]
+        self._remove(key)
     
     def clear(self):
         """Clear entire cache"""
         self.cache.clear()
+        self._deadlines.clear()
+        self.bytes = 0
         self.hits = 0
         self.misses = 0
     
-    def cleanup_expired(self):
-        """Remove all expired entries"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if now >= entry["expires_at"]
-        ]
-        for key in expired_keys:
-            del self.cache[key]
-        return len(expired_keys)
+    def cleanup_expired(self) -> int:
+        """Remove all expired entries (only the expired ones are visited)"""
+        return self._reclaim(self.clock())
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+        """Get cache statistics (O(1): counters are maintained as entries change)"""
         total_requests = self.hits + self.misses
         hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
         
-        # Count expired entries
-        now = datetime.now()
-        expired_count = sum(
-            1 for entry in self.cache.values()
-            if now >= entry["expires_at"]
-        )
-        
         return {
             "size": len(self.cache),
+            "max_size": self.max_size,
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": round(hit_rate, 2),
-            "expired_entries": expired_count
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            # Older name for the same counter, kept for existing stats consumers
+            "expired_entries": self.expirations,
+            "stale_hits": self.stale_hits,
+            "rejections": self.rejections,
+            "admission_rejections": self.admission_rejections,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
         }
+    
+    def _full(self, incoming: int) -> bool:
+        """Would storing incoming more bytes break the entry or byte bound?"""
+        return (self.max_size is not None and len(self.cache) >= self.max_size) or (
+            self.max_bytes is not None and self.bytes + incoming > self.max_bytes
+        )
+    
+    def _reclaim(self, now: float, limit: Optional[int] = None) -> int:
+        """Pop due deadlines off the heap, removing entries that are still the ones they belong to"""
+        removed = 0
+        popped = 0
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now and (limit is None or popped < limit):
+            expires_at, key = heapq.heappop(deadlines)
+            popped += 1
+            entry = self.cache.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        return removed
+    
+    def _remove(self, key: str):
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+
+class SQLiteCacheStore:
+    """
+    On-disk cache tier backed by SQLite
+    Values are stored as JSON so warm results survive restarts and deploys
+    
+    Calls block on disk I/O and the store lock; async callers should run
+    the batch methods through asyncio.to_thread, one call per batch.
+    """
+    
+    PRUNE_EVERY = 500  # writes between expiry/size sweeps
+    BATCH_SIZE = 500  # keys per IN (...) query, well under SQLite's variable limit
+    
+    def __init__(self, path: str, max_entries: int = CACHE_DISK_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+    
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get (value, seconds until expiry) if present and not expired"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            self.delete(key)
+            return None
+        return json.loads(row[0]), remaining
+    
+    def set(self, key: str, value: Any, ttl: int):
+        """Store a JSON-serializable value"""
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """Get (value, seconds until expiry) for each key present and not expired"""
+        rows = []
+        with self._lock:
+            for i in range(0, len(keys), self.BATCH_SIZE):
+                batch = keys[i:i + self.BATCH_SIZE]
+                rows += self.conn.execute(
+                    f"SELECT key, value, expires_at FROM cache WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+        now = time.time()
+        found = {}
+        expired = []
+        for key, payload, expires_at in rows:
+            if expires_at <= now:
+                expired.append(key)
+            else:
+                found[key] = (json.loads(payload), expires_at - now)
+        if expired:
+            self.delete_many(expired)
+        return found
+    
+    def set_many(self, items: List[Tuple[str, Any, float]]):
+        """Store (key, value, ttl seconds) triples, skipping values that aren't JSON-serializable"""
+        now = time.time()
+        rows = []
+        for key, value, ttl in items:
+            try:
+                rows.append((key, json.dumps(value), now + ttl, now))
+            except (TypeError, ValueError) as e:
+                logger.error(f"❌ Disk cache can't store {key}: {e}")
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            prune = (self._writes + len(rows)) // self.PRUNE_EVERY > self._writes // self.PRUNE_EVERY
+            self._writes += len(rows)
+        if prune:
+            self.prune()
+    
+    def delete(self, key: str):
+        self.delete_many([key])
+    
+    def delete_many(self, keys: List[str]):
+        with self._lock:
+            self.conn.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+    
+    def cleanup_expired(self) -> int:
+        """Remove all expired rows"""
+        with self._lock:
+            return self.conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+    
+    def prune(self) -> int:
+        """Drop expired rows, then the least recently written rows over max_entries"""
+        removed = self.cleanup_expired()
+        with self._lock:
+            removed += self.conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY updated_at DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        return removed
+    
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM cache")
+    
+    def size(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SharedCacheBackend:
+    """
+    Cache tier shared by every worker process (and every API pod)
+    
+    Each uvicorn worker keeps its own in-memory layers; without a shared
+    tier N workers mean N cold caches and N crawls of the same page. Reads
+    and writes are batched: get_many/set_many cost one round trip however
+    many keys they carry. Values go through encode_cache_value, so they
+    must be JSON-serializable. Every round trip is awaited, so a slow
+    server holds up the request that needs it, not the whole event loop.
+    
+    The tier is an optimization, never a dependency: after a failed round
+    trip it is skipped for retry_after seconds and every read is a miss,
+    rather than stalling each request on a dead server.
+    """
+    
+    errors: Tuple[type, ...] = (OSError, asyncio.TimeoutError)
+    
+    def __init__(self, retry_after: float = CACHE_SHARED_RETRY):
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+        self.failures = 0
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Tuple[Any, Optional[float]]]:
+        """
+        Fetch several keys in one round trip
+        
+        Returns:
+            Dict of key -> (value, seconds until expiry or None) for the keys found
+        """
+        if not keys or not self._available():
+            return {}
+        try:
+            payloads = await self._fetch(keys)
+        except self.errors as e:
+            self._failed("read", e)
+            return {}
+        self.round_trips += 1
+        found = {}
+        for key, stored in zip(keys, payloads):
+            if stored is None:
+                continue
+            try:
+                found[key] = (decode_cache_value(stored[0]), stored[1])
+            except (ValueError, zlib.error):
+                logger.warning(f"⚠️ Dropping unreadable shared cache entry {key}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+    
+    async def set_many(self, items: List[Tuple[str, Any, float]]):
+        """Store (key, value, ttl seconds) triples in one round trip"""
+        if not items or not self._available():
+            return
+        encoded = []
+        for key, value, ttl in items:
+            try:
+                encoded.append((key, encode_cache_value(value), ttl))
+            except (TypeError, ValueError) as e:
+                logger.error(f"❌ Shared cache can't store {key}: {e}")
+        if not encoded:
+            return
+        try:
+            await self._store(encoded)
+        except self.errors as e:
+            self._failed("write", e)
+            return
+        self.round_trips += 1
+    
+    async def delete_many(self, keys: List[str]):
+        if not keys or not self._available():
+            return
+        try:
+            await self._delete(keys)
+        except self.errors as e:
+            self._failed("delete", e)
+            return
+        self.round_trips += 1
+    
+    async def acquire(self, key: str, ttl: float) -> bool:
+        """
+        Take a lease on key for ttl seconds unless another worker holds it
+        
+        Leases are never released early, they just expire. When the tier
+        is unreachable the caller gets the lease - duplicate work beats none.
+        """
+        if not self._available():
+            return True
+        try:
+            acquired = await self._acquire(key, ttl)
+        except self.errors as e:
+            self._failed("lease", e)
+            return True
+        self.round_trips += 1
+        return acquired
+    
+    def size(self) -> Optional[int]:
+        """Entries stored, if the backend can tell cheaply"""
+        return None
+    
+    async def close(self):
+        pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "size": self.size() if self._available() else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "round_trips": self.round_trips,
+            "failures": self.failures,
+            "available": self._available()
+        }
+    
+    async def _fetch(self, keys: List[str]) -> List[Optional[Tuple[bytes, Optional[float]]]]:
+        """(payload, seconds until expiry) per key, None where missing"""
+        raise NotImplementedError
+    
+    async def _store(self, items: List[Tuple[str, bytes, float]]):
+        raise NotImplementedError
+    
+    async def _delete(self, keys: List[str]):
+        raise NotImplementedError
+    
+    async def _acquire(self, key: str, ttl: float) -> bool:
+        raise NotImplementedError
+    
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+    
+    def _failed(self, operation: str, error: Exception):
+        self.failures += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning(f"⚠️ Shared cache {operation} failed, skipping it for {self.retry_after:g}s: {error}")
+
+
+class InMemorySharedCache(SharedCacheBackend):
+    """
+    Stand-in for the shared tier inside one process
+    
+    Stores encoded payloads exactly as Redis would, so tests (and a
+    single-worker dev server) exercise the same serialization and TTL
+    handling. Pass one instance to several CacheManagers to model workers.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = CACHE_DISK_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+        retry_after: float = CACHE_SHARED_RETRY
+    ):
+        super().__init__(retry_after)
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def size(self) -> int:
+        return len(self._entries)
+    
+    async def _fetch(self, keys: List[str]) -> List[Optional[Tuple[bytes, Optional[float]]]]:
+        now = self.clock()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._entries[key]
+                    entry = None
+                found.append(None if entry is None else (entry[0], entry[1] - now))
+        return found
+    
+    async def _store(self, items: List[Tuple[str, bytes, float]]):
+        now = self.clock()
+        with self._lock:
+            for key, payload, ttl in items:
+                self._entries.pop(key, None)
+                self._entries[key] = (payload, now + ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    async def _delete(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    async def _acquire(self, key: str, ttl: float) -> bool:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self._entries[key] = (b"", now + ttl)
+            return True
+
+
+class RedisSharedCache(SharedCacheBackend):
+    """
+    Shared tier on Redis
+    
+    Uses the asyncio client. Multi-key reads and writes are pipelined
+    (GET + PTTL per key, SET with PX per key) so a batch costs one network
+    round trip. Keys are namespaced so the database can be shared with
+    other data.
+    """
+    
+    PREFIX = "rankbeacon:cache:v1:"
+    
+    def __init__(self, url: str, timeout: float = CACHE_SHARED_TIMEOUT, retry_after: float = CACHE_SHARED_RETRY):
+        super().__init__(retry_after)
+        self.errors = (OSError, asyncio.TimeoutError, redis.RedisError)
+        self.url = url
+        self.client = redis.asyncio.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+    
+    async def close(self):
+        await self.client.aclose()
+    
+    async def _fetch(self, keys: List[str]) -> List[Optional[Tuple[bytes, Optional[float]]]]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(self.PREFIX + key)
+                pipe.pttl(self.PREFIX + key)
+            replies = await pipe.execute()
+        return [
+            None if payload is None else (payload, ttl_ms / 1000 if ttl_ms > 0 else None)
+            for payload, ttl_ms in zip(replies[::2], replies[1::2])
+        ]
+    
+    async def _store(self, items: List[Tuple[str, bytes, float]]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, payload, ttl in items:
+                pipe.set(self.PREFIX + key, payload, px=max(1, int(ttl * 1000)))
+            await pipe.execute()
+    
+    async def _delete(self, keys: List[str]):
+        await self.client.delete(*(self.PREFIX + key for key in keys))
+    
+    async def _acquire(self, key: str, ttl: float) -> bool:
+        return bool(await self.client.set(self.PREFIX + key, b"", nx=True, px=max(1, int(ttl * 1000))))
+
+
+def shared_cache_from_url(url: str) -> Optional[SharedCacheBackend]:
+    """Shared cache tier for a CACHE_SHARED_URL (None when it is empty or unusable)"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemorySharedCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if not REDIS_AVAILABLE:
+            logger.warning("⚠️ CACHE_SHARED_URL points at Redis but the redis package isn't installed - shared cache disabled")
+            return None
+        return RedisSharedCache(url)
+    logger.warning(f"⚠️ Unsupported CACHE_SHARED_URL scheme in '{url}' - shared cache disabled")
+    return None
 
 
 class CacheManager:
@@ -157,37 +850,166 @@ class CacheManager:
     Manages multiple cache layers with different strategies
     """
     
-    def __init__(self):
-        # Analysis results cache (TTL-based, 1 hour)
-        self.analysis_cache = TTLCache(default_ttl=3600)
+    def __init__(
+        self,
+        disk_path: Optional[str] = None,
+        analysis_max_entries: int = CACHE_ANALYSIS_MAX_ENTRIES,
+        analysis_max_bytes: Optional[int] = CACHE_ANALYSIS_MAX_BYTES,
+        layer_max_bytes: Optional[int] = CACHE_LAYER_MAX_BYTES,
+        admission: str = CACHE_ADMISSION,
+        shared_cache: Optional[SharedCacheBackend] = None,
+        analysis_stale_ttl: int = CACHE_STALE_ANALYSIS,
+        ttl_jitter: float = CACHE_TTL_JITTER
+    ):
+        # Every in-memory layer is bounded by entries and by approximate bytes,
+        # so worker memory is predictable whatever mix of small and huge values arrives
+        
+        # The two layers batch crawls sweep through can put a frequency filter
+        # in front of eviction so one-off URLs don't flush the popular ones
+        
+        # Analysis results cache (TTL-based, 1 hour then served stale while it is refreshed, LRU-bounded)
+        self.analysis_cache = TTLCache(
+            default_ttl=CACHE_TTL_ANALYSIS, max_size=analysis_max_entries, max_bytes=analysis_max_bytes,
+            admission=admission_policy(admission, analysis_max_entries), stale_ttl=analysis_stale_ttl
+        )
         
         # Entity cache (LRU-based, 1000 items)
-        self.entity_cache = LRUCache(capacity=1000)
+        self.entity_cache = LRUCache(
+            capacity=1000, max_bytes=layer_max_bytes, admission=admission_policy(admission, 1000)
+        )
         
         # Prediction cache (TTL-based, 24 hours)
-        self.prediction_cache = TTLCache(default_ttl=86400)
+        self.prediction_cache = TTLCache(default_ttl=CACHE_TTL_PREDICTION, max_bytes=layer_max_bytes)
         
         # Competitor data cache (TTL-based, 6 hours)
-        self.competitor_cache = TTLCache(default_ttl=21600)
+        self.competitor_cache = TTLCache(default_ttl=CACHE_TTL_COMPETITOR, max_bytes=layer_max_bytes)
+        
+        # HTTP validators + last analysis per URL for conditional re-fetch (7 days)
+        self.validator_cache = TTLCache(
+            default_ttl=CACHE_TTL_VALIDATORS, max_size=analysis_max_entries, max_bytes=layer_max_bytes
+        )
+        
+        # Per-site memory of whether a JS render changed the analysis (7 days)
+        self.render_decision_cache = TTLCache(
+            default_ttl=CACHE_TTL_RENDER_DECISION, max_size=analysis_max_entries, max_bytes=layer_max_bytes
+        )
+        
+        # Tiered writes shorten their TTL by a random fraction up to ttl_jitter, so
+        # a batch of entries written together doesn't all expire in the same second
+        self.ttl_jitter = ttl_jitter
+        
+        # Optional tiers behind the analysis, validator and render decision caches:
+        # the shared one (L2) is seen by every worker, the disk one survives restarts
+        self.shared_cache = shared_cache if shared_cache is not None else shared_cache_from_url(CACHE_SHARED_URL)
+        
+        disk_path = disk_path if disk_path is not None else CACHE_DISK_PATH
+        self.disk_cache: Optional[SQLiteCacheStore] = None
+        if disk_path:
+            try:
+                self.disk_cache = SQLiteCacheStore(disk_path)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Could not open disk cache at {disk_path}, using memory only: {e}")
+    
+    async def get_analysis(self, url: str, variant: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Get cached analysis result
+        
+        Args:
+            url: Analyzed URL (normalized, so equivalent forms share an entry)
+            variant: Distinguishes partial runs (profile, rule subsets, depth)
+        """
+        return await self._tiered_get(self.analysis_cache, self._analysis_key(url, variant))
     
-    def get_analysis(self, url: str) -> Optional[Dict[str, Any]]:
-        """Get cached analysis result"""
-        cache_key = self._generate_key("analysis", url)
-        return self.analysis_cache.get(cache_key)
+    async def get_analysis_entry(self, url: str, variant: str = "") -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Get cached analysis result and whether it is fresh
+        
+        Returns:
+            (analysis, fresh) - a stale analysis is past CACHE_TTL_ANALYSIS
+            and should be served while it is refreshed - or None once it is
+            past the stale window too
+        """
+        cache_key = self._analysis_key(url, variant)
+        return (await self._tiered_lookup(self.analysis_cache, [cache_key])).get(cache_key)
     
-    def set_analysis(self, url: str, data: Dict[str, Any], ttl: Optional[int] = None):
-        """Cache analysis result"""
-        cache_key = self._generate_key("analysis", url)
-        self.analysis_cache.set(cache_key, data, ttl)
+    async def claim_refresh(self, url: str, variant: str = "", lease: int = CACHE_REFRESH_LEASE) -> bool:
+        """
+        Claim the background refresh of a stale analysis
+        
+        Across workers only the first claimant within the lease window
+        gets True (within one worker, coalesce with SingleFlight.start).
+        Without a shared tier every worker refreshes its own copy.
+        """
+        if self.shared_cache is None:
+            return True
+        return await self.shared_cache.acquire(self._generate_key("refresh", normalize_url(url) or url, variant), lease)
+    
+    async def set_analysis(self, url: str, data: Dict[str, Any], ttl: Optional[int] = None, variant: str = ""):
+        """Cache analysis result (must be JSON-serializable when the shared or disk tier is on)"""
+        await self._tiered_set(self.analysis_cache, self._analysis_key(url, variant), data, ttl)
+    
+    async def get_analyses(self, urls: List[str], variant: str = "") -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached analyses for many URLs at once
+        
+        Memory misses are looked up in the shared tier in a single round
+        trip (and promoted into memory), so warming a batch costs one
+        network call rather than one per URL.
+        
+        Returns:
+            Dict of url -> analysis for the URLs found in any tier
+        """
+        keys = {url: self._analysis_key(url, variant) for url in urls}
+        found = await self._tiered_get_many(self.analysis_cache, list(keys.values()))
+        return {url: found[key] for url, key in keys.items() if key in found}
+    
+    async def set_analyses(self, results: Dict[str, Dict[str, Any]], ttl: Optional[int] = None, variant: str = ""):
+        """Cache many analysis results, writing the shared tier in one round trip"""
+        await self._tiered_set_many(
+            self.analysis_cache,
+            [(self._analysis_key(url, variant), data) for url, data in results.items()],
+            ttl
+        )
+    
+    async def get_validators(self, url: str, variant: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Get the validators stored for a URL's last analysis
+        
+        Returns:
+            Dict with etag, last_modified, content_hash and the previous
+            analysis, or None if the URL hasn't been analyzed recently
+        """
+        return await self._tiered_get(self.validator_cache, self._validator_key(url, variant))
+    
+    async def set_validators(self, url: str, validators: Dict[str, Any], variant: str = ""):
+        """Store validators and the analysis they belong to"""
+        await self._tiered_set(self.validator_cache, self._validator_key(url, variant), validators)
+    
+    async def get_render_decision(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get what the last JS render on this URL's site showed
+        
+        Returns:
+            Dict with "changed" (did rendering alter the analysis) and the
+            SPA "score" at the time, or None if the site hasn't been rendered
+        """
+        return await self._tiered_get(self.render_decision_cache, self._render_decision_key(url))
+    
+    async def set_render_decision(self, url: str, changed: bool, score: float):
+        """Remember whether rendering changed the analysis for this URL's site"""
+        await self._tiered_set(
+            self.render_decision_cache, self._render_decision_key(url),
+            {"changed": changed, "score": score}
+        )
     
     def get_entities(self, url: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached entities"""
-        cache_key = self._generate_key("entities", url)
+        cache_key = self._generate_key("entities", normalize_url(url) or url)
         return self.entity_cache.get(cache_key)
     
     def set_entities(self, url: str, entities: List[Dict[str, Any]]):
         """Cache entities"""
-        cache_key = self._generate_key("entities", url)
+        cache_key = self._generate_key("entities", normalize_url(url) or url)
         self.entity_cache.set(cache_key, entities)
     
     def get_prediction(self, domain: str, keywords: List[str]) -> Optional[Dict[str, Any]]:
@@ -210,35 +1032,145 @@ class CacheManager:
         cache_key = self._generate_key("competitor", domain, *sorted(competitors))
         self.competitor_cache.set(cache_key, data)
     
-    def invalidate_url(self, url: str):
-        """Invalidate all caches for a specific URL"""
-        analysis_key = self._generate_key("analysis", url)
-        entity_key = self._generate_key("entities", url)
+    async def invalidate_url(self, url: str):
+        """Invalidate all caches for a specific URL (full analysis)"""
+        analysis_key = self._analysis_key(url)
+        entity_key = self._generate_key("entities", normalize_url(url) or url)
+        
+        validator_key = self._validator_key(url)
         
         self.analysis_cache.delete(analysis_key)
         self.entity_cache.delete(entity_key)
+        self.validator_cache.delete(validator_key)
+        if self.shared_cache is not None:
+            await self.shared_cache.delete_many([analysis_key, validator_key])
+        if self.disk_cache is not None:
+            await asyncio.to_thread(self.disk_cache.delete_many, [analysis_key, validator_key])
     
-    def cleanup_expired(self):
-        """Cleanup expired entries from all TTL caches"""
+    async def cleanup_expired(self):
+        """Cleanup expired entries from all TTL caches (the disk sweep runs off the event loop)"""
         analysis_cleaned = self.analysis_cache.cleanup_expired()
         prediction_cleaned = self.prediction_cache.cleanup_expired()
         competitor_cleaned = self.competitor_cache.cleanup_expired()
+        validators_cleaned = self.validator_cache.cleanup_expired() + self.render_decision_cache.cleanup_expired()
+        disk_cleaned = await asyncio.to_thread(self.disk_cache.prune) if self.disk_cache is not None else 0
         
         return {
             "analysis": analysis_cleaned,
             "prediction": prediction_cleaned,
             "competitor": competitor_cleaned,
-            "total": analysis_cleaned + prediction_cleaned + competitor_cleaned
+            "validators": validators_cleaned,
+            "disk": disk_cleaned,
+            "total": analysis_cleaned + prediction_cleaned + competitor_cleaned + validators_cleaned + disk_cleaned
         }
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics for all caches"""
-        return {
+        stats = {
             "analysis_cache": self.analysis_cache.get_stats(),
             "entity_cache": self.entity_cache.get_stats(),
             "prediction_cache": self.prediction_cache.get_stats(),
-            "competitor_cache": self.competitor_cache.get_stats()
+            "competitor_cache": self.competitor_cache.get_stats(),
+            "validator_cache": self.validator_cache.get_stats(),
+            "render_decision_cache": self.render_decision_cache.get_stats()
         }
+        stats["memory_bytes"] = sum(layer["bytes"] for layer in stats.values())
+        if self.shared_cache is not None:
+            stats["shared_cache"] = self.shared_cache.get_stats()
+        if self.disk_cache is not None:
+            stats["disk_cache"] = {
+                "path": self.disk_cache.path,
+                "size": self.disk_cache.size(),
+                "max_entries": self.disk_cache.max_entries
+            }
+        return stats
+    
+    async def close(self):
+        """Release the shared and disk tiers"""
+        if self.shared_cache is not None:
+            await self.shared_cache.close()
+            self.shared_cache = None
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+    
+    def _analysis_key(self, url: str, variant: str = "") -> str:
+        return self._generate_key("analysis", normalize_url(url) or url, variant)
+    
+    def _validator_key(self, url: str, variant: str = "") -> str:
+        return self._generate_key("validators", normalize_url(url) or url, variant)
+    
+    async def _tiered_get(self, cache: "TTLCache", cache_key: str) -> Optional[Any]:
+        return (await self._tiered_get_many(cache, [cache_key])).get(cache_key)
+    
+    async def _tiered_get_many(self, cache: "TTLCache", cache_keys: List[str]) -> Dict[str, Any]:
+        return {cache_key: value for cache_key, (value, _) in (await self._tiered_lookup(cache, cache_keys)).items()}
+    
+    async def _tiered_lookup(self, cache: "TTLCache", cache_keys: List[str]) -> Dict[str, Tuple[Any, bool]]:
+        """
+        Memory first, then the shared tier, then the disk tier (promoting hits into memory)
+        
+        Lower tiers store entries until their hard deadline (ttl + the
+        layer's stale_ttl), so freshness is recovered from the time left.
+        """
+        found = {}
+        missing = []
+        for cache_key in cache_keys:
+            cached = cache.get_entry(cache_key)
+            if cached is not None:
+                found[cache_key] = cached
+            else:
+                missing.append(cache_key)
+        
+        if missing and self.shared_cache is not None:
+            for cache_key, (value, remaining_ttl) in (await self.shared_cache.get_many(missing)).items():
+                found[cache_key] = self._promote(cache, cache_key, value, remaining_ttl)
+            missing = [cache_key for cache_key in missing if cache_key not in found]
+        
+        if missing and self.disk_cache is not None:
+            backfill = []
+            for cache_key, (value, remaining_ttl) in (await asyncio.to_thread(self.disk_cache.get_many, missing)).items():
+                found[cache_key] = self._promote(cache, cache_key, value, remaining_ttl)
+                backfill.append((cache_key, value, remaining_ttl))
+            if backfill and self.shared_cache is not None:
+                # This worker's disk outlived the shared copy (restart, eviction); share it again
+                await self.shared_cache.set_many(backfill)
+        return found
+    
+    async def _tiered_set(self, cache: "TTLCache", cache_key: str, value: Any, ttl: Optional[int] = None):
+        await self._tiered_set_many(cache, [(cache_key, value)], ttl)
+    
+    async def _tiered_set_many(self, cache: "TTLCache", entries: List[Tuple[str, Any]], ttl: Optional[int] = None):
+        ttl = ttl or cache.default_ttl
+        # (key, value, soft ttl, hard ttl) - each entry gets its own jitter
+        writes = []
+        for cache_key, value in entries:
+            soft_ttl = ttl * (1 - random.uniform(0, self.ttl_jitter))
+            writes.append((cache_key, value, soft_ttl, soft_ttl + cache.stale_ttl))
+        
+        for cache_key, value, soft_ttl, _ in writes:
+            cache.set(cache_key, value, soft_ttl)
+        if self.shared_cache is not None:
+            await self.shared_cache.set_many([(cache_key, value, hard_ttl) for cache_key, value, _, hard_ttl in writes])
+        if self.disk_cache is not None:
+            try:
+                await asyncio.to_thread(
+                    self.disk_cache.set_many, [(cache_key, value, hard_ttl) for cache_key, value, _, hard_ttl in writes]
+                )
+            except sqlite3.Error as e:
+                logger.error(f"❌ Disk cache write failed: {e}")
+    
+    def _promote(self, cache: "TTLCache", cache_key: str, value: Any, remaining_ttl: Optional[float]) -> Tuple[Any, bool]:
+        """Copy a lower-tier hit into memory; returns (value, fresh)"""
+        if remaining_ttl is None:
+            cache.set(cache_key, value)
+            return value, True
+        soft_ttl = remaining_ttl - cache.stale_ttl
+        cache.set(cache_key, value, soft_ttl)
+        return value, soft_ttl > 0
+    
+    def _render_decision_key(self, url: str) -> str:
+        return self._generate_key("render_decision", site_host(normalize_url(url) or url))
     
     def _generate_key(self, prefix: str, *args) -> str:
         """Generate cache key from arguments"""
@@ -246,6 +1178,98 @@ class CacheManager:
         return hashlib.md5(key_data.encode()).hexdigest()
 
 
+class _Flight:
+    """One in-flight call and the number of callers waiting on it"""
+    
+    def __init__(self, task: asyncio.Task, detached: bool = False):
+        self.task = task
+        self.waiters = 0
+        self.detached = detached  # started with nobody waiting; runs to completion
+
+
+class SingleFlight:
+    """
+    Request coalescing for async work
+    Concurrent calls with the same key share one task: the first caller
+    starts it, later callers await the same result (or exception). The
+    task is cancelled only once every caller waiting on it has gone away
+    (background flights from start() are never cancelled that way).
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run factory() for key, or join the call already in flight
+        
+        Args:
+            key: Identity of the work (callers with equal keys share a result)
+            factory: Zero-argument callable returning the awaitable to run
+        
+        Returns:
+            The shared result; exceptions raised by the work propagate to every caller
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._launch(key, factory)
+        else:
+            self.coalesced += 1
+        
+        flight.waiters += 1
+        try:
+            # shield() so one caller being cancelled doesn't cancel the others' work
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.detached and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+    
+    def start(self, key: str, factory: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Run factory() for key in the background, unless it is already in flight
+        
+        Callers of do() with the same key join it meanwhile. Failures are
+        logged, since nobody may be waiting to see them.
+        
+        Returns:
+            True if this call started the work
+        """
+        if key in self._flights:
+            return False
+        flight = self._launch(key, factory, detached=True)
+        flight.task.add_done_callback(self._log_failure)
+        return True
+    
+    def running(self, key: str) -> bool:
+        return key in self._flights
+    
+    def in_flight(self) -> int:
+        return len(self._flights)
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "started": self.started, "coalesced": self.coalesced}
+    
+    def _launch(self, key: str, factory: Callable[[], Awaitable[Any]], detached: bool = False) -> _Flight:
+        flight = _Flight(asyncio.ensure_future(factory()), detached)
+        self._flights[key] = flight
+        flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        self.started += 1
+        return flight
+    
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+    
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Background refresh failed: {task.exception()}")
+
+
 class QueryOptimizer:
     """
     Optimizes database queries and API calls
@@ -3,12 +3,17 @@ Predictive Analytics Module for RankBeacon SEO Exorcist
 Task 9.4: Predictive ranking models and algorithm detection
 """
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Mapping, Sequence
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import statistics
 import math
 
+import numpy as np
+
+from ranking_history import DateLike, RankingHistoryStore, to_datetime
+from url_utils import site_host
+
 
 @dataclass
 class RankingDataPoint:
@@ -43,6 +48,31 @@ class AlgorithmUpdate:
     impact_score: float  # -100 to +100
     affected_keywords: List[str]
     recovery_strategy: str
+    affected_domains: Dict[str, List[str]] = field(default_factory=dict)  # portfolio scans only
+
+
+@dataclass
+class PortfolioScan:
+    """Portfolio-wide volatility by day and the updates found in it"""
+    dates: List[datetime]
+    volatility_index: List[float]  # mean absolute day-over-day position change across keywords
+    affected_share: List[float]  # share of keywords whose rolling windows shifted, by day
+    updates: List[AlgorithmUpdate]
+    keywords_scanned: int
+
+
+def pad_series(series: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Stack ragged position series into one (series x days) array
+
+    Each row holds one series oldest first; shorter series are padded
+    with NaN at the end.
+    """
+    width = max((len(values) for values in series), default=0)
+    padded = np.full((len(series), width), np.nan)
+    for row, values in enumerate(series):
+        padded[row, :len(values)] = values
+    return padded
 
 
 class PredictiveRankingModel:
@@ -76,45 +106,126 @@ class PredictiveRankingModel:
         # Sort by date
         sorted_data = sorted(historical_data, key=lambda x: x.date)
         
-        # Extract positions and calculate trend
-        positions = [d.position for d in sorted_data]
+        return self.predict_batch(
+            [sorted_data[0].keyword],
+            pad_series([[d.position for d in sorted_data]]),
+            [sorted_data[-1].date],
+            days_ahead
+        )[0]
+    
+    def predict_rankings(
+        self,
+        historical_data: Mapping[str, Sequence[RankingDataPoint]],
+        days_ahead: int = 30
+    ) -> List[Optional[PredictionResult]]:
+        """
+        Predict many keywords at once
+        
+        Args:
+            historical_data: Data points per keyword
+            days_ahead: Number of days to predict ahead
+        
+        Returns:
+            One PredictionResult per keyword, in order (None where there is too little data)
+        """
+        keywords, series, last_dates = [], [], []
+        for keyword, points in historical_data.items():
+            sorted_data = sorted(points, key=lambda x: x.date)
+            keywords.append(keyword)
+            series.append([d.position for d in sorted_data])
+            last_dates.append(sorted_data[-1].date if sorted_data else None)
+        return self.predict_batch(keywords, pad_series(series), last_dates, days_ahead)
+    
+    def predict_from_history(
+        self,
+        history: RankingHistoryStore,
+        keywords: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        days_ahead: int = 30
+    ) -> List[Optional[PredictionResult]]:
+        """
+        Predict tracked keywords straight from the history store
+        
+        Args:
+            history: Ranking history store
+            keywords: Keywords to predict (default all tracked; untracked ones are skipped)
+            start: Only use history from this date
+            end: Only use history up to this date
+            days_ahead: Number of days to predict ahead
+        """
+        keywords, positions, last_dates = history.padded(keywords, start, end)
+        return self.predict_batch(keywords, positions, last_dates, days_ahead)
+    
+    def predict_batch(
+        self,
+        keywords: Sequence[str],
+        positions: np.ndarray,
+        last_dates: Sequence[Optional[datetime]],
+        days_ahead: int = 30
+    ) -> List[Optional[PredictionResult]]:
+        """
+        Vectorized prediction over a (keywords x days) position array
         
-        # Calculate linear trend
-        trend_slope = self._calculate_trend_slope(positions)
+        Trend slope (least squares), volatility (sample standard deviation),
+        confidence intervals and trend labels are computed for every row in
+        one pass; only building the result objects loops in Python.
         
-        # Calculate prediction
-        current_position = positions[-1]
-        predicted_change = trend_slope * days_ahead
-        predicted_position = max(1, current_position + predicted_change)
+        Args:
+            keywords: Keyword of each row
+            positions: Positions oldest first, NaN-padded at the end (see pad_series)
+            last_dates: Date of each row's latest position
+            days_ahead: Number of days to predict ahead
         
-        # Calculate confidence intervals based on historical volatility
-        volatility = self._calculate_volatility(positions)
+        Returns:
+            One PredictionResult per row (None where there is too little data)
+        """
+        y = np.asarray(positions, dtype=float)
+        if y.ndim != 2 or len(y) != len(keywords) or len(last_dates) != len(keywords):
+            raise ValueError("positions must be a (keywords x days) array with one row per keyword")
+        
+        mask = ~np.isnan(y)
+        n = mask.sum(axis=1)
+        
+        # Least squares slope against x = 0..n-1 for each row
+        x = np.arange(y.shape[1], dtype=float)
+        dx = np.where(mask, x - (n[:, None] - 1) / 2, 0.0)
+        y_mean = np.where(mask, y, 0.0).sum(axis=1) / np.maximum(n, 1)
+        dy = np.where(mask, y - y_mean[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = np.divide((dx * dy).sum(axis=1), sxx, out=np.zeros(len(y)), where=sxx > 0)
+        
+        # Confidence intervals based on historical volatility
+        volatility = np.sqrt(np.divide((dy * dy).sum(axis=1), n - 1, out=np.zeros(len(y)), where=n > 1))
+        current = y[np.arange(len(y)), np.maximum(n - 1, 0)] if y.size else np.zeros(len(y))
+        predicted = np.maximum(1, current + slope * days_ahead)
         confidence_range = volatility * math.sqrt(days_ahead)
+        lower = np.maximum(1, predicted - confidence_range)
+        upper = predicted + confidence_range
         
-        confidence_lower = max(1, predicted_position - confidence_range)
-        confidence_upper = predicted_position + confidence_range
+        # Higher confidence for more, and more stable, data
+        confidence_level = (np.minimum(n / 30, 1.0) + np.maximum(0, 1.0 - volatility / 10)) / 2
         
-        # Calculate confidence level (higher for more stable data)
-        confidence_level = self._calculate_confidence_level(positions, volatility)
+        # Lower position number = better ranking
+        trend = np.where(slope < -0.2, "improving", np.where(slope > 0.2, "declining", "stable"))
         
-        # Determine trend (adjusted thresholds for better sensitivity)
-        if trend_slope < -0.2:
-            trend = "improving"  # Lower position number = better ranking
-        elif trend_slope > 0.2:
-            trend = "declining"
-        else:
-            trend = "stable"
-        
-        return PredictionResult(
-            keyword=sorted_data[0].keyword,
-            current_position=current_position,
-            predicted_position=round(predicted_position, 1),
-            confidence_lower=round(confidence_lower, 1),
-            confidence_upper=round(confidence_upper, 1),
-            confidence_level=confidence_level,
-            trend=trend,
-            prediction_date=sorted_data[-1].date + timedelta(days=days_ahead)
-        )
+        results: List[Optional[PredictionResult]] = [None] * len(y)
+        columns = zip(current.tolist(), predicted.tolist(), lower.tolist(), upper.tolist(),
+                      confidence_level.tolist(), trend.tolist())
+        for row, (now, future, low, high, level, label) in enumerate(columns):
+            if n[row] < self.min_data_points:
+                continue
+            results[row] = PredictionResult(
+                keyword=keywords[row],
+                current_position=int(now) if now.is_integer() else now,
+                predicted_position=round(future, 1),
+                confidence_lower=round(low, 1),
+                confidence_upper=round(high, 1),
+                confidence_level=level,
+                trend=label,
+                prediction_date=last_dates[row] + timedelta(days=days_ahead)
+            )
+        return results
     
     def detect_seasonal_patterns(
         self,
@@ -149,42 +260,6 @@ class PredictiveRankingModel:
             "recommendation": "Consider day-of-week optimization" if has_weekly_pattern else "No clear weekly pattern"
         }
     
-    def _calculate_trend_slope(self, positions: List[int]) -> float:
-        """Calculate linear trend slope using least squares"""
-        n = len(positions)
-        x = list(range(n))
-        
-        x_mean = statistics.mean(x)
-        y_mean = statistics.mean(positions)
-        
-        numerator = sum((x[i] - x_mean) * (positions[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-        
-        if denominator == 0:
-            return 0
-        
-        return numerator / denominator
-    
-    def _calculate_volatility(self, positions: List[int]) -> float:
-        """Calculate ranking volatility (standard deviation)"""
-        if len(positions) < 2:
-            return 0
-        return statistics.stdev(positions)
-    
-    def _calculate_confidence_level(self, positions: List[int], volatility: float) -> float:
-        """
-        Calculate confidence level based on data stability
-        Returns value between 0.0 and 1.0
-        """
-        # More data points = higher confidence
-        data_confidence = min(len(positions) / 30, 1.0)
-        
-        # Lower volatility = higher confidence
-        volatility_confidence = max(0, 1.0 - (volatility / 10))
-        
-        # Combined confidence
-        return (data_confidence + volatility_confidence) / 2
-    
     def _calculate_weekly_averages(self, data: List[RankingDataPoint]) -> List[float]:
         """Calculate average positions by day of week"""
         weekly_data = {i: [] for i in range(7)}
@@ -208,6 +283,9 @@ class AlgorithmUpdateDetector:
     def __init__(self):
         self.volatility_threshold = 3.0  # Standard deviations
         self.impact_threshold = 5  # Minimum position change
+        self.window_days = 7  # Rolling window compared with the one before it
+        self.min_window_points = 4  # Days with data needed in each window
+        self.min_affected_share = 0.1  # Share of the portfolio that must shift on the same day
     
     def detect_algorithm_update(
         self,
@@ -231,19 +309,54 @@ class AlgorithmUpdateDetector:
         
         # Analyze recent volatility (last 7 days vs previous 7 days)
         recent_data = sorted_data[-7:]
-        previous_data = sorted_data[-14:-7]
+        return self._detect_change(
+            np.array([d.position for d in sorted_data[-14:]], dtype=float),
+            recent_data[-1].date,
+            list(set(d.keyword for d in recent_data)),
+            industry_baseline
+        )
+    
+    def detect_from_history(
+        self,
+        history: RankingHistoryStore,
+        keyword: str,
+        end: Optional[DateLike] = None,
+        industry_baseline: Optional[Dict[str, float]] = None
+    ) -> Optional[AlgorithmUpdate]:
+        """
+        Detect an update in a tracked keyword's history up to a date
+        
+        Args:
+            history: Ranking history store
+            keyword: Tracked keyword
+            end: Look at the two weeks up to this date (default latest)
+            industry_baseline: Optional industry-wide volatility baseline
+        """
+        series = history.series(keyword, end=end)
+        if len(series) < 14:
+            return None
         
-        recent_positions = [d.position for d in recent_data]
-        previous_positions = [d.position for d in previous_data]
+        return self._detect_change(
+            series.positions[-14:], to_datetime(series.dates[-1]), [keyword], industry_baseline
+        )
+    
+    def _detect_change(
+        self,
+        positions: np.ndarray,
+        date: datetime,
+        affected_keywords: List[str],
+        industry_baseline: Optional[Dict[str, float]]
+    ) -> Optional[AlgorithmUpdate]:
+        """Compare the last 7 of 14 positions with the 7 before them"""
+        recent_positions = positions[-7:]
+        previous_positions = positions[:-7]
         
         # Calculate volatility change
-        recent_volatility = statistics.stdev(recent_positions) if len(recent_positions) > 1 else 0
-        previous_volatility = statistics.stdev(previous_positions) if len(previous_positions) > 1 else 0
+        recent_volatility = float(recent_positions.std(ddof=1)) if len(recent_positions) > 1 else 0
+        previous_volatility = float(previous_positions.std(ddof=1)) if len(previous_positions) > 1 else 0
         
         # Calculate position change
-        avg_recent = statistics.mean(recent_positions)
-        avg_previous = statistics.mean(previous_positions)
-        position_change = avg_recent - avg_previous
+        position_change = float(recent_positions.mean() - previous_positions.mean())
         
         # Detect significant change
         volatility_increase = recent_volatility - previous_volatility
@@ -256,14 +369,12 @@ class AlgorithmUpdateDetector:
                 industry_baseline
             )
             
-            affected_keywords = list(set(d.keyword for d in recent_data))
-            
             # Determine impact and recovery strategy
             impact_score = -position_change * 10  # Negative change = positive impact
             recovery_strategy = self._generate_recovery_strategy(position_change, affected_keywords)
             
             return AlgorithmUpdate(
-                date=recent_data[-1].date,
+                date=date,
                 name=self._identify_update_type(position_change, volatility_increase),
                 confidence=confidence,
                 impact_score=impact_score,
@@ -273,6 +384,150 @@ class AlgorithmUpdateDetector:
         
         return None
     
+    def scan_portfolio(
+        self,
+        history: RankingHistoryStore,
+        keywords: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None
+    ) -> PortfolioScan:
+        """
+        Detect industry-wide updates across every tracked keyword in one pass
+        
+        For every keyword and day, the rolling window ending that day is
+        compared with the window before it (mean shift and volatility
+        increase, same thresholds as detect_algorithm_update) using
+        cumulative sums over a (keywords x days) array. A day on which at
+        least min_affected_share of the portfolio shifted starts a change
+        point; each run of such days is reported once, at its peak.
+        
+        Args:
+            history: Ranking history store
+            keywords: Keywords to scan (default all tracked)
+            start: First day to scan
+            end: Last day to scan
+        
+        Returns:
+            PortfolioScan with the daily volatility index and detected updates
+        """
+        names, days, positions = history.aligned(keywords, start, end)
+        return self.scan_positions(names, days, positions, [history.url(name) for name in names])
+    
+    def scan_positions(
+        self,
+        names: List[str],
+        days: np.ndarray,
+        positions: np.ndarray,
+        urls: Sequence[str]
+    ) -> PortfolioScan:
+        """
+        scan_portfolio on arrays already taken from the store
+        
+        Touches nothing but its arguments, so it can run in a worker
+        thread while the event loop keeps appending to the store.
+        
+        Args:
+            names: Keyword per row of positions
+            days: datetime64[D] axis of positions
+            positions: (keywords x days) positions, NaN where missing
+            urls: Ranking URL per keyword, for grouping affected domains
+        
+        Returns:
+            PortfolioScan with the daily volatility index and detected updates
+        """
+        count, width = positions.shape
+        window = self.window_days
+        
+        present = ~np.isnan(positions)
+        values = np.where(present, positions, 0.0)
+        
+        # Day-over-day movement, averaged over the keywords ranked on both days
+        moved = present[:, 1:] & present[:, :-1]
+        movement = np.where(moved, np.abs(np.diff(values, axis=1)), 0.0).sum(axis=0)
+        volatility_index = np.zeros(width)
+        volatility_index[1:] = movement / np.maximum(moved.sum(axis=0), 1)
+        
+        affected_share = np.zeros(width)
+        updates: List[AlgorithmUpdate] = []
+        if width >= 2 * window:
+            # Rolling count, sum and sum of squares for the window ending on each day
+            def rolling(array: np.ndarray) -> np.ndarray:
+                totals = np.zeros((count, width + 1))
+                np.cumsum(array, axis=1, out=totals[:, 1:])
+                return totals[:, window:] - totals[:, :-window]
+            
+            n = rolling(present.astype(float))
+            sums = rolling(values)
+            squares = rolling(values * values)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums / n
+                std = np.sqrt(np.maximum(squares - sums * mean, 0.0) / (n - 1))
+            mean[n < self.min_window_points] = np.nan
+            std[n < self.min_window_points] = np.nan
+            
+            # Column j compares the window ending on day j + 2w - 1 with the one before it
+            shift = mean[:, window:] - mean[:, :-window]
+            volatility_increase = std[:, window:] - std[:, :-window]
+            with np.errstate(invalid="ignore"):
+                flagged = (np.abs(shift) >= self.impact_threshold) | (volatility_increase >= self.volatility_threshold)
+            scored = ~np.isnan(shift)
+            share = flagged.sum(axis=0) / np.maximum(scored.sum(axis=0), 1)
+            affected_share[2 * window - 1:] = share
+            # The total shift peaks when the windows straddle the change exactly
+            strength = np.where(flagged, np.abs(np.nan_to_num(shift)), 0.0).sum(axis=0)
+            
+            # Each run of days over the threshold is one update, reported at its peak
+            above = np.concatenate([[False], share >= self.min_affected_share, [False]])
+            edges = np.flatnonzero(above[1:] != above[:-1])
+            for run_start, run_end in zip(edges[::2], edges[1::2]):
+                peak = run_start + int(np.argmax(strength[run_start:run_end]))
+                updates.append(self._portfolio_update(
+                    names, urls, days[peak + window], share[peak],
+                    flagged[:, peak], shift[:, peak], volatility_increase[:, peak]
+                ))
+        
+        return PortfolioScan(
+            dates=[to_datetime(day) for day in days],
+            volatility_index=np.round(volatility_index, 3).tolist(),
+            affected_share=np.round(affected_share, 3).tolist(),
+            updates=updates,
+            keywords_scanned=count
+        )
+    
+    def _portfolio_update(
+        self,
+        names: List[str],
+        urls: Sequence[str],
+        day: np.datetime64,
+        share: float,
+        flagged: np.ndarray,
+        shift: np.ndarray,
+        volatility_increase: np.ndarray
+    ) -> AlgorithmUpdate:
+        """Summarize the keywords that shifted together at a change point"""
+        rows = np.flatnonzero(flagged)
+        affected = [names[row] for row in rows]
+        position_change = float(np.nanmean(shift[flagged]))
+        mean_volatility_increase = float(np.nanmean(volatility_increase[flagged]))
+        
+        affected_domains: Dict[str, List[str]] = {}
+        for row in rows:
+            affected_domains.setdefault(site_host(urls[row]) or "unknown", []).append(names[row])
+        
+        # Confidence grows with both the size of the shift and how much of the portfolio moved
+        change_confidence = self._calculate_detection_confidence(position_change, mean_volatility_increase, None)
+        share_confidence = min(share / (2 * self.min_affected_share), 1.0)
+        
+        return AlgorithmUpdate(
+            date=to_datetime(day),
+            name=self._identify_update_type(position_change, mean_volatility_increase),
+            confidence=round((change_confidence + share_confidence) / 2, 3),
+            impact_score=round(-position_change * 10, 1),
+            affected_keywords=affected,
+            recovery_strategy=self._generate_recovery_strategy(position_change, affected),
+            affected_domains=affected_domains
+        )
+    
     def correlate_with_known_updates(
         self,
         detected_date: datetime,
@@ -372,7 +627,8 @@ class PerformanceForecaster:
     def forecast_traffic(
         self,
         ranking_predictions: List[PredictionResult],
-        ctr_model: Optional[Dict[int, float]] = None
+        ctr_model: Optional[Dict[int, float]] = None,
+        history: Optional[RankingHistoryStore] = None
     ) -> Dict[str, any]:
         """
         Forecast organic traffic based on ranking predictions
@@ -380,6 +636,8 @@ class PerformanceForecaster:
         Args:
             ranking_predictions: List of ranking predictions
             ctr_model: Optional CTR model by position (default uses industry averages)
+            history: Optional history store; each keyword's latest search volume
+                replaces the assumed 1000 monthly searches
         
         Returns:
             Traffic forecast with confidence intervals
@@ -395,9 +653,14 @@ class PerformanceForecaster:
         total_traffic_predicted = 0
         
         for prediction in ranking_predictions:
+            monthly_searches = 1000  # Assumed when the search volume isn't tracked
+            latest = history.latest(prediction.keyword) if history is not None else None
+            if latest is not None and latest.search_volume[0] > 0:
+                monthly_searches = int(latest.search_volume[0])
+            
             # Current traffic estimate
             current_ctr = ctr_model.get(prediction.current_position, 0.01)
-            current_traffic = current_ctr * 1000  # Assuming 1000 monthly searches
+            current_traffic = current_ctr * monthly_searches
             total_traffic_current += current_traffic
             
             # Predicted traffic estimate (use float position for more accurate CTR)
@@ -408,7 +671,7 @@ class PerformanceForecaster:
             else:
                 # Use lower CTR for positions beyond top 10
                 predicted_ctr = 0.01
-            predicted_traffic = predicted_ctr * 1000
+            predicted_traffic = predicted_ctr * monthly_searches
             total_traffic_predicted += predicted_traffic
         
         traffic_change = total_traffic_predicted - total_traffic_current
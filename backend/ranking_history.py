@@ -0,0 +1,419 @@
+"""
+Ranking history store for RankBeacon SEO Exorcist
+Columnar, NumPy-backed daily rank history per keyword
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+RANKING_HISTORY_PATH = os.getenv("RANKING_HISTORY_PATH", "")  # directory; empty keeps history in memory only
+# Appends are written to disk at most this often (seconds); shutdown writes whatever is pending
+RANKING_HISTORY_SAVE_DELAY = float(os.getenv("RANKING_HISTORY_SAVE_DELAY", "30"))
+
+DateLike = Union[date, datetime, np.datetime64, str]
+
+# One array per column; dates are whole days
+COLUMNS = {
+    "dates": np.dtype("datetime64[D]"),
+    "positions": np.dtype(np.float64),
+    "search_volume": np.dtype(np.int64),
+    "ctr": np.dtype(np.float64),
+}
+INITIAL_CAPACITY = 32
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    return np.datetime64(value, "D")
+
+
+def to_datetime(day: np.datetime64) -> datetime:
+    return datetime.combine(day.astype(date), datetime.min.time())
+
+
+@dataclass
+class RankingSeries:
+    """Zero-copy view of one keyword's history between two dates"""
+    keyword: str
+    url: str
+    dates: np.ndarray
+    positions: np.ndarray
+    search_volume: np.ndarray
+    ctr: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+class _Series:
+    """Growable, date-sorted column buffers for one keyword"""
+
+    __slots__ = ("url", "length", "columns")
+
+    def __init__(self, url: str = "", columns: Optional[Dict[str, np.ndarray]] = None):
+        self.url = url
+        if columns is None:
+            columns = {name: np.empty(INITIAL_CAPACITY, dtype) for name, dtype in COLUMNS.items()}
+            self.length = 0
+        else:
+            self.length = len(columns["dates"])
+        self.columns = columns
+
+    def view(self, name: str, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        return self.columns[name][lo:self.length if hi is None else hi]
+
+    def append(self, new: Dict[str, np.ndarray]):
+        count = len(new["dates"])
+        if not count:
+            return
+        in_order = (
+            (self.length == 0 or new["dates"][0] > self.columns["dates"][self.length - 1])
+            and bool(np.all(new["dates"][1:] > new["dates"][:-1]))
+        )
+        if not in_order:
+            self._merge(new)
+            return
+        self._reserve(self.length + count)
+        for name in COLUMNS:
+            self.columns[name][self.length:self.length + count] = new[name]
+        self.length += count
+
+    def _reserve(self, needed: int):
+        # Grow geometrically for amortized O(1) appends; memory-mapped columns
+        # are read-only, so the first write copies them into owned buffers
+        dates = self.columns["dates"]
+        if needed <= len(dates) and dates.flags.writeable:
+            return
+        capacity = max(INITIAL_CAPACITY, needed, 2 * self.length)
+        for name, dtype in COLUMNS.items():
+            grown = np.empty(capacity, dtype)
+            grown[:self.length] = self.columns[name][:self.length]
+            self.columns[name] = grown
+
+    def _merge(self, new: Dict[str, np.ndarray]):
+        # Backfills and corrections: sort everything by date, newest write wins per day
+        merged = {name: np.concatenate([self.view(name), new[name]]) for name in COLUMNS}
+        order = np.argsort(merged["dates"], kind="stable")
+        dates = merged["dates"][order]
+        keep = np.append(dates[1:] != dates[:-1], True) if len(dates) else np.zeros(0, bool)
+        self.length = 0
+        self._reserve(int(keep.sum()))
+        for name in COLUMNS:
+            values = merged[name][order][keep]
+            self.columns[name][:len(values)] = values
+        self.length = int(keep.sum())
+
+
+class RankingHistoryStore:
+    """
+    Daily ranking history for many keywords, stored column-wise
+
+    Each keyword keeps sorted, growable NumPy columns (date, position,
+    search volume, CTR), so appends are amortized O(1), time ranges are
+    found by binary search and returned as views rather than copies, and
+    whole portfolios are stacked into arrays for the vectorized models.
+    Saved stores are one .npy file per column and load memory-mapped.
+
+    The store itself is not thread-safe: mutate and snapshot it on one
+    thread (the event loop). Only the file writing is handed to a thread,
+    from a copy taken beforehand, and saves are serialized.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._series: Dict[str, _Series] = {}
+        self._version = 0  # bumped by every append; compared with the last saved version
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self._series
+
+    def keywords(self, url: Optional[str] = None) -> List[str]:
+        """Tracked keywords, optionally only those whose URL contains url"""
+        if url is None:
+            return list(self._series)
+        return [keyword for keyword, series in self._series.items() if url in series.url]
+
+    def url(self, keyword: str) -> str:
+        """The keyword's current ranking URL"""
+        return self._series[keyword].url
+
+    def append(
+        self,
+        keyword: str,
+        dates: Sequence[DateLike],
+        positions: Sequence[float],
+        search_volume: Optional[Sequence[int]] = None,
+        ctr: Optional[Sequence[float]] = None,
+        url: Optional[str] = None
+    ):
+        """
+        Add daily positions for a keyword
+
+        Args:
+            keyword: Tracked keyword
+            dates: One date per position; a day already stored is overwritten
+            positions: Ranking positions
+            search_volume: Monthly searches per day (default 0)
+            ctr: Click-through rate per day (default 0.0)
+            url: Ranking URL; kept as the keyword's current URL
+        """
+        count = len(positions)
+        if len(dates) != count:
+            raise ValueError("dates and positions must be the same length")
+        new = {
+            "dates": np.array([to_day(value) for value in dates], COLUMNS["dates"])
+            if not isinstance(dates, np.ndarray) else dates.astype(COLUMNS["dates"]),
+            "positions": np.asarray(positions, COLUMNS["positions"]),
+            "search_volume": np.zeros(count, COLUMNS["search_volume"]) if search_volume is None
+            else np.asarray(search_volume, COLUMNS["search_volume"]),
+            "ctr": np.zeros(count, COLUMNS["ctr"]) if ctr is None else np.asarray(ctr, COLUMNS["ctr"]),
+        }
+        series = self._series.get(keyword)
+        if series is None:
+            series = self._series[keyword] = _Series(url or "")
+        elif url:
+            series.url = url
+        series.append(new)
+        self._version += 1
+
+    def append_points(self, points: Iterable) -> int:
+        """
+        Add RankingDataPoint records (any order, any mix of keywords)
+
+        Returns:
+            Number of points added
+        """
+        grouped: Dict[str, list] = {}
+        for point in points:
+            grouped.setdefault(point.keyword, []).append(point)
+        for keyword, group in grouped.items():
+            self.append(
+                keyword,
+                [point.date for point in group],
+                [point.position for point in group],
+                [point.search_volume for point in group],
+                [point.ctr for point in group],
+                url=group[-1].url
+            )
+        return sum(len(group) for group in grouped.values())
+
+    def series(self, keyword: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> RankingSeries:
+        """
+        One keyword's history with start <= date <= end, as views into the store
+
+        Raises:
+            KeyError: If the keyword is not tracked
+        """
+        series = self._series[keyword]
+        lo, hi = self._bounds(series, start, end)
+        return RankingSeries(keyword, series.url, *(series.view(name, lo, hi) for name in COLUMNS))
+
+    def latest(self, keyword: str) -> Optional[RankingSeries]:
+        """The most recent day for a keyword (None if untracked or empty)"""
+        series = self._series.get(keyword)
+        if series is None or series.length == 0:
+            return None
+        return RankingSeries(keyword, series.url, *(series.view(name, series.length - 1) for name in COLUMNS))
+
+    def padded(
+        self,
+        keywords: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None
+    ) -> Tuple[List[str], np.ndarray, List[Optional[datetime]]]:
+        """
+        Stack positions into a (keywords x days) array for the batch models
+
+        Rows hold each keyword's positions oldest first, NaN-padded at the
+        end, in the layout PredictiveRankingModel.predict_batch expects.
+
+        Returns:
+            (keywords, positions, date of each row's latest position)
+        """
+        keywords = [keyword for keyword in (self._series if keywords is None else keywords) if keyword in self._series]
+        bounds = [self._bounds(self._series[keyword], start, end) for keyword in keywords]
+        width = max((hi - lo for lo, hi in bounds), default=0)
+        positions = np.full((len(keywords), width), np.nan)
+        last_dates: List[Optional[datetime]] = []
+        for row, (keyword, (lo, hi)) in enumerate(zip(keywords, bounds)):
+            series = self._series[keyword]
+            positions[row, :hi - lo] = series.view("positions", lo, hi)
+            last_dates.append(to_datetime(series.columns["dates"][hi - 1]) if hi > lo else None)
+        return keywords, positions, last_dates
+
+    def aligned(
+        self,
+        keywords: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Lay positions out on one shared calendar for cross-keyword analysis
+
+        Returns:
+            (keywords, days, positions) where days is the datetime64[D] axis
+            and positions is (keywords x days), NaN where a keyword has no data
+        """
+        keywords = [keyword for keyword in (self._series if keywords is None else keywords) if keyword in self._series]
+        bounds = [self._bounds(self._series[keyword], start, end) for keyword in keywords]
+        spans = [
+            (self._series[keyword].columns["dates"][lo], self._series[keyword].columns["dates"][hi - 1])
+            for keyword, (lo, hi) in zip(keywords, bounds) if hi > lo
+        ]
+        if not spans:
+            return keywords, np.empty(0, COLUMNS["dates"]), np.full((len(keywords), 0), np.nan)
+        first = to_day(start) if start is not None else min(span[0] for span in spans)
+        last = to_day(end) if end is not None else max(span[1] for span in spans)
+        days = np.arange(first, last + 1)
+        positions = np.full((len(keywords), len(days)), np.nan)
+        for row, (keyword, (lo, hi)) in enumerate(zip(keywords, bounds)):
+            series = self._series[keyword]
+            columns = (series.view("dates", lo, hi) - first).astype(np.int64)
+            positions[row, columns] = series.view("positions", lo, hi)
+        return keywords, days, positions
+
+    def save(self, path: Optional[str] = None):
+        """
+        Write the store as one .npy file per column plus an index
+
+        Columns are concatenated keyword by keyword; the index (written
+        last) holds the keywords, URLs and row offsets.
+        """
+        self._write_snapshot(self._target(path), self._snapshot())
+
+    async def save_async(self, path: Optional[str] = None):
+        """save() with the file writing in a thread; the snapshot is taken here, on the loop"""
+        target = self._target(path)
+        await asyncio.to_thread(self._write_snapshot, target, self._snapshot())
+
+    def schedule_save(self, delay: float = RANKING_HISTORY_SAVE_DELAY):
+        """
+        Save in the background after delay seconds
+
+        Appends made meanwhile ride along with the same save, so a burst
+        of requests costs one write of the store rather than one each.
+        """
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._save_later(delay))
+
+    async def flush(self):
+        """Write any unsaved appends now (shutdown); waits for a save already in progress"""
+        task = self._save_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.path and self.dirty:
+            await self.save_async()
+
+    @property
+    def dirty(self) -> bool:
+        """True if appends were made since the last save"""
+        return self._version != self._saved_version
+
+    async def _save_later(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.save_async()
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Saving ranking history to {self.path} failed: {e}")
+
+    def _target(self, path: Optional[str]) -> str:
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the ranking history to")
+        return path
+
+    def _snapshot(self) -> Dict:
+        """Copy of everything a save writes (concatenating the columns copies them)"""
+        keywords = list(self._series)
+        lengths = [self._series[keyword].length for keyword in keywords]
+        return {
+            "version": self._version,
+            "columns": {
+                name: np.concatenate([self._series[keyword].view(name) for keyword in keywords])
+                if keywords else np.empty(0, dtype)
+                for name, dtype in COLUMNS.items()
+            },
+            "index": {
+                "keywords": keywords,
+                "urls": [self._series[keyword].url for keyword in keywords],
+                "offsets": np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).tolist(),
+            },
+        }
+
+    def _write_snapshot(self, path: str, snapshot: Dict):
+        # One save at a time, so the columns and index on disk always belong together
+        with self._save_lock:
+            os.makedirs(path, exist_ok=True)
+            for name, column in snapshot["columns"].items():
+                self._write(os.path.join(path, f"{name}.npy"), lambda f, c=column: np.save(f, c))
+            index = snapshot["index"]
+            self._write(os.path.join(path, "index.json"), lambda f: f.write(json.dumps(index).encode()))
+            self._saved_version = max(self._saved_version, snapshot["version"])
+        logger.info(f"💾 Saved ranking history for {len(index['keywords'])} keywords to {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "RankingHistoryStore":
+        """
+        Open a saved store (an empty one if nothing was saved at path)
+
+        With mmap the columns stay on disk and pages are read on demand;
+        a keyword's columns are copied into memory only when it is appended to.
+        """
+        store = cls(path)
+        index_path = os.path.join(path, "index.json")
+        if not os.path.exists(index_path):
+            return store
+        with open(index_path) as f:
+            index = json.load(f)
+        columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in COLUMNS
+        }
+        offsets = index["offsets"]
+        if len(columns["dates"]) != offsets[-1]:
+            raise ValueError(f"Ranking history at {path} is inconsistent: index and columns differ in length")
+        for i, (keyword, url) in enumerate(zip(index["keywords"], index["urls"])):
+            lo, hi = offsets[i], offsets[i + 1]
+            store._series[keyword] = _Series(url, {name: column[lo:hi] for name, column in columns.items()})
+        logger.info(f"📈 Loaded ranking history for {len(store)} keywords from {path}")
+        return store
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"keywords": len(self), "points": sum(series.length for series in self._series.values())}
+
+    @staticmethod
+    def _bounds(series: _Series, start: Optional[DateLike], end: Optional[DateLike]) -> Tuple[int, int]:
+        dates = series.view("dates")
+        lo = 0 if start is None else int(np.searchsorted(dates, to_day(start), "left"))
+        hi = series.length if end is None else int(np.searchsorted(dates, to_day(end), "right"))
+        return lo, max(lo, hi)
+
+    @staticmethod
+    def _write(target: str, write):
+        # Write beside the target under a unique name and swap in, so readers never see half a file
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(target), prefix=os.path.basename(target), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                write(f)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
@@ -0,0 +1,332 @@
+"""
+SEO Rule Engine for RankBeacon SEO Exorcist
+Pluggable, independently-timed checks over a pre-extracted PageFeatures record
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from html_features import PageFeatures
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("fast", "full")
+
+
+@dataclass
+class RuleContext:
+    """Per-page information rules may need besides the page features"""
+    url: str
+    is_js_heavy: bool = False
+
+
+@dataclass
+class RuleRunResult:
+    """Entities found by a rule run plus per-rule execution times"""
+    entities: List[Dict[str, Any]] = field(default_factory=list)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    issue_points: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class SEORule:
+    """
+    Base class for SEO checks
+
+    Subclasses set a unique `name`, list the PageFeatures fields they read
+    in `requires`, name the profiles they belong to, and implement
+    `evaluate`. Entity dicts may carry an optional "issue_points" key which
+    the engine strips and sums into RuleRunResult.issue_points. Rules that
+    depend on computed layout set `needs_css` so JS renders keep stylesheets.
+    """
+
+    name: str = ""
+    requires: Tuple[str, ...] = ()
+    profiles: Tuple[str, ...] = PROFILES
+    needs_css: bool = False
+
+    def evaluate(self, features: PageFeatures, context: RuleContext) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class RuleEngine:
+    """Registry of SEO rules with profile and per-request selection"""
+
+    def __init__(self, rules: Optional[Iterable[SEORule]] = None):
+        self.rules: Dict[str, SEORule] = {}
+        for rule in rules or []:
+            self.register(rule)
+
+    def register(self, rule: SEORule) -> SEORule:
+        """Add a rule; names must be unique"""
+        if not rule.name:
+            raise ValueError(f"{type(rule).__name__} has no name")
+        if rule.name in self.rules:
+            raise ValueError(f"Rule '{rule.name}' is already registered")
+        unknown = set(rule.requires) - set(PageFeatures.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Rule '{rule.name}' requires unknown features: {sorted(unknown)}")
+        self.rules[rule.name] = rule
+        return rule
+
+    def select(
+        self,
+        profile: str = "full",
+        enabled: Optional[Iterable[str]] = None,
+        disabled: Optional[Iterable[str]] = None
+    ) -> List[SEORule]:
+        """
+        Pick the rules to run
+
+        Args:
+            profile: "fast" for bulk monitoring, "full" for complete audits
+            enabled: Explicit rule names to run (overrides the profile)
+            disabled: Rule names to skip
+
+        Returns:
+            Rules in registration order
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{profile}' (expected one of {', '.join(PROFILES)})")
+        if enabled:
+            unknown = set(enabled) - set(self.rules)
+            if unknown:
+                raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}")
+            selected = [rule for name, rule in self.rules.items() if name in set(enabled)]
+        else:
+            selected = [rule for rule in self.rules.values() if profile in rule.profiles]
+        skip = set(disabled or [])
+        return [rule for rule in selected if rule.name not in skip]
+
+    def required_features(self, rules: Iterable[SEORule]) -> List[str]:
+        """Union of the features the given rules read"""
+        return sorted({feature for rule in rules for feature in rule.requires})
+
+    def needs_css(self, rules: Iterable[SEORule]) -> bool:
+        """True if any of the given rules needs stylesheets loaded to evaluate"""
+        return any(rule.needs_css for rule in rules)
+
+    def run(
+        self,
+        features: PageFeatures,
+        context: RuleContext,
+        profile: str = "full",
+        enabled: Optional[Iterable[str]] = None,
+        disabled: Optional[Iterable[str]] = None
+    ) -> RuleRunResult:
+        """Evaluate the selected rules, timing each one"""
+        result = RuleRunResult()
+        for rule in self.select(profile, enabled, disabled):
+            start = time.perf_counter()
+            try:
+                found = rule.evaluate(features, context)
+            except Exception as e:
+                logger.error(f"Rule '{rule.name}' failed on {context.url}: {e}")
+                result.errors[rule.name] = str(e)
+                found = []
+            result.timings_ms[rule.name] = round((time.perf_counter() - start) * 1000, 3)
+            for entity in found:
+                result.issue_points += entity.pop("issue_points", 0)
+                result.entities.append(entity)
+        return result
+
+
+# ============================================================================
+# Default rules (used by main.py)
+# ============================================================================
+
+class JavaScriptHeavyRule(SEORule):
+    name = "js_heavy"
+    requires = ()
+
+    def evaluate(self, features, context):
+        if not context.is_js_heavy:
+            return []
+        return [{
+            "type": "phantom",
+            "severity": "high",
+            "title": "JavaScript-Rendered Content Detected",
+            "description": "This site uses heavy JavaScript rendering. Our crawler sees limited content. Consider server-side rendering (SSR) or static site generation (SSG) for better SEO.",
+            "url": context.url,
+            "fix_suggestion": "Implement SSR/SSG with Next.js, Nuxt.js, or pre-rendering. Ensure critical content is in initial HTML for search engines."
+        }]
+
+
+class TitleRule(SEORule):
+    name = "title"
+    requires = ("title",)
+
+    def evaluate(self, features, context):
+        title = features.title
+        if not title or len(title.strip()) == 0:
+            return [{
+                "type": "specter",
+                "severity": "critical",
+                "title": "Missing Title Tag Specter",
+                "description": "Page is missing a title tag - critical for SEO",
+                "url": context.url,
+                "fix_suggestion": "Add <title>Your Page Title Here</title> in the <head> section"
+            }]
+        if len(title) < 30:
+            return [{
+                "type": "specter",
+                "severity": "medium",
+                "title": "Short Title Tag",
+                "description": f"Title is only {len(title)} characters (recommended: 50-60)",
+                "url": context.url,
+                "fix_suggestion": "Expand title to 50-60 characters with relevant keywords"
+            }]
+        return []
+
+
+class MetaDescriptionRule(SEORule):
+    name = "meta_description"
+    requires = ("meta", "paragraphs")
+
+    def evaluate(self, features, context):
+        if features.meta_description:
+            return []
+
+        # Generate contextual suggestion from page content
+        suggested_desc = "Your compelling page description here"
+        if features.paragraphs:
+            p_text = features.paragraphs[0]
+            if len(p_text) > 50:
+                suggested_desc = p_text[:157] + "..." if len(p_text) > 157 else p_text
+
+        return [{
+            "type": "specter",
+            "severity": "high",
+            "title": "Missing Meta Description Specter",
+            "description": "No meta description found - impacts click-through rates by up to 30%",
+            "url": context.url,
+            "fix_suggestion": f'Add a compelling meta description (150-160 characters) that:\n• Summarizes your page content\n• Includes target keywords naturally\n• Encourages clicks with value proposition\n\nSuggested: "{suggested_desc}"\n\nAdd this in your <head> section:\n<meta name="description" content="{suggested_desc}">'
+        }]
+
+
+class H1Rule(SEORule):
+    name = "h1"
+    requires = ("heading_counts",)
+
+    def evaluate(self, features, context):
+        h1_count = features.heading_counts['h1']
+        if h1_count == 0:
+            return [{
+                "type": "zombie",
+                "severity": "high",
+                "title": "Missing H1 Zombie",
+                "description": "No H1 heading found - important for page structure",
+                "url": context.url,
+                "fix_suggestion": "Add a single <h1> tag with your main page heading"
+            }]
+        if h1_count > 1:
+            return [{
+                "type": "zombie",
+                "severity": "medium",
+                "title": "Multiple H1 Tags",
+                "description": f"Found {h1_count} H1 tags (recommended: 1 per page)",
+                "url": context.url,
+                "fix_suggestion": "Use only one H1 tag per page, use H2-H6 for subheadings"
+            }]
+        return []
+
+
+class ImageAltRule(SEORule):
+    name = "image_alt"
+    requires = ("image_count", "images_missing_alt")
+    profiles = ("full",)
+
+    def evaluate(self, features, context):
+        if not features.images_missing_alt:
+            return []
+        return [{
+            "type": "phantom",
+            "severity": "medium",
+            "title": "Images Missing Alt Text",
+            "description": f"{features.images_missing_alt} of {features.image_count} images lack alt text",
+            "url": context.url,
+            "fix_suggestion": "Add descriptive alt attributes to all images for accessibility and SEO"
+        }]
+
+
+class InternalLinksRule(SEORule):
+    name = "internal_links"
+    requires = ("links",)
+    profiles = ("full",)
+
+    def evaluate(self, features, context):
+        if len(features.links) >= 3:
+            return []
+        return [{
+            "type": "zombie",
+            "severity": "medium",
+            "title": "Orphaned Page - Few Internal Links",
+            "description": f"Only {len(features.links)} links found - page may be isolated",
+            "url": context.url,
+            "fix_suggestion": "Add more internal links to improve site navigation and SEO"
+        }]
+
+
+class SchemaRule(SEORule):
+    name = "schema"
+    requires = ("json_ld",)
+
+    def evaluate(self, features, context):
+        if features.json_ld:
+            return []
+        return [{
+            "type": "specter",
+            "severity": "low",
+            "title": "Missing Schema Markup",
+            "description": "No structured data (Schema.org) found",
+            "url": context.url,
+            "fix_suggestion": "Add JSON-LD structured data for rich snippets"
+        }]
+
+
+class ThinContentRule(SEORule):
+    name = "thin_content"
+    requires = ("word_count",)
+    profiles = ("full",)
+
+    def evaluate(self, features, context):
+        if features.word_count >= 300:
+            return []
+        return [{
+            "type": "phantom",
+            "severity": "high",
+            "title": "Thin Content Phantom",
+            "description": f"Only {features.word_count} words found (recommended: 300+ for most pages)",
+            "url": context.url,
+            "fix_suggestion": "Add more comprehensive, valuable content to improve rankings"
+        }]
+
+
+def build_default_engine() -> RuleEngine:
+    """Rule set used by the main API"""
+    return RuleEngine([
+        JavaScriptHeavyRule(),
+        TitleRule(),
+        MetaDescriptionRule(),
+        H1Rule(),
+        ImageAltRule(),
+        InternalLinksRule(),
+        SchemaRule(),
+        ThinContentRule(),
+    ])
+
+
+default_engine = build_default_engine()
+
+
+def run_default_rules(
+    features: PageFeatures,
+    context: RuleContext,
+    profile: str = "full",
+    enabled: Optional[Iterable[str]] = None,
+    disabled: Optional[Iterable[str]] = None
+) -> RuleRunResult:
+    """Module-level entry point to the default engine, so CPU pool workers can run it"""
+    return default_engine.run(features, context, profile, enabled, disabled)
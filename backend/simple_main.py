@@ -1,19 +1,32 @@
 """
 Simple RankBeacon Backend - Real SEO Analysis without Playwright
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import aiohttp
-from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import Dict, List, Optional
 import random
 import os
 import re
 import json
 from urllib.parse import quote_plus
 
-app = FastAPI(title="RankBeacon SEO Exorcist API")
+from cpu_pool import offload, start_cpu_pool, close_cpu_pool
+from html_features import extract_page_features
+from http_client import read_html
+from seo_rules import SEORule, RuleEngine, RuleContext
+from site_crawler import SiteCrawler, CRAWL_MAX_DEPTH, CRAWL_MAX_PAGES_LIMIT
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Parse big pages off the event loop"""
+    start_cpu_pool()
+    yield
+    close_cpu_pool()
+
+app = FastAPI(title="RankBeacon SEO Exorcist API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +41,9 @@ class AnalyzeRequest(BaseModel):
     depth: int = 1
     include_competitors: bool = False
     use_js_rendering: bool = False
+    profile: str = "full"  # "fast" for bulk monitoring, "full" for complete audits
+    rules: Optional[List[str]] = None  # Run only these rules (overrides profile)
+    skip_rules: Optional[List[str]] = None  # Rules to skip
 
 class Entity(BaseModel):
     type: str
@@ -53,44 +69,19 @@ async def analyze_page(session, url: str):
     """Analyze a single page"""
     try:
         async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            html = await response.text()
+            page = await read_html(response.content.iter_chunked(65536), response.charset)
             status_code = response.status
             
-        soup = BeautifulSoup(html, 'html.parser')
-        return soup, status_code, None
+        features = await offload(extract_page_features, page.text, size=page.size)
+        return features, status_code, None
     except Exception as e:
         return None, None, str(e)
 
-async def find_internal_links(soup, base_url: str, max_links: int = 10):
-    """Find internal links to crawl"""
-    from urllib.parse import urljoin, urlparse
-    
-    links = soup.find_all('a', href=True)
-    base_domain = urlparse(base_url).netloc
-    
-    internal_urls = set()
-    for link in links:
-        href = link['href']
-        
-        # Skip javascript, mailto, tel, and anchor links
-        if href.startswith(('javascript:', 'mailto:', 'tel:', '#')):
-            continue
-        
-        # Convert relative URLs to absolute
-        full_url = urljoin(base_url, href)
-        
-        # Check if it's internal (same domain)
-        link_domain = urlparse(full_url).netloc
-        if link_domain == base_domain or link_domain == f"www.{base_domain}" or base_domain == f"www.{link_domain}":
-            # Remove fragments
-            full_url = full_url.split('#')[0]
-            if full_url and full_url != base_url:
-                internal_urls.add(full_url)
-        
-        if len(internal_urls) >= max_links:
-            break
-    
-    return list(internal_urls)
+async def fetch_page(session, url: str):
+    """Crawler fetch function backed by the aiohttp session"""
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        page = await read_html(response.content.iter_chunked(65536), response.charset)
+        return response.status, response.headers.get('Content-Type', ''), page.text
 
 async def analyze_competitors_with_google(session, url: str, title: str):
     """
@@ -164,6 +155,333 @@ async def analyze_competitors_with_google(session, url: str, title: str):
         print(f"❌ Google API exception: {str(e)}")
         return []
 
+# ============================================================================
+# SEO rules for the simple backend (run on the shared engine in seo_rules.py)
+# ============================================================================
+
+class SimpleTitleRule(SEORule):
+    name = "title"
+    requires = ("title", "h1_texts")
+
+    def evaluate(self, features, context):
+        title_text = (features.title or "").strip()
+        h1_text = features.h1_texts[0] if features.h1_texts else ""
+
+        if len(title_text) == 0:
+            # Suggest using H1 as title if available
+            suggested_title = h1_text[:60] if h1_text else "Your Page Title Here"
+            return [{
+                "type": "ghost",
+                "severity": "critical",
+                "title": "Missing Page Title",
+                "description": "No title tag found - critical for SEO",
+                "url": context.url,
+                "fix_suggestion": f"Add a descriptive <title> tag with your target keywords",
+                "suggested_code": f'<title>{suggested_title}</title>',
+                "issue_points": 15
+            }]
+        if len(title_text) > 60:
+            # Suggest shortened version
+            shortened_title = title_text[:57] + "..."
+            return [{
+                "type": "specter",
+                "severity": "medium",
+                "title": "Title Too Long",
+                "description": f"Title is {len(title_text)} characters (recommended: 50-60)",
+                "url": context.url,
+                "fix_suggestion": "Shorten your title tag to 50-60 characters",
+                "current_content": title_text,
+                "suggested_code": f'<title>{shortened_title}</title>',
+                "issue_points": 5
+            }]
+        return []
+
+
+class SimpleMetaDescriptionRule(SEORule):
+    name = "meta_description"
+    requires = ("meta", "title", "h1_texts", "paragraphs", "main_content_text", "text_sample")
+
+    def evaluate(self, features, context):
+        if not features.has_meta_description_tag:
+            return [self._missing(features, context)]
+
+        # Check if existing description is too short or too long
+        desc_content = features.meta_description
+        if not desc_content:
+            return []
+        if len(desc_content) < 50:
+            return [self._too_short(features, context, desc_content)]
+        if len(desc_content) > 160:
+            return [self._too_long(context, desc_content)]
+        return []
+
+    def _missing(self, features, context):
+        # Generate smart, contextual suggestion from page content
+        title_text = (features.title or "").strip()
+        paragraphs = features.paragraphs
+        suggested_desc = None
+
+        # Strategy 1: Use first meaningful paragraph (most reliable)
+        skip_phrases = ['cookie', 'javascript', 'browser', 'click here', 'read more',
+                        'learn more', 'sign up', 'subscribe', 'follow us', 'copyright']
+        for p_text in paragraphs:
+            # Skip very short paragraphs, navigation, or boilerplate text
+            if len(p_text) > 80 and not any(skip in p_text.lower() for skip in skip_phrases):
+                suggested_desc = p_text[:157] + "..." if len(p_text) > 157 else p_text
+                break
+
+        # Strategy 2: Combine H1 + first substantial paragraph
+        if not suggested_desc and features.h1_texts:
+            h1_text = features.h1_texts[0]
+            for p_text in paragraphs:
+                if len(p_text) > 30:
+                    combined = f"{h1_text}. {p_text}"
+                    suggested_desc = combined[:157] + "..." if len(combined) > 157 else combined
+                    break
+
+        # Strategy 3: Extract from article/main content areas
+        if not suggested_desc:
+            content_text = features.main_content_text
+            if len(content_text) > 80:
+                suggested_desc = content_text[:157] + "..." if len(content_text) > 157 else content_text
+
+        # Strategy 4: Use any text content we can find
+        if not suggested_desc:
+            lines = [line for line in features.text_sample.split('.') if len(line.strip()) > 30]
+            if lines:
+                suggested_desc = lines[0].strip()
+                if len(suggested_desc) > 157:
+                    suggested_desc = suggested_desc[:157] + "..."
+
+        # Strategy 5: Use title with intelligent context (last resort)
+        if not suggested_desc and title_text:
+            title_lower = title_text.lower()
+
+            # Detect page type from title and structure
+            if any(word in title_lower for word in ['shop', 'store', 'buy', 'product', 'chocolate', 'farm']):
+                suggested_desc = f"Visit {title_text} to discover quality products and services. Browse our selection and find exactly what you need."
+            elif any(word in title_lower for word in ['about', 'who', 'team', 'company']):
+                suggested_desc = f"Learn about {title_text}. Discover our story, mission, and the team behind our work."
+            elif any(word in title_lower for word in ['contact', 'reach', 'get in touch']):
+                suggested_desc = f"{title_text} - Get in touch with us. We're here to answer your questions and help you get started."
+            elif any(word in title_lower for word in ['blog', 'news', 'article']):
+                suggested_desc = f"Read the latest from {title_text}. Stay updated with insights, tips, and news."
+            else:
+                # Generic but better than nothing
+                suggested_desc = f"Welcome to {title_text}. Explore our content and discover what we have to offer."
+
+        # Absolute fallback
+        if not suggested_desc:
+            suggested_desc = "Explore this page to discover valuable information and resources tailored to your needs."
+
+        # Ensure optimal length
+        suggested_desc = suggested_desc[:160]
+
+        return {
+            "type": "ghost",
+            "severity": "high",
+            "title": "Missing Meta Description",
+            "description": "No meta description found - this is crucial for search results and click-through rates",
+            "url": context.url,
+            "fix_suggestion": f"Add a compelling meta description (150-160 characters) that:\n• Summarizes your page content\n• Includes target keywords naturally\n• Encourages clicks with a clear value proposition\n• Matches user search intent\n\nSuggested based on your content: \"{suggested_desc}\"",
+            "suggested_code": f'<meta name="description" content="{suggested_desc}">',
+            "issue_points": 10
+        }
+
+    def _too_short(self, features, context, desc_content):
+        # Try to expand with page content
+        expansion_text = ""
+        if features.paragraphs:
+            p_text = features.paragraphs[0]
+            # Add relevant content from first paragraph
+            remaining_chars = 157 - len(desc_content)
+            if remaining_chars > 20:
+                expansion_text = " " + p_text[:remaining_chars]
+
+        improved_desc = (desc_content + expansion_text).strip()[:160]
+
+        return {
+            "type": "specter",
+            "severity": "medium",
+            "title": "Meta Description Too Short",
+            "description": f"Meta description is only {len(desc_content)} characters (recommended: 150-160). Short descriptions miss opportunities to attract clicks.",
+            "url": context.url,
+            "fix_suggestion": f"Expand your meta description to 150-160 characters by:\n• Adding specific benefits or features\n• Including relevant keywords\n• Highlighting what makes your page unique\n• Adding a call-to-action\n\nCurrent: \"{desc_content}\"\nSuggested: \"{improved_desc}\"",
+            "current_content": desc_content,
+            "suggested_code": f'<meta name="description" content="{improved_desc}">',
+            "issue_points": 5
+        }
+
+    def _too_long(self, context, desc_content):
+        # Smart truncation - try to end at a sentence or word boundary
+        shortened_desc = desc_content[:157]
+        # Try to end at last complete word
+        last_space = shortened_desc.rfind(' ')
+        if last_space > 140:  # Only if we're not cutting too much
+            shortened_desc = shortened_desc[:last_space]
+        shortened_desc = shortened_desc.rstrip('.,;:') + "..."
+
+        return {
+            "type": "specter",
+            "severity": "low",
+            "title": "Meta Description Too Long",
+            "description": f"Meta description is {len(desc_content)} characters (recommended: 150-160). Google will truncate it in search results.",
+            "url": context.url,
+            "fix_suggestion": f"Shorten your meta description to 150-160 characters by:\n• Removing redundant words\n• Focusing on the most important message\n• Keeping the key value proposition\n• Ending with a clear call-to-action\n\nCurrent ({len(desc_content)} chars): \"{desc_content}\"\nSuggested ({len(shortened_desc)} chars): \"{shortened_desc}\"",
+            "current_content": desc_content,
+            "suggested_code": f'<meta name="description" content="{shortened_desc}">',
+            "issue_points": 3
+        }
+
+
+class SimpleH1Rule(SEORule):
+    name = "h1"
+    requires = ("heading_counts", "h1_texts", "title")
+
+    def evaluate(self, features, context):
+        h1_count = features.heading_counts['h1']
+        if h1_count == 0:
+            # Suggest using title or first heading
+            title_text = (features.title or "").strip()
+            suggested_h1 = title_text if title_text else "Your Main Heading Here"
+            return [{
+                "type": "zombie",
+                "severity": "high",
+                "title": "Missing H1 Tag",
+                "description": "No H1 heading found on the page",
+                "url": context.url,
+                "fix_suggestion": "Add one H1 tag with your primary keyword",
+                "suggested_code": f'<h1>{suggested_h1}</h1>',
+                "issue_points": 10
+            }]
+        if h1_count > 1:
+            # Show the actual H1s found
+            h1_list = [h1[:50] for h1 in features.h1_texts[:3]]
+            return [{
+                "type": "zombie",
+                "severity": "medium",
+                "title": "Multiple H1 Tags",
+                "description": f"Found {h1_count} H1 tags (recommended: 1)",
+                "url": context.url,
+                "fix_suggestion": "Use only one H1 tag per page",
+                "current_content": f"Found: {', '.join(h1_list)}",
+                "suggested_code": f'<!-- Keep only one H1, convert others to H2 -->\n<h1>{h1_list[0]}</h1>\n<h2>{h1_list[1] if len(h1_list) > 1 else "Subheading"}</h2>',
+                "issue_points": 5
+            }]
+        return []
+
+
+class SimpleImageAltRule(SEORule):
+    name = "image_alt"
+    requires = ("image_count", "images_missing_alt", "missing_alt_srcs", "title")
+    profiles = ("full",)
+
+    def evaluate(self, features, context):
+        if features.images_missing_alt == 0:
+            return []
+
+        title_text = (features.title or "").strip()
+
+        # Get actual image sources and suggest SMART AI alt text
+        image_examples = []
+        for src in features.missing_alt_srcs[:3]:  # Show first 3 examples
+            src = src or 'unknown'
+            # SMART AI ALT TEXT GENERATION
+            filename = src.split('/')[-1].split('.')[0] if src else 'image'
+            filename_lower = filename.lower()
+
+            # Context-aware smart suggestions
+            if 'logo' in filename_lower:
+                suggested_alt = f"{title_text.split('-')[0].strip() if title_text else 'Company'} Logo"
+            elif 'hero' in filename_lower or 'banner' in filename_lower:
+                suggested_alt = f"{title_text[:40] if title_text else 'Welcome'} - Hero Banner"
+            elif 'product' in filename_lower:
+                product_name = filename.replace('product-', '').replace('product_', '')
+                suggested_alt = f"Product Image - {product_name.replace('-', ' ').replace('_', ' ').title()}"
+            elif 'team' in filename_lower or 'staff' in filename_lower or 'employee' in filename_lower:
+                person_name = filename.replace('team-', '').replace('staff-', '')
+                suggested_alt = f"Team Member - {person_name.replace('-', ' ').replace('_', ' ').title()}"
+            elif any(word in filename_lower for word in ['icon', 'button', 'arrow', 'chevron']):
+                suggested_alt = f"{filename.replace('-', ' ').replace('_', ' ').title()} Icon"
+            elif 'screenshot' in filename_lower or 'screen' in filename_lower:
+                suggested_alt = f"Screenshot - {filename.replace('screenshot-', '').replace('-', ' ').title()}"
+            elif 'chart' in filename_lower or 'graph' in filename_lower:
+                suggested_alt = f"Chart showing {filename.replace('chart-', '').replace('graph-', '').replace('-', ' ')}"
+            else:
+                # Default: clean up filename
+                suggested_alt = filename.replace('-', ' ').replace('_', ' ').title()
+            image_examples.append({
+                'src': src,
+                'suggested_alt': suggested_alt
+            })
+
+        # Create code example with actual images
+        code_examples = '\n'.join([
+            f'<img src="{ex["src"]}" alt="{ex["suggested_alt"]}">'
+            for ex in image_examples
+        ])
+
+        return [{
+            "type": "phantom",
+            "severity": "medium",
+            "title": "Images Missing Alt Text",
+            "description": f"{features.images_missing_alt} out of {features.image_count} images lack alt text",
+            "url": context.url,
+            "fix_suggestion": "Add descriptive alt text to all images for accessibility and SEO",
+            "image_examples": image_examples,
+            "suggested_code": f'<!-- Examples of images needing alt text -->\n{code_examples}',
+            "issue_points": features.images_missing_alt * 2
+        }]
+
+
+class SimpleInternalLinksRule(SEORule):
+    name = "internal_links"
+    requires = ("links",)
+    profiles = ("full",)
+
+    def evaluate(self, features, context):
+        domain = context.url.split('/')[2] if len(context.url.split('/')) > 2 else ''
+        internal_links = [href for href, _ in features.links if href.startswith('/') or (domain and domain in href)]
+        if len(internal_links) >= 5:
+            return []
+        return [{
+            "type": "zombie",
+            "severity": "low",
+            "title": "Few Internal Links",
+            "description": f"Only {len(internal_links)} internal links found",
+            "url": context.url,
+            "fix_suggestion": "Add more internal links to improve site structure and SEO",
+            "issue_points": 3
+        }]
+
+
+class SimpleSchemaRule(SEORule):
+    name = "schema"
+    requires = ("json_ld",)
+
+    def evaluate(self, features, context):
+        if features.json_ld:
+            return []
+        return [{
+            "type": "specter",
+            "severity": "medium",
+            "title": "No Schema Markup",
+            "description": "No structured data (JSON-LD) found",
+            "url": context.url,
+            "fix_suggestion": "Implement Schema.org markup for rich snippets",
+            "issue_points": 8
+        }]
+
+
+rule_engine = RuleEngine([
+    SimpleTitleRule(),
+    SimpleMetaDescriptionRule(),
+    SimpleH1Rule(),
+    SimpleImageAltRule(),
+    SimpleInternalLinksRule(),
+    SimpleSchemaRule(),
+])
+
 @app.post("/api/analyze")
 async def analyze(request: AnalyzeRequest):
     """Analyze a website for REAL SEO issues"""
@@ -172,334 +490,55 @@ async def analyze(request: AnalyzeRequest):
     if not url.startswith('http'):
         url = f'https://{url}'
     
+    try:
+        rule_engine.select(request.profile, request.rules, request.skip_rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= request.depth <= CRAWL_MAX_PAGES_LIMIT:
+        raise HTTPException(status_code=400, detail=f"depth must be between 1 and {CRAWL_MAX_PAGES_LIMIT}")
+    
     try:
         all_entities = []
         pages_analyzed = 0
         total_issues = 0
+        rule_timings: Dict[str, float] = {}
+        
+        def run_rules(page_url: str, features):
+            nonlocal total_issues
+            result = rule_engine.run(
+                features,
+                RuleContext(url=page_url),
+                profile=request.profile,
+                enabled=request.rules,
+                disabled=request.skip_rules
+            )
+            all_entities.extend(result.entities)
+            total_issues += result.issue_points
+            for rule_name, elapsed_ms in result.timings_ms.items():
+                rule_timings[rule_name] = round(rule_timings.get(rule_name, 0) + elapsed_ms, 3)
         
         async with aiohttp.ClientSession() as session:
             # Analyze main page
-            soup, status_code, error = await analyze_page(session, url)
+            main_features, status_code, error = await analyze_page(session, url)
             if error:
                 raise HTTPException(status_code=400, detail=f"Failed to fetch website: {error}")
+            pages_analyzed = 1
+            run_rules(url, main_features)
             
-            pages_to_analyze = [url]
-            
-            # If depth > 1, find internal links to crawl
-            if request.depth > 1 and soup:
-                internal_links = await find_internal_links(soup, url, max_links=min(request.depth * 3, 10))
-                pages_to_analyze.extend(internal_links[:request.depth - 1])
-            
-            # Analyze each page
-            for page_url in pages_to_analyze:
-                if pages_analyzed >= request.depth:
-                    break
-                    
-                if page_url != url:
-                    soup, status_code, error = await analyze_page(session, page_url)
-                    if error:
+            # depth is the page budget here; crawl the rest of the site
+            # breadth-first and analyze each page as it comes in
+            if request.depth > 1:
+                crawler = SiteCrawler(
+                    lambda page_url: fetch_page(session, page_url),
+                    max_pages=request.depth,
+                    max_depth=CRAWL_MAX_DEPTH
+                )
+                seed_links = [href for href, _ in main_features.links]
+                async for page in crawler.crawl(url, seed_links=seed_links):
+                    if page.features is None:
                         continue
-                
-                pages_analyzed += 1
-                
-                # Parse HTML
-                if not soup:
-                    continue
-                
-                # Real SEO Analysis for this page
-                page_issues = 0
-        
-                # Check for title tag
-                title = soup.find('title')
-                title_text = title.get_text().strip() if title else ""
-                h1_text = soup.find('h1').get_text().strip() if soup.find('h1') else ""
-                
-                if not title or len(title_text) == 0:
-                    # Suggest using H1 as title if available
-                    suggested_title = h1_text[:60] if h1_text else "Your Page Title Here"
-                    all_entities.append({
-                        "type": "ghost",
-                        "severity": "critical",
-                        "title": "Missing Page Title",
-                        "description": "No title tag found - critical for SEO",
-                        "url": page_url,
-                        "fix_suggestion": f"Add a descriptive <title> tag with your target keywords",
-                        "suggested_code": f'<title>{suggested_title}</title>'
-                    })
-                    page_issues += 15
-                elif len(title_text) > 60:
-                    # Suggest shortened version
-                    shortened_title = title_text[:57] + "..." if len(title_text) > 60 else title_text
-                    all_entities.append({
-                        "type": "specter",
-                        "severity": "medium",
-                        "title": "Title Too Long",
-                        "description": f"Title is {len(title_text)} characters (recommended: 50-60)",
-                        "url": page_url,
-                        "fix_suggestion": "Shorten your title tag to 50-60 characters",
-                        "current_content": title_text,
-                        "suggested_code": f'<title>{shortened_title}</title>'
-                    })
-                    page_issues += 5
-        
-                # Get H1 tags early (needed for meta description generation)
-                h1_tags = soup.find_all('h1')
-        
-                # Check for meta description
-                meta_desc = soup.find('meta', attrs={'name': 'description'})
-                if not meta_desc:
-                    # Generate smart, contextual suggestion from page content
-                    suggested_desc = None
-                    
-                    # Strategy 1: Use first meaningful paragraph (most reliable)
-                    paragraphs = soup.find_all('p')
-                    for p in paragraphs[:10]:  # Check first 10 paragraphs
-                        p_text = p.get_text().strip()
-                        # Skip very short paragraphs, navigation, or boilerplate text
-                        skip_phrases = ['cookie', 'javascript', 'browser', 'click here', 'read more', 
-                                       'learn more', 'sign up', 'subscribe', 'follow us', 'copyright']
-                        if len(p_text) > 80 and not any(skip in p_text.lower() for skip in skip_phrases):
-                            desc_text = ' '.join(p_text.split())  # Clean whitespace
-                            if len(desc_text) > 157:
-                                suggested_desc = desc_text[:157] + "..."
-                            else:
-                                suggested_desc = desc_text
-                            break
-                    
-                    # Strategy 2: Combine H1 + first substantial paragraph
-                    if not suggested_desc and h1_tags:
-                        h1_text = h1_tags[0].get_text().strip()
-                        # Find first paragraph with real content
-                        for p in paragraphs[:10]:
-                            p_text = p.get_text().strip()
-                            if len(p_text) > 30:
-                                p_text = ' '.join(p_text.split())
-                                combined = f"{h1_text}. {p_text}"
-                                if len(combined) > 157:
-                                    suggested_desc = combined[:157] + "..."
-                                else:
-                                    suggested_desc = combined
-                                break
-                    
-                    # Strategy 3: Extract from article/main content areas
-                    if not suggested_desc:
-                        main_content = soup.find(['article', 'main', 'section'])
-                        if main_content:
-                            # Get text from main content, skip nav/footer
-                            content_text = main_content.get_text().strip()
-                            content_text = ' '.join(content_text.split())
-                            if len(content_text) > 80:
-                                suggested_desc = content_text[:157] + "..." if len(content_text) > 157 else content_text
-                    
-                    # Strategy 4: Use any text content we can find
-                    if not suggested_desc:
-                        # Get all text, clean it up
-                        all_text = soup.get_text().strip()
-                        all_text = ' '.join(all_text.split())
-                        # Remove common navigation/footer text
-                        lines = [line for line in all_text.split('.') if len(line.strip()) > 30]
-                        if lines:
-                            suggested_desc = lines[0].strip()
-                            if len(suggested_desc) > 157:
-                                suggested_desc = suggested_desc[:157] + "..."
-                    
-                    # Strategy 5: Use title with intelligent context (last resort)
-                    if not suggested_desc and title_text:
-                        # Extract keywords from title
-                        title_lower = title_text.lower()
-                        
-                        # Detect page type from title and structure
-                        if any(word in title_lower for word in ['shop', 'store', 'buy', 'product', 'chocolate', 'farm']):
-                            suggested_desc = f"Visit {title_text} to discover quality products and services. Browse our selection and find exactly what you need."
-                        elif any(word in title_lower for word in ['about', 'who', 'team', 'company']):
-                            suggested_desc = f"Learn about {title_text}. Discover our story, mission, and the team behind our work."
-                        elif any(word in title_lower for word in ['contact', 'reach', 'get in touch']):
-                            suggested_desc = f"{title_text} - Get in touch with us. We're here to answer your questions and help you get started."
-                        elif any(word in title_lower for word in ['blog', 'news', 'article']):
-                            suggested_desc = f"Read the latest from {title_text}. Stay updated with insights, tips, and news."
-                        else:
-                            # Generic but better than nothing
-                            suggested_desc = f"Welcome to {title_text}. Explore our content and discover what we have to offer."
-                    
-                    # Absolute fallback
-                    if not suggested_desc:
-                        suggested_desc = "Explore this page to discover valuable information and resources tailored to your needs."
-                    
-                    # Ensure optimal length
-                    suggested_desc = suggested_desc[:160] if len(suggested_desc) > 160 else suggested_desc
-                    
-                    all_entities.append({
-                        "type": "ghost",
-                        "severity": "high",
-                        "title": "Missing Meta Description",
-                        "description": "No meta description found - this is crucial for search results and click-through rates",
-                        "url": page_url,
-                        "fix_suggestion": f"Add a compelling meta description (150-160 characters) that:\n• Summarizes your page content\n• Includes target keywords naturally\n• Encourages clicks with a clear value proposition\n• Matches user search intent\n\nSuggested based on your content: \"{suggested_desc}\"",
-                        "suggested_code": f'<meta name="description" content="{suggested_desc}">'
-                    })
-                    page_issues += 10
-                elif meta_desc.get('content'):
-                    # Check if existing description is too short or too long
-                    desc_content = meta_desc.get('content', '')
-                    if len(desc_content) < 50:
-                        # Try to expand with page content
-                        first_p = soup.find('p')
-                        expansion_text = ""
-                        if first_p:
-                            p_text = first_p.get_text().strip()
-                            p_text = ' '.join(p_text.split())
-                            # Add relevant content from first paragraph
-                            remaining_chars = 157 - len(desc_content)
-                            if remaining_chars > 20:
-                                expansion_text = " " + p_text[:remaining_chars]
-                        
-                        improved_desc = (desc_content + expansion_text).strip()[:160]
-                        
-                        all_entities.append({
-                            "type": "specter",
-                            "severity": "medium",
-                            "title": "Meta Description Too Short",
-                            "description": f"Meta description is only {len(desc_content)} characters (recommended: 150-160). Short descriptions miss opportunities to attract clicks.",
-                            "url": page_url,
-                            "fix_suggestion": f"Expand your meta description to 150-160 characters by:\n• Adding specific benefits or features\n• Including relevant keywords\n• Highlighting what makes your page unique\n• Adding a call-to-action\n\nCurrent: \"{desc_content}\"\nSuggested: \"{improved_desc}\"",
-                            "current_content": desc_content,
-                            "suggested_code": f'<meta name="description" content="{improved_desc}">'
-                        })
-                        page_issues += 5
-                    elif len(desc_content) > 160:
-                        # Smart truncation - try to end at a sentence or word boundary
-                        shortened_desc = desc_content[:157]
-                        # Try to end at last complete word
-                        last_space = shortened_desc.rfind(' ')
-                        if last_space > 140:  # Only if we're not cutting too much
-                            shortened_desc = shortened_desc[:last_space]
-                        shortened_desc = shortened_desc.rstrip('.,;:') + "..."
-                        
-                        all_entities.append({
-                            "type": "specter",
-                            "severity": "low",
-                            "title": "Meta Description Too Long",
-                            "description": f"Meta description is {len(desc_content)} characters (recommended: 150-160). Google will truncate it in search results.",
-                            "url": page_url,
-                            "fix_suggestion": f"Shorten your meta description to 150-160 characters by:\n• Removing redundant words\n• Focusing on the most important message\n• Keeping the key value proposition\n• Ending with a clear call-to-action\n\nCurrent ({len(desc_content)} chars): \"{desc_content}\"\nSuggested ({len(shortened_desc)} chars): \"{shortened_desc}\"",
-                            "current_content": desc_content,
-                            "suggested_code": f'<meta name="description" content="{shortened_desc}">'
-                        })
-                        page_issues += 3
-        
-                # Check for H1 tags (already defined earlier)
-                if len(h1_tags) == 0:
-                    # Suggest using title or first heading
-                    suggested_h1 = title_text if title_text else "Your Main Heading Here"
-                    all_entities.append({
-                        "type": "zombie",
-                        "severity": "high",
-                        "title": "Missing H1 Tag",
-                        "description": "No H1 heading found on the page",
-                        "url": page_url,
-                        "fix_suggestion": "Add one H1 tag with your primary keyword",
-                        "suggested_code": f'<h1>{suggested_h1}</h1>'
-                    })
-                    page_issues += 10
-                elif len(h1_tags) > 1:
-                    # Show the actual H1s found
-                    h1_list = [h1.get_text().strip()[:50] for h1 in h1_tags[:3]]
-                    all_entities.append({
-                        "type": "zombie",
-                        "severity": "medium",
-                        "title": "Multiple H1 Tags",
-                        "description": f"Found {len(h1_tags)} H1 tags (recommended: 1)",
-                        "url": page_url,
-                        "fix_suggestion": "Use only one H1 tag per page",
-                        "current_content": f"Found: {', '.join(h1_list)}",
-                        "suggested_code": f'<!-- Keep only one H1, convert others to H2 -->\n<h1>{h1_list[0]}</h1>\n<h2>{h1_list[1] if len(h1_list) > 1 else "Subheading"}</h2>'
-                    })
-                    page_issues += 5
-        
-                # Check for images without alt text
-                images = soup.find_all('img')
-                images_without_alt = [img for img in images if not img.get('alt')]
-                if len(images_without_alt) > 0:
-                    # Get actual image sources and suggest SMART AI alt text
-                    image_examples = []
-                    for img in images_without_alt[:3]:  # Show first 3 examples
-                        src = img.get('src', 'unknown')
-                        # SMART AI ALT TEXT GENERATION
-                        filename = src.split('/')[-1].split('.')[0] if src else 'image'
-                        filename_lower = filename.lower()
-                        
-                        # Context-aware smart suggestions
-                        if 'logo' in filename_lower:
-                            suggested_alt = f"{title_text.split('-')[0].strip() if title_text else 'Company'} Logo"
-                        elif 'hero' in filename_lower or 'banner' in filename_lower:
-                            suggested_alt = f"{title_text[:40] if title_text else 'Welcome'} - Hero Banner"
-                        elif 'product' in filename_lower:
-                            product_name = filename.replace('product-', '').replace('product_', '')
-                            suggested_alt = f"Product Image - {product_name.replace('-', ' ').replace('_', ' ').title()}"
-                        elif 'team' in filename_lower or 'staff' in filename_lower or 'employee' in filename_lower:
-                            person_name = filename.replace('team-', '').replace('staff-', '')
-                            suggested_alt = f"Team Member - {person_name.replace('-', ' ').replace('_', ' ').title()}"
-                        elif any(word in filename_lower for word in ['icon', 'button', 'arrow', 'chevron']):
-                            suggested_alt = f"{filename.replace('-', ' ').replace('_', ' ').title()} Icon"
-                        elif 'screenshot' in filename_lower or 'screen' in filename_lower:
-                            suggested_alt = f"Screenshot - {filename.replace('screenshot-', '').replace('-', ' ').title()}"
-                        elif 'chart' in filename_lower or 'graph' in filename_lower:
-                            suggested_alt = f"Chart showing {filename.replace('chart-', '').replace('graph-', '').replace('-', ' ')}"
-                        else:
-                            # Default: clean up filename
-                            suggested_alt = filename.replace('-', ' ').replace('_', ' ').title()
-                        image_examples.append({
-                            'src': src,
-                            'suggested_alt': suggested_alt
-                        })
-                    
-                    # Create code example with actual images
-                    code_examples = '\n'.join([
-                        f'<img src="{ex["src"]}" alt="{ex["suggested_alt"]}">'
-                        for ex in image_examples
-                    ])
-                    
-                    all_entities.append({
-                        "type": "phantom",
-                        "severity": "medium",
-                        "title": "Images Missing Alt Text",
-                        "description": f"{len(images_without_alt)} out of {len(images)} images lack alt text",
-                        "url": page_url,
-                        "fix_suggestion": "Add descriptive alt text to all images for accessibility and SEO",
-                        "image_examples": image_examples,
-                        "suggested_code": f'<!-- Examples of images needing alt text -->\n{code_examples}'
-                    })
-                    page_issues += len(images_without_alt) * 2
-        
-                # Check for broken internal links (simplified)
-                links = soup.find_all('a', href=True)
-                domain = page_url.split('/')[2] if len(page_url.split('/')) > 2 else ''
-                internal_links = [link for link in links if link['href'].startswith('/') or (domain and domain in link['href'])]
-                if len(internal_links) < 5:
-                    all_entities.append({
-                        "type": "zombie",
-                        "severity": "low",
-                        "title": "Few Internal Links",
-                        "description": f"Only {len(internal_links)} internal links found",
-                        "url": page_url,
-                        "fix_suggestion": "Add more internal links to improve site structure and SEO"
-                    })
-                    page_issues += 3
-        
-                # Check for schema markup
-                schema_scripts = soup.find_all('script', type='application/ld+json')
-                if len(schema_scripts) == 0:
-                    all_entities.append({
-                        "type": "specter",
-                        "severity": "medium",
-                        "title": "No Schema Markup",
-                        "description": "No structured data (JSON-LD) found",
-                        "url": page_url,
-                        "fix_suggestion": "Implement Schema.org markup for rich snippets"
-                    })
-                    page_issues += 8
-                
-                total_issues += page_issues
+                    pages_analyzed += 1
+                    run_rules(page.url, page.features)
         
         # Calculate haunting score (0-100, higher is worse)
         haunting_score = min(100, total_issues)
@@ -510,12 +549,11 @@ async def analyze(request: AnalyzeRequest):
         
         # Try to get real competitors from Google API
         competitors = []
-        if request.include_competitors and soup:
-            title_tag = soup.find('title')
-            if title_tag:
+        if request.include_competitors and main_features:
+            if main_features.title is not None:
                 # Create a new session for Google API (the main session might be closed)
                 async with aiohttp.ClientSession() as google_session:
-                    competitors = await analyze_competitors_with_google(google_session, url, title_tag.get_text())
+                    competitors = await analyze_competitors_with_google(google_session, url, main_features.title)
         
         # If we found real competitors from Google, always show them
         if competitors:
@@ -583,7 +621,8 @@ async def analyze(request: AnalyzeRequest):
             "recommendations": recommendations[:5],
             "analysis_complete": True,
             "pages_analyzed": pages_analyzed,
-            "total_issues": len(all_entities)
+            "total_issues": len(all_entities),
+            "rule_timings": rule_timings
         }
         
     except aiohttp.ClientError as e:
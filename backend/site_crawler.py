@@ -0,0 +1,200 @@
+"""
+Site crawler for RankBeacon SEO Exorcist
+Breadth-first, concurrent crawl of a site's internal pages
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from cpu_pool import offload
+from html_features import PageFeatures, extract_page_features
+from http_client import fetch_html
+from url_utils import normalize_url, site_host
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override with environment variables)
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+CRAWL_POLITENESS_DELAY = float(os.getenv("CRAWL_POLITENESS_DELAY", "0.05"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500"))
+CRAWL_MAX_PAGES_LIMIT = int(os.getenv("CRAWL_MAX_PAGES_LIMIT", "50000"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "5"))
+
+# Links to files we never analyze - don't spend requests on them
+SKIPPED_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.pdf', '.zip',
+    '.gz', '.mp3', '.mp4', '.webm', '.avi', '.mov', '.css', '.js', '.json',
+    '.xml', '.txt', '.woff', '.woff2', '.ttf', '.eot', '.doc', '.docx', '.xls', '.xlsx'
+)
+
+# fetch(url) -> (status code, content type, body text)
+FetchFunction = Callable[[str], Awaitable[Tuple[int, str, str]]]
+
+
+@dataclass
+class CrawledPage:
+    """Result of visiting one page; the HTML itself is not kept"""
+    url: str
+    depth: int
+    status_code: Optional[int] = None
+    features: Optional[PageFeatures] = None  # None for errors and non-HTML responses
+    error: Optional[str] = None
+    fetch_ms: float = 0.0
+
+    @property
+    def is_broken(self) -> bool:
+        return self.error is not None or (self.status_code is not None and self.status_code >= 400)
+
+
+def httpx_fetcher(client: httpx.AsyncClient) -> FetchFunction:
+    """Adapt the shared httpx client to the crawler's fetch interface"""
+    async def fetch(url: str) -> Tuple[int, str, str]:
+        response, page = await fetch_html(client, url)
+        return response.status_code, response.headers.get('content-type', ''), page.text
+    return fetch
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawler for a single site
+
+    Workers pull URLs from a FIFO frontier, so pages are visited roughly in
+    depth order. Every discovered URL is normalized and deduplicated before
+    it is queued, consecutive requests to a host are spaced by a politeness
+    delay, and results are yielded as soon as each page is parsed.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchFunction,
+        max_pages: int = CRAWL_MAX_PAGES,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        concurrency: int = CRAWL_CONCURRENCY,
+        politeness_delay: float = CRAWL_POLITENESS_DELAY
+    ):
+        self.fetch = fetch
+        self.max_pages = min(max_pages, CRAWL_MAX_PAGES_LIMIT)
+        self.max_depth = max_depth
+        self.concurrency = max(1, concurrency)
+        self.politeness_delay = politeness_delay
+        self._site = ""
+        self._seen: Set[str] = set()
+        self._next_request_at: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+
+    async def crawl(
+        self,
+        start_url: str,
+        seed_links: Optional[Iterable[str]] = None
+    ) -> AsyncIterator[CrawledPage]:
+        """
+        Crawl from start_url, yielding each page as it is visited
+
+        Args:
+            start_url: First page of the crawl (depth 0)
+            seed_links: Links of an already-analyzed start page; when given the
+                start page is not fetched again and counts towards max_pages
+
+        Yields:
+            CrawledPage records in completion order
+        """
+        root = normalize_url(start_url)
+        if root is None:
+            raise ValueError(f"Cannot crawl non-HTTP URL: {start_url}")
+        self._site = site_host(root)
+
+        frontier: asyncio.Queue = asyncio.Queue()
+        # Bounded so workers pause when the consumer falls behind
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        if seed_links is None:
+            self._enqueue(frontier, root, root, 0)
+        else:
+            self._seen.add(root)
+            for link in seed_links:
+                self._enqueue(frontier, link, root, 1)
+
+        workers = [asyncio.create_task(self._worker(frontier, results)) for _ in range(self.concurrency)]
+
+        async def finish():
+            await frontier.join()
+            await results.put(None)
+
+        supervisor = asyncio.create_task(finish())
+        try:
+            while True:
+                page = await results.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            supervisor.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(supervisor, *workers, return_exceptions=True)
+
+    def _enqueue(self, frontier: asyncio.Queue, href: str, base: str, depth: int):
+        """Queue a link if it is internal, new, and within the crawl budgets"""
+        if depth > self.max_depth or len(self._seen) >= self.max_pages:
+            return
+        url = normalize_url(href, base)
+        if url is None or url in self._seen or site_host(url) != self._site:
+            return
+        if urlsplit(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+            return
+        self._seen.add(url)
+        frontier.put_nowait((url, depth))
+
+    async def _worker(self, frontier: asyncio.Queue, results: asyncio.Queue):
+        while True:
+            url, depth = await frontier.get()
+            try:
+                try:
+                    page = await self._visit(url, depth)
+                    if page.features is not None and depth < self.max_depth:
+                        for href, _ in page.features.links:
+                            self._enqueue(frontier, href, url, depth + 1)
+                except Exception as e:
+                    # One bad page must not kill the worker and stall the crawl
+                    logger.warning(f"⚠️ Crawl of {url} failed: {e}")
+                    page = CrawledPage(url=url, depth=depth, error=str(e) or type(e).__name__)
+                await results.put(page)
+            finally:
+                frontier.task_done()
+
+    async def _visit(self, url: str, depth: int) -> CrawledPage:
+        await self._wait_for_host(urlsplit(url).netloc)
+        start = time.perf_counter()
+        try:
+            status_code, content_type, text = await self.fetch(url)
+        except Exception as e:
+            logger.debug(f"Crawl fetch failed for {url}: {e}")
+            return CrawledPage(url=url, depth=depth, error=str(e) or type(e).__name__,
+                               fetch_ms=round((time.perf_counter() - start) * 1000, 3))
+
+        page = CrawledPage(url=url, depth=depth, status_code=status_code,
+                           fetch_ms=round((time.perf_counter() - start) * 1000, 3))
+        if status_code < 400 and (not content_type or 'html' in content_type.lower()):
+            page.features = await offload(extract_page_features, text, size=len(text))
+        return page
+
+    async def _wait_for_host(self, host: str):
+        """Space request starts to one host at least politeness_delay apart"""
+        if self.politeness_delay <= 0:
+            return
+        if host not in self._host_locks:
+            self._host_locks[host] = asyncio.Lock()
+        # Only the wait is serialized; fetches to the host still overlap
+        async with self._host_locks[host]:
+            loop = asyncio.get_running_loop()
+            wait = self._next_request_at.get(host, 0) - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_request_at[host] = loop.time() + self.politeness_delay
@@ -0,0 +1,141 @@
+"""
+SPA detector for RankBeacon SEO Exorcist
+Scores static HTML for client-side rendering before paying for a headless render
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import AbstractSet, Dict, Optional
+
+from html_features import PageFeatures
+
+# Defaults (override with environment variables)
+SPA_SCORE_THRESHOLD = float(os.getenv("SPA_SCORE_THRESHOLD", "0.5"))
+SPA_MIN_TEXT_WORDS = int(os.getenv("SPA_MIN_TEXT_WORDS", "150"))  # less server text than this looks like a shell
+
+# Signal weights; the score is their sum clamped to 0..1
+SIGNAL_WEIGHTS = {
+    "empty_mount_node": 0.45,     # <div id="root"></div> and friends
+    "little_text": 0.25,          # scaled by how far below SPA_MIN_TEXT_WORDS
+    "script_heavy": 0.25,         # scaled by inline script bytes vs visible text
+    "framework": 0.15,            # client-side framework fingerprint
+    "noscript_warning": 0.25,     # "please enable JavaScript"
+    "server_rendered_text": -0.5, # plenty of text already in the static HTML
+}
+
+MOUNT_IDS = ('root', 'app', '__next', '__nuxt', '___gatsby', 'svelte', 'main-app', 'q-app')
+EMPTY_MOUNT_RE = re.compile(
+    r'<(div|main|section)\b[^>]*\bid\s*=\s*["\']?(?:' + '|'.join(MOUNT_IDS) + r')["\'\s>][^>]*>\s*</\1\s*>'
+    r'|<(app-root)\b[^>]*>\s*</app-root\s*>',
+    re.IGNORECASE
+)
+SCRIPT_RE = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+NOSCRIPT_RE = re.compile(r'<noscript\b[^>]*>(.*?)</noscript\s*>', re.IGNORECASE | re.DOTALL)
+
+FRAMEWORK_FINGERPRINTS = {
+    "next": re.compile(r'__NEXT_DATA__'),
+    "react": re.compile(r'data-reactroot|data-reactid'),
+    "angular": re.compile(r'ng-version='),
+    "angularjs": re.compile(r'\bng-app\b'),
+    "nuxt": re.compile(r'__NUXT__'),
+    "vue": re.compile(r'data-v-app\b'),
+    "gatsby": re.compile(r'id=["\']___gatsby'),
+    "svelte": re.compile(r'class=["\'][^"\']*\bsvelte-[a-z0-9]+'),
+    "ember": re.compile(r'ember-application'),
+}
+
+AVG_WORD_BYTES = 6  # word plus separator, for comparing text with script bytes
+
+
+@dataclass
+class SPAVerdict:
+    """Detector output; signals maps each fired signal to its score contribution"""
+    score: float
+    threshold: float = SPA_SCORE_THRESHOLD
+    signals: Dict[str, float] = field(default_factory=dict)
+    framework: Optional[str] = None
+
+    @property
+    def is_spa(self) -> bool:
+        return self.score >= self.threshold
+
+
+def detect_spa(
+    html: str,
+    features: PageFeatures,
+    threshold: float = SPA_SCORE_THRESHOLD,
+    markers: Optional[AbstractSet[str]] = None
+) -> SPAVerdict:
+    """
+    Score how likely a page needs JavaScript to show its content
+
+    Args:
+        html: Static HTML as fetched
+        features: Features already extracted from that HTML
+        threshold: Score at or above which the page is treated as an SPA
+        markers: http_client.HTML_MARKERS found while streaming the page;
+            fingerprints and the noscript check are skipped when their marker is absent
+
+    Returns:
+        SPAVerdict with the score and the signals that contributed
+    """
+    signals: Dict[str, float] = {}
+
+    if EMPTY_MOUNT_RE.search(html):
+        signals["empty_mount_node"] = SIGNAL_WEIGHTS["empty_mount_node"]
+
+    words = features.word_count
+    if words < SPA_MIN_TEXT_WORDS:
+        signals["little_text"] = SIGNAL_WEIGHTS["little_text"] * (1 - words / SPA_MIN_TEXT_WORDS)
+    else:
+        signals["server_rendered_text"] = SIGNAL_WEIGHTS["server_rendered_text"]
+
+    script_bytes = sum(
+        len(body) for attrs, body in SCRIPT_RE.findall(html)
+        if 'ld+json' not in attrs.lower()  # structured data is content, not app code
+    )
+    if script_bytes:
+        script_share = script_bytes / (script_bytes + words * AVG_WORD_BYTES)
+        if script_share > 0.5:
+            signals["script_heavy"] = SIGNAL_WEIGHTS["script_heavy"] * (script_share - 0.5) / 0.5
+
+    framework = next((
+        name for name, pattern in FRAMEWORK_FINGERPRINTS.items()
+        if (markers is None or name in markers) and pattern.search(html)
+    ), None)
+    if framework:
+        signals["framework"] = SIGNAL_WEIGHTS["framework"]
+
+    if (markers is None or "noscript" in markers) and any(
+        'javascript' in body.lower() for body in NOSCRIPT_RE.findall(html)
+    ):
+        signals["noscript_warning"] = SIGNAL_WEIGHTS["noscript_warning"]
+
+    score = min(1.0, max(0.0, sum(signals.values())))
+    return SPAVerdict(
+        score=round(score, 3),
+        threshold=threshold,
+        signals={name: round(value, 3) for name, value in signals.items()},
+        framework=framework
+    )
+
+
+def rendering_changed(static: PageFeatures, rendered: PageFeatures) -> bool:
+    """
+    Did the headless render surface anything the static analysis missed?
+
+    Compares the features the SEO rules read; small text and link count
+    drift (timestamps, widgets) doesn't count as a change.
+    """
+    if (static.title or '').strip() != (rendered.title or '').strip():
+        return True
+    if static.meta_description != rendered.meta_description:
+        return True
+    if static.heading_counts.get('h1', 0) != rendered.heading_counts.get('h1', 0):
+        return True
+    if len(static.json_ld) != len(rendered.json_ld):
+        return True
+    if abs(len(static.links) - len(rendered.links)) > max(3, len(static.links) * 0.1):
+        return True
+    return abs(static.word_count - rendered.word_count) > max(50, static.word_count * 0.2)
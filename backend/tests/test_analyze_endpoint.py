@@ -0,0 +1,382 @@
+"""
+Analyze Endpoint Tests
+Conditional re-fetch of unchanged pages through /api/analyze
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from fastapi.testclient import TestClient
+
+import http_client
+import main
+from jobs import JobStore
+from performance_optimizer import CacheManager
+
+
+PAGE = (
+    "<html><head><title>Haunted Chocolate Farm - Handmade Treats</title></head>"
+    "<body><h1>Handmade Chocolate</h1><p>" + "Small batch chocolate from our farm. " * 60 + "</p></body></html>"
+)
+
+
+class FakeSite:
+    """Serves one page and honours If-None-Match / If-Modified-Since like a real server would"""
+
+    def __init__(self, etag='"v1"', last_modified="Mon, 12 Oct 2026 08:00:00 GMT", supports_validators=True):
+        self.body = PAGE
+        self.etag = etag
+        self.last_modified = last_modified
+        self.supports_validators = supports_validators
+        self.requests = []
+        self.broken_paths = set()
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.url.path in self.broken_paths:
+            return httpx.Response(500)
+        headers = {"content-type": "text/html; charset=utf-8"}
+        if self.supports_validators:
+            headers.update({"etag": self.etag, "last-modified": self.last_modified})
+            if request.headers.get("if-none-match") == self.etag:
+                return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers=headers, text=self.body)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """Fake site wired into the shared client, with a fresh cache and a parse counter"""
+    fake = FakeSite()
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    monkeypatch.setattr(main, "cache_manager", CacheManager(disk_path=""))
+
+    fake.parses = 0
+    extract = main.extract_page_features
+
+    def counting_extract(html):
+        fake.parses += 1
+        return extract(html)
+
+    monkeypatch.setattr(main, "extract_page_features", counting_extract)
+    return fake
+
+
+def analyze(url="https://chocolate.example/", use_js_rendering=False):
+    request = main.WebsiteAnalysisRequest(url=url, use_js_rendering=use_js_rendering)
+    return asyncio.run(main.analyze_website(request, BackgroundTasks()))
+
+
+def next_day():
+    """The hourly analysis cache has expired; the week-long validators have not"""
+    main.cache_manager.analysis_cache.clear()
+
+
+def test_oversized_page_analyzed_up_to_byte_budget(site, monkeypatch):
+    """Test a page over HTML_MAX_BYTES is cut off, still analyzed, and flagged"""
+    monkeypatch.setattr(http_client, "HTML_MAX_BYTES", 1000)
+    site.body = PAGE + "<p>" + "Endless footer links. " * 5000 + "</p>"
+
+    analysis = analyze()
+
+    assert "cut off after 1,000 bytes" in analysis.warning
+    assert analysis.entities
+    assert site.parses == 1
+
+
+def test_unchanged_page_revalidated_with_304(site):
+    """Test a re-analysis sends If-None-Match and reuses entities on 304"""
+    first = analyze()
+    next_day()
+    second = analyze()
+
+    assert site.requests[1].headers["if-none-match"] == '"v1"'
+    assert site.requests[1].headers["if-modified-since"] == "Mon, 12 Oct 2026 08:00:00 GMT"
+    assert site.parses == 1
+    assert second.content_unchanged
+    assert not first.content_unchanged
+    assert second.entities == first.entities
+    assert second.analysis_timestamp > first.analysis_timestamp
+
+
+def test_same_content_hash_skips_reparse(site):
+    """Test servers without validators are short-circuited by the body hash"""
+    site.supports_validators = False
+
+    first = analyze()
+    next_day()
+    second = analyze()
+
+    assert "if-none-match" not in site.requests[1].headers
+    assert site.parses == 1
+    assert second.content_unchanged
+    assert second.haunting_score == first.haunting_score
+
+
+def test_stale_analysis_served_while_one_refresh_runs(site):
+    """Test an analysis past its TTL is returned at once and refreshed once in the background"""
+    now = [0.0]
+    main.cache_manager.analysis_cache.clock = lambda: now[0]
+    first = analyze()
+    now[0] += main.cache_manager.analysis_cache.default_ttl + 1
+
+    async def stale_requests():
+        request = main.WebsiteAnalysisRequest(url="https://chocolate.example/")
+        responses = [await main.analyze_website(request, BackgroundTasks()) for _ in range(5)]
+        refreshing = main.analysis_flights.running(main.analysis_flight_key(request))
+        while main.analysis_flights.running(main.analysis_flight_key(request)):
+            await asyncio.sleep(0.01)
+        return responses, refreshing
+
+    responses, refreshing = asyncio.run(stale_requests())
+
+    assert refreshing
+    assert all(response.analysis_timestamp == first.analysis_timestamp for response in responses)
+    assert len(site.requests) == 2  # the original fetch and one conditional refresh
+    assert site.requests[1].headers["if-none-match"] == '"v1"'
+    refreshed, fresh = asyncio.run(main.cache_manager.get_analysis_entry("https://chocolate.example/"))
+    assert fresh
+    assert main.SEOAnalysisResponse(**refreshed).analysis_timestamp > first.analysis_timestamp
+
+
+def test_js_redirect_target_changes_are_not_missed(site, monkeypatch):
+    """Test a page reached through a JS redirect stub is reanalyzed when only the target changes"""
+    stub = '<html><head><script>window.location.href="/real";</script></head><body></body></html>'
+
+    def handler(request):
+        site.requests.append(request)
+        if request.url.path == "/real":
+            return httpx.Response(200, headers={"content-type": "text/html"}, text=site.body)
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"stub"'}, text=stub)
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    analyze()
+    next_day()
+    site.body = PAGE.replace("<h1>Handmade Chocolate</h1>", "")
+    second = analyze()
+
+    assert "if-none-match" not in site.requests[2].headers
+    assert not second.content_unchanged
+    assert any(entity.title == "Missing H1 Zombie" for entity in second.entities)
+
+
+def test_changed_page_is_reanalyzed(site):
+    """Test a new ETag and body trigger a full parse and replace the stored analysis"""
+    analyze()
+    next_day()
+    site.etag = '"v2"'
+    site.body = PAGE.replace("<h1>Handmade Chocolate</h1>", "")
+    second = analyze()
+
+    assert site.parses == 2
+    assert not second.content_unchanged
+    assert any(entity.title == "Missing H1 Zombie" for entity in second.entities)
+
+    next_day()
+    third = analyze()
+
+    assert site.requests[-1].headers["if-none-match"] == '"v2"'
+    assert third.content_unchanged
+    assert third.entities == second.entities
+
+
+SHELL = (
+    '<html><head><title>Haunted Chocolate Farm - Handmade Treats</title><script src="/app.js" defer></script></head>'
+    '<body><noscript>Please enable JavaScript.</noscript><div id="root"></div></body></html>'
+)
+
+
+@pytest.fixture
+def renderer(site, monkeypatch):
+    """App-shell site with a stand-in JS renderer that counts renders"""
+    site.body = SHELL
+    site.supports_validators = False
+    site.rendered_html = PAGE
+    site.renders = 0
+
+    async def fake_fetch_with_js(url, timeout=30000, keep_css=False):
+        site.renders += 1
+        return {"html": site.rendered_html, "blocked_requests": 0}
+
+    monkeypatch.setattr(main, "PLAYWRIGHT_AVAILABLE", True)
+    monkeypatch.setattr(main, "fetch_with_js", fake_fetch_with_js, raising=False)
+    return site
+
+
+def test_render_skipped_when_it_did_not_change_the_site(renderer):
+    """Test a site whose render added nothing is analyzed statically next time"""
+    renderer.rendered_html = SHELL
+
+    analyze("https://chocolate.example/", use_js_rendering=True)
+    second = analyze("https://chocolate.example/shop", use_js_rendering=True)
+
+    assert renderer.renders == 1
+    assert second.warning is None
+    assert not any(entity.title == "JavaScript-Rendered Content Detected" for entity in second.entities)
+
+
+def test_render_repeated_when_it_changed_the_site(renderer):
+    """Test sites that need rendering keep getting rendered"""
+    static = analyze("https://chocolate.example/about")
+    first = analyze("https://chocolate.example/", use_js_rendering=True)
+    second = analyze("https://www.chocolate.example/shop", use_js_rendering=True)
+
+    assert renderer.renders == 2
+    assert any(entity.title == "Missing H1 Zombie" for entity in static.entities)
+    assert not any(entity.title == "Missing H1 Zombie" for entity in first.entities + second.entities)
+
+
+def run_batch(urls, **options):
+    """Collect the NDJSON records streamed by /api/analyze/batch"""
+    async def collect():
+        response = await main.analyze_batch(main.BatchAnalysisRequest(urls=urls, use_js_rendering=False, **options))
+        assert response.media_type == "application/x-ndjson"
+        return [json.loads(line) async for line in response.body_iterator]
+    return asyncio.run(collect())
+
+
+def test_batch_streams_results_errors_and_summary(site):
+    """Test every URL gets a record (by index) and the stream ends with a summary"""
+    site.broken_paths.add("/broken")
+    urls = [f"https://shop{i % 3}.example/page/{i}" for i in range(9)] + ["https://shop0.example/broken"]
+
+    records = run_batch(urls)
+
+    results = [record for record in records if record["type"] == "result"]
+    errors = [record for record in records if record["type"] == "error"]
+    assert records[-1] == {**records[-1], "type": "summary", "total": 10, "succeeded": 9, "failed": 1}
+    assert sorted(record["index"] for record in results + errors) == list(range(10))
+    assert errors[0]["url"] == "https://shop0.example/broken" and errors[0]["status_code"] == 500
+    assert all(record["analysis"]["url"] == urls[record["index"]] for record in results)
+
+
+def test_batch_rejects_bad_options_up_front(site):
+    """Test invalid options fail the whole batch with a 400 before streaming"""
+    with pytest.raises(HTTPException) as excinfo:
+        run_batch(["https://chocolate.example/"], rules=["poltergeist"])
+
+    assert excinfo.value.status_code == 400
+    assert site.requests == []
+
+
+@pytest.mark.parametrize("max_links", ["lots", -5, 0, 2.5, True])
+def test_broken_links_rejects_bad_budget(site, max_links):
+    """Test an invalid max_links is a 400 before any page is fetched"""
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.find_broken_links({"url": "https://chocolate.example/", "max_links": max_links}))
+
+    assert excinfo.value.status_code == 400
+    assert site.requests == []
+
+
+def test_broken_links_honours_budget(site):
+    """Test a valid max_links caps how many links are checked"""
+    site.body = PAGE.replace("</body>", "".join(f'<a href="/page/{i}">Page {i}</a>' for i in range(5)) + "</body>")
+
+    result = asyncio.run(main.find_broken_links({"url": "https://chocolate.example/", "max_links": 2}))
+
+    assert result["total_links_found"] == 5
+    assert result["total_links_checked"] == 2
+    assert result["budget_exhausted"]
+
+
+@pytest.fixture
+def jobs(site, monkeypatch):
+    """The app's job runner on a fresh in-memory queue"""
+    monkeypatch.setattr(main.job_runner, "store", JobStore(""))
+    monkeypatch.setattr(main.job_runner, "poll_interval", 0.05)
+    return main.job_runner
+
+
+async def poll_until_finished(job_id):
+    for _ in range(200):
+        job = await main.get_job(job_id)
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_analysis_job_submitted_and_polled(jobs):
+    """Test a queued analysis returns at once and its result is pollable"""
+    async def run():
+        await jobs.start()
+        try:
+            accepted = await main.submit_job(main.JobRequest(
+                kind="analyze", params={"url": "https://chocolate.example/", "use_js_rendering": False}
+            ))
+            return accepted, await poll_until_finished(accepted["job_id"])
+        finally:
+            await jobs.stop()
+
+    accepted, job = asyncio.run(run())
+
+    assert accepted["status"] == "queued"
+    assert job["status"] == "succeeded" and job["progress"] == 1
+    assert job["result"]["url"] == "https://chocolate.example/"
+    assert job["result"]["haunting_score"] >= 0
+
+
+def test_include_competitors_queues_a_job(jobs):
+    """Test include_competitors hands back a job id whose result is kept"""
+    async def run():
+        await jobs.start()
+        try:
+            analysis = await main.analyze_website(main.WebsiteAnalysisRequest(
+                url="https://chocolate.example/", use_js_rendering=False, include_competitors=True,
+                competitor_urls=["https://rival.example/"]
+            ), BackgroundTasks())
+            return analysis, await poll_until_finished(analysis.competitor_job_id)
+        finally:
+            await jobs.stop()
+
+    analysis, job = asyncio.run(run())
+
+    assert job["kind"] == "competitors"
+    assert job["status"] == "succeeded"
+    assert [competitor["url"] for competitor in job["result"]["competitors"]] == ["https://rival.example/"]
+    assert asyncio.run(main.cache_manager.get_analysis("https://chocolate.example/"))["competitor_job_id"] is None
+
+
+def test_invalid_job_rejected(jobs):
+    """Test unknown kinds and invalid params fail with 400 instead of queueing"""
+    for request in (
+        main.JobRequest(kind="seance", params={}),
+        main.JobRequest(kind="analyze", params={"url": "not a url"}),
+        main.JobRequest(kind="analyze", params={"url": "https://chocolate.example/", "rules": ["poltergeist"]}),
+    ):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(main.submit_job(request))
+        assert excinfo.value.status_code == 400
+
+    assert jobs.store.list() == []
+
+
+def test_websocket_streams_progress_then_result(site):
+    """Test /ws/analyze emits pipeline events before the complete analysis"""
+    site.body = PAGE.replace("<h1>Handmade Chocolate</h1>", "")
+
+    with TestClient(main.app).websocket_connect("/ws/analyze") as websocket:
+        websocket.send_json({"url": "https://chocolate.example/", "use_js_rendering": False})
+        events = []
+        while not events or events[-1]["type"] not in ("complete", "error"):
+            events.append(websocket.receive_json())
+
+    types = [event["type"] for event in events]
+    assert types == ["started", "fetched", "parsed", "entities", "complete"]
+    found = [entity["title"] for entity in events[3]["entities"]]
+    assert "Missing H1 Zombie" in found
+    assert [entity["title"] for entity in events[-1]["analysis"]["entities"]] == found
+    assert main.broadcaster.subscriber_count() == 0
+
+
+def test_websocket_rejects_invalid_request(site):
+    """Test a bad request gets an error event instead of an audit"""
+    with TestClient(main.app).websocket_connect("/ws/analyze") as websocket:
+        websocket.send_json({"url": "https://chocolate.example/", "rules": ["poltergeist"]})
+        event = websocket.receive_json()
+
+    assert event["type"] == "error" and event["status_code"] == 400
+    assert site.requests == []
@@ -0,0 +1,96 @@
+"""
+Audit Event Tests
+Topic fan-out, bounded subscriber queues and context-routed emits
+"""
+
+import asyncio
+
+from audit_events import EventBroadcaster, Subscription, audit_topic, broadcaster, emit, listening
+
+
+async def drain(subscription):
+    return [event async for event in subscription]
+
+
+def test_fan_out_to_every_subscriber_of_a_topic():
+    """Test each subscriber of a topic gets every event; other topics get none"""
+    async def run():
+        events = EventBroadcaster()
+        first, second = events.subscribe("audit-1"), events.subscribe("audit-1")
+        other = events.subscribe("audit-2")
+        for i in range(3):
+            events.publish("audit-1", {"type": "page", "n": i})
+        for subscription in (first, second, other):
+            subscription.close()
+        return await drain(first), await drain(second), await drain(other)
+
+    first, second, other = asyncio.run(run())
+
+    assert [event["n"] for event in first] == [0, 1, 2]
+    assert first == second
+    assert other == []
+
+
+def test_slow_subscriber_drops_oldest_and_is_told():
+    """Test a full queue drops the oldest events and reports how many were missed"""
+    async def run():
+        subscription = Subscription("audit", max_queue=3)
+        for i in range(10):
+            subscription.push({"type": "page", "n": i})
+        subscription.close()
+        return await drain(subscription)
+
+    received = asyncio.run(run())
+
+    assert received[0] == {"type": "dropped", "count": 7}
+    assert [event["n"] for event in received[1:]] == [7, 8, 9]
+
+
+def test_late_subscriber_gets_replay():
+    """Test joining an audit in progress replays what was already published"""
+    async def run():
+        events = EventBroadcaster(history=2)
+        early = events.subscribe("audit")
+        for i in range(3):
+            events.publish("audit", {"type": "page", "n": i})
+        late = events.subscribe("audit")
+        events.publish("audit", {"type": "page", "n": 3})
+        early.close()
+        late.close()
+        return await drain(late)
+
+    late = asyncio.run(run())
+
+    assert [event["n"] for event in late] == [1, 2, 3]
+
+
+def test_publishing_without_subscribers_keeps_nothing():
+    """Test audits nobody is watching cost nothing and leave no history"""
+    events = EventBroadcaster()
+    events.publish("audit", {"type": "page"})
+
+    assert events.get_stats() == {"topics": 0, "subscribers": 0, "published": 0, "delivered": 0}
+    assert events.subscribe("audit").dropped == 0
+
+
+def test_emit_follows_context_into_tasks():
+    """Test emits from tasks started inside audit_topic reach that topic"""
+    async def run():
+        subscription = broadcaster.subscribe("audit-ctx")
+
+        async def work():
+            emit("fetched", url="https://example.com/")
+            return listening()
+
+        with audit_topic("audit-ctx"):
+            task = asyncio.ensure_future(work())
+        emit("outside")  # no topic in this context
+        was_listening = await task
+        broadcaster.unsubscribe(subscription)
+        return await drain(subscription), was_listening
+
+    received, was_listening = asyncio.run(run())
+
+    assert was_listening
+    assert [event["type"] for event in received] == ["fetched"]
+    assert received[0]["url"] == "https://example.com/"
@@ -0,0 +1,116 @@
+"""
+Batch Runner Tests
+Concurrency caps, per-host fairness and error capture in HostFairPool
+"""
+
+import asyncio
+
+from batch_runner import HostFairPool
+
+
+def host_of(url):
+    return url.split("/")[2]
+
+
+class Tracker:
+    """Fake job that records concurrency per host and start order"""
+
+    def __init__(self, latency=0.01, fail=()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.started = []
+
+    async def work(self, url):
+        host = host_of(url)
+        self.started.append(url)
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        self.peak_total = max(self.peak_total, sum(self.active.values()))
+        try:
+            await asyncio.sleep(self.latency)
+            if url in self.fail:
+                raise ValueError(f"failed {url}")
+            return url.upper()
+        finally:
+            self.active[host] -= 1
+
+
+async def collect(pool, items, work):
+    return [outcome async for outcome in pool.run(items, work, host_of)]
+
+
+def test_every_item_runs_once_with_results_and_errors():
+    """Test results and exceptions come back on the outcome for the right index"""
+    urls = [f"https://a.example/{i}" for i in range(10)]
+    tracker = Tracker(fail={urls[3]})
+
+    outcomes = asyncio.run(collect(HostFairPool(concurrency=4, per_host=4), urls, tracker.work))
+
+    by_index = {outcome.index: outcome for outcome in outcomes}
+    assert sorted(by_index) == list(range(10))
+    assert isinstance(by_index[3].error, ValueError)
+    assert by_index[0].result == urls[0].upper() and by_index[0].error is None
+
+
+def test_concurrency_and_per_host_caps():
+    """Test neither the global nor the per-host limit is exceeded"""
+    urls = [f"https://big.example/{i}" for i in range(30)] + [f"https://small{i}.example/" for i in range(10)]
+    tracker = Tracker()
+
+    asyncio.run(collect(HostFairPool(concurrency=6, per_host=2), urls, tracker.work))
+
+    assert tracker.peak_total == 6
+    assert max(tracker.peak.values()) == 2
+
+
+def test_small_sites_not_starved_by_big_one():
+    """Test a site listed after hundreds of another site's URLs still starts early"""
+    urls = [f"https://big.example/{i}" for i in range(200)] + ["https://small.example/"]
+    tracker = Tracker(latency=0.001)
+
+    asyncio.run(collect(HostFairPool(concurrency=4, per_host=2), urls, tracker.work))
+
+    assert tracker.started.index("https://small.example/") < 4
+
+
+def test_batch_runs_every_site_in_parallel():
+    """Test 100 URLs across 10 sites fill the whole pool, two per site, rather than running one at a time"""
+    urls = [f"https://site{i % 10}.example/{i}" for i in range(100)]
+    tracker = Tracker(latency=0.02)
+
+    outcomes = asyncio.run(collect(HostFairPool(concurrency=20, per_host=2), urls, tracker.work))
+
+    assert len(outcomes) == 100
+    assert tracker.peak_total == 20
+    assert tracker.peak == {f"site{i}.example": 2 for i in range(10)}
+
+
+def test_stopping_early_cancels_running_work():
+    """Test a consumer that stops (client disconnect) cancels in-flight jobs"""
+    async def run():
+        cancelled = []
+
+        async def slow(url):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+
+        async def quick_then_slow(url):
+            return url if url.endswith("/0") else await slow(url)
+
+        stream = HostFairPool(concurrency=3, per_host=3).run(
+            [f"https://a.example/{i}" for i in range(5)], quick_then_slow, host_of
+        )
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first, cancelled
+
+    first, cancelled = asyncio.run(run())
+
+    assert first.result == "https://a.example/0"
+    assert len(cancelled) == 2
@@ -0,0 +1,144 @@
+"""
+CPU Pool Tests
+Offloading parsing and rule evaluation keeps the event loop responsive
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+import cpu_pool
+from cpu_pool import close_cpu_pool, offload, start_cpu_pool
+from html_features import extract_page_features
+from seo_rules import RuleContext, run_default_rules
+
+
+def big_page(paragraphs=20000):
+    """~3 MB page of the kind that used to stall every other request"""
+    body = "".join(
+        f'<h2>Section {i}</h2><p>Spooky paragraph {i} with <a href="/p/{i}">a link</a> and '
+        f'<img src="/i/{i}.png"> some filler text to make it realistic.</p>'
+        for i in range(paragraphs)
+    )
+    return f"<html><head><title>Big Haunted Page</title></head><body><h1>Big</h1>{body}</body></html>"
+
+
+def die_once(marker):
+    """Kills its worker process the first time it runs"""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+@pytest.fixture
+def pool():
+    start_cpu_pool("process", workers=2)
+    yield cpu_pool
+    close_cpu_pool()
+
+
+async def max_loop_lag(work):
+    """Run work while a ticker measures the longest the event loop was blocked"""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - before - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    result = await work()
+    done = True
+    await tick
+    return result, max(lags)
+
+
+def test_runs_inline_until_started():
+    """Test scripts and tests without a pool get the plain synchronous call"""
+    html = big_page(10)
+
+    features = asyncio.run(offload(extract_page_features, html, size=10 ** 9))
+
+    assert features == extract_page_features(html)
+    assert cpu_pool.get_stats()["mode"] == "inline"
+
+
+def test_process_pool_returns_same_features_and_rules(pool):
+    """Test parsing and rule evaluation in a worker match the inline results"""
+    html = big_page(2000)
+    context = RuleContext(url="https://example.com/")
+
+    async def run():
+        features = await offload(extract_page_features, html, size=len(html))
+        result = await offload(run_default_rules, features, context, size=features.html_length)
+        small = await offload(extract_page_features, "<title>t</title>", size=16)
+        return features, result, small
+
+    features, result, small = asyncio.run(run())
+
+    assert features == extract_page_features(html)
+    assert result.entities == run_default_rules(features, context).entities
+    assert small.title == "t"
+    assert pool.get_stats()["offloaded"] >= 2
+
+
+def test_big_page_does_not_block_the_loop(pool):
+    """Benchmark: event loop stall while parsing a ~3 MB page, inline vs offloaded"""
+    html = big_page()
+
+    async def run():
+        await offload(extract_page_features, big_page(100), size=10 ** 9)  # workers warmed up
+        inline = await max_loop_lag(lambda: asyncio.sleep(0, extract_page_features(html)))
+        offloaded = await max_loop_lag(lambda: offload(extract_page_features, html, size=len(html)))
+        return inline, offloaded
+
+    (inline_features, inline_lag), (offloaded_features, offloaded_lag) = asyncio.run(run())
+
+    assert offloaded_features == inline_features
+    assert offloaded_lag < inline_lag / 2
+
+
+def test_pool_restarts_after_worker_crash(pool, tmp_path):
+    """Test a dead worker is replaced and the call retried"""
+    marker = str(tmp_path / "died")
+    restarts = pool.get_stats()["pool_restarts"]
+
+    pid = asyncio.run(offload(die_once, marker, size=10 ** 9))
+
+    assert pid != os.getpid()
+    assert pool.get_stats()["pool_restarts"] == restarts + 1
+
+
+def test_concurrent_calls_on_a_broken_pool_restart_it_once(pool, tmp_path):
+    """Test every call in flight when a worker dies is retried on one replacement pool"""
+    marker = str(tmp_path / "died")
+    restarts = pool.get_stats()["pool_restarts"]
+
+    async def run():
+        return await asyncio.gather(*(offload(die_once, marker, size=10 ** 9) for _ in range(6)))
+
+    pids = asyncio.run(run())
+
+    assert len(pids) == 6 and os.getpid() not in pids
+    assert pool.get_stats()["pool_restarts"] == restarts + 1
+
+
+def test_thread_mode():
+    """Test thread mode for parsers that release the GIL"""
+    start_cpu_pool("thread", workers=2)
+    try:
+        html = big_page(1000)
+        features = asyncio.run(offload(extract_page_features, html, size=len(html)))
+        assert features.title == "Big Haunted Page"
+        assert cpu_pool.get_stats()["mode"] == "thread"
+    finally:
+        close_cpu_pool()
+
+    with pytest.raises(ValueError):
+        start_cpu_pool("fibers")
@@ -0,0 +1,141 @@
+"""
+HTML Feature Extraction Tests
+Parity with BeautifulSoup and a parse benchmark over saved HTML fixtures
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from html_features import extract_page_features, LXML_AVAILABLE
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+CORPUS = sorted(FIXTURES.glob("*.html"))
+BACKENDS = [False, True] if LXML_AVAILABLE else [False]
+
+
+def load(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def multi_pass_reference(html: str) -> dict:
+    """The old detect_seo_entities approach: html.parser + one tree walk per check"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.find('title')
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    images = soup.find_all('img')
+    links = soup.find_all('a', href=True)
+    schema = soup.find_all('script', type='application/ld+json')
+    h1_tags = soup.find_all('h1')
+    for tag in soup(['script', 'style', 'template']):
+        tag.decompose()
+    return {
+        "title": title.get_text() if title else None,
+        "meta_description": meta_desc.get('content') if meta_desc else None,
+        "h1_count": len(h1_tags),
+        "image_count": len(images),
+        "images_missing_alt": len([img for img in images if not img.get('alt')]),
+        "link_count": len(links),
+        "json_ld_count": len(schema),
+        "word_count": len(soup.get_text().split()),
+    }
+
+
+def build_large_page(target_bytes: int = 1_500_000) -> str:
+    """Tile the product grid of the e-commerce fixture into a multi-megabyte page"""
+    html = load("ecommerce_listing.html")
+    start = html.index("<!-- PRODUCT CARDS -->")
+    end = html.index("<!-- /PRODUCT CARDS -->")
+    cards = html[start:end]
+    copies = max(1, target_bytes // len(cards))
+    return html[:start] + cards * copies + html[end:]
+
+
+@pytest.mark.parametrize("use_lxml", BACKENDS)
+@pytest.mark.parametrize("fixture", CORPUS, ids=lambda p: p.stem)
+def test_matches_beautifulsoup(fixture, use_lxml):
+    """Test single-pass features agree with the multi-pass BeautifulSoup checks"""
+    html = fixture.read_text(encoding="utf-8")
+    expected = multi_pass_reference(html)
+
+    features = extract_page_features(html, use_lxml=use_lxml)
+
+    assert features.title == expected["title"]
+    assert features.heading_counts['h1'] == expected["h1_count"]
+    assert features.image_count == expected["image_count"]
+    assert features.images_missing_alt == expected["images_missing_alt"]
+    assert len(features.links) == expected["link_count"]
+    assert len(features.json_ld) == expected["json_ld_count"]
+    assert features.word_count == expected["word_count"]
+    if expected["meta_description"] is not None:
+        assert features.meta_description == expected["meta_description"]
+
+
+def test_blog_post_features():
+    """Test the full feature record for a typical article page"""
+    features = extract_page_features(load("blog_post.html"))
+
+    assert features.title.startswith("How to Exorcise Duplicate Content")
+    assert features.meta_description.startswith("A practical guide")
+    assert features.meta["og:title"] == "How to Exorcise Duplicate Content"
+    assert features.heading_counts == {'h1': 1, 'h2': 3, 'h3': 1, 'h4': 0, 'h5': 0, 'h6': 0}
+    assert features.h1_texts == ["How to Exorcise Duplicate Content from Your Site"]
+    assert features.missing_alt_srcs == ["/images/crawl-report.png"]
+    assert ("/guides/canonical-tags", "canonical tag") in features.links
+    assert '"BlogPosting"' in features.json_ld[0]
+    assert features.paragraphs[1].startswith("Duplicate content is one of the quietest")
+    assert features.main_content_text.startswith("How to Exorcise Duplicate Content")
+    assert "dataLayer" not in features.text_sample
+
+
+def test_unclosed_paragraphs_and_uppercase_tags():
+    """Test sloppy markup (unclosed <p>, uppercase META) is handled"""
+    features = extract_page_features(load("landing_page.html"), use_lxml=False)
+
+    assert features.has_meta_description_tag
+    assert features.meta_description == ""
+    assert features.paragraphs[0].startswith("Small batch chocolate")
+    assert features.paragraphs[1] == "Order online or visit the farm shop."
+    assert features.h1_texts == ["Handmade Chocolate", "From Our Haunted Farm"]
+
+
+def test_empty_document():
+    """Test an empty body yields an empty record instead of failing"""
+    features = extract_page_features("")
+
+    assert features.title is None
+    assert features.word_count == 0
+    assert features.links == []
+
+
+def test_large_page_matches_reference():
+    """Test single-pass extraction agrees with multi-pass BeautifulSoup on a multi-MB page"""
+    html = build_large_page()
+
+    expected = multi_pass_reference(html)
+    features = extract_page_features(html)
+
+    assert features.heading_counts['h1'] == expected["h1_count"]
+    assert features.image_count == expected["image_count"]
+    assert features.images_missing_alt == expected["images_missing_alt"]
+    assert len(features.links) == expected["link_count"]
+    assert features.word_count == expected["word_count"]
+
+
+@pytest.mark.benchmark
+def test_parse_benchmark_large_page():
+    """Benchmark: single-pass extraction vs multi-pass BeautifulSoup on a multi-MB page"""
+    html = build_large_page()
+
+    start = time.perf_counter()
+    multi_pass_reference(html)
+    multi_pass_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extract_page_features(html)
+    single_pass_seconds = time.perf_counter() - start
+
+    assert single_pass_seconds < multi_pass_seconds
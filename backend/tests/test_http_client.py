@@ -0,0 +1,253 @@
+"""
+Shared HTTP Client Tests
+Connection reuse benchmark against a local stand-in HTTP server
+"""
+
+import asyncio
+import codecs
+import tracemalloc
+
+import httpx
+import pytest
+
+from http_client import build_client, fetch_html, read_html, sniff_encoding, HostLimitedTransport
+
+
+PAGE = b"<html><head><title>Haunted</title></head><body><h1>Boo</h1></body></html>"
+
+
+class StandInServer:
+    """Minimal keep-alive HTTP/1.1 server that counts accepted connections"""
+
+    def __init__(self, delay: float = 0.0):
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = delay
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections_opened += 1
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                self.in_flight -= 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/html\r\n"
+                    b"Content-Length: " + str(len(PAGE)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + PAGE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+def run_fetches(analyses: int, shared: bool) -> int:
+    """Fetch the stand-in page `analyses` times, returning the connections opened"""
+    async def run():
+        server = StandInServer()
+        base_url = await server.start()
+        try:
+            if shared:
+                client = build_client()
+                async with client:
+                    for _ in range(analyses):
+                        response = await client.get(base_url)
+                        assert response.status_code == 200
+            else:
+                # Previous behaviour: a brand-new client per analysis
+                for _ in range(analyses):
+                    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+                        response = await client.get(base_url)
+                        assert response.status_code == 200
+        finally:
+            await server.stop()
+        return server.connections_opened
+
+    return asyncio.run(run())
+
+
+def test_shared_client_connections_per_1000_analyses():
+    """Test connections opened per 1,000 analyses before and after pooling"""
+    # Building a client costs tens of ms (SSL context), so the old path is
+    # sampled over 100 analyses and scaled up
+    sampled = 100
+    before_per_1000 = run_fetches(sampled, shared=False) * (1000 // sampled)
+    after_connections = run_fetches(1000, shared=True)
+
+    assert before_per_1000 == 1000
+    assert after_connections == 1
+
+
+def test_shared_client_sends_default_headers():
+    """Test the shared client sends browser-like headers on every request"""
+    client = build_client()
+    assert "Mozilla" in client.headers["User-Agent"]
+    assert "text/html" in client.headers["Accept"]
+    asyncio.run(client.aclose())
+
+
+def test_per_host_connection_limit():
+    """Test concurrent requests to one host never exceed the per-host cap"""
+    async def run():
+        server = StandInServer(delay=0.02)
+        base_url = await server.start()
+        try:
+            async with build_client(max_connections_per_host=3) as client:
+                responses = await asyncio.gather(*(client.get(base_url) for _ in range(12)))
+        finally:
+            await server.stop()
+        return server, responses
+
+    server, responses = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert server.max_in_flight <= 3
+    assert server.connections_opened <= 3
+
+
+def test_host_slot_released_on_transport_error():
+    """Test a failed request does not leak its per-host slot"""
+    class FailingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            raise httpx.ConnectError("boom", request=request)
+
+    async def run():
+        transport = HostLimitedTransport(FailingTransport(), max_per_host=1)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(3):
+                with pytest.raises(httpx.ConnectError):
+                    await client.get("http://haunted.example")
+        return transport
+
+    transport = asyncio.run(run())
+    assert transport._host_slots == {}
+
+
+def test_idle_host_slots_are_dropped():
+    """Test per-host semaphores are freed once a host has no requests, but live while one is open"""
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"<h1>Boo</h1>"
+
+    transport = HostLimitedTransport(httpx.MockTransport(lambda request: httpx.Response(200, stream=Body())), max_per_host=2)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            for i in range(500):
+                response = await client.get(f"https://site{i}.example/")
+                assert response.status_code == 200
+            idle_hosts = len(transport._host_slots)
+
+            async with client.stream("GET", "https://open.example/") as response:
+                open_hosts = list(transport._host_slots)
+            return idle_hosts, open_hosts
+
+    idle_hosts, open_hosts = asyncio.run(run())
+
+    assert idle_hosts == 0
+    assert len(open_hosts) == 1 and "open.example" in open_hosts[0]
+    assert transport._host_slots == {} and transport._host_users == {}
+
+
+async def chunked(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_sniff_encoding_precedence():
+    """Test BOM beats the header, the header beats <meta>, and latin-1 labels mean cp1252"""
+    meta = b'<html><head><meta charset="shift_jis"></head>'
+    assert sniff_encoding(codecs.BOM_UTF8 + meta, "iso-8859-2") == "utf-8-sig"
+    assert sniff_encoding(meta, "iso-8859-2") == "iso8859-2"
+    assert sniff_encoding(meta) == "shift_jis"
+    assert sniff_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">') == "cp1252"
+    assert sniff_encoding(b"<html>", "no-such-charset") == "utf-8"
+
+
+def test_read_html_decodes_characters_split_across_chunks():
+    """Test multi-byte characters cut by a chunk boundary decode intact"""
+    body = "<html><body><p>Crème brûlée & 幽霊</p></body></html>".encode("utf-8")
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+    page = asyncio.run(read_html(chunked(*chunks), "utf-8"))
+
+    assert page.text == body.decode("utf-8")
+    assert page.size == len(body)
+    assert not page.truncated
+
+
+def test_read_html_finds_markers_across_chunk_boundaries():
+    """Test marker substrings split between chunks are still detected"""
+    page = asyncio.run(read_html(chunked(
+        b"<html><script>window.loc", b"ation.href='/app'</script>",
+        b"<NOSCR", b"IPT>Enable JavaScript</noscript><script id=\"__NEXT_", b"DATA__\"></script>"
+    )))
+
+    assert page.markers == {"js_redirect", "noscript", "next"}
+
+
+def test_read_html_markers_skip_lookalike_text():
+    """Test class names like loading- or rating- don't set the angular markers"""
+    plain = asyncio.run(read_html(chunked(b'<div class="loading-spinner rating-stars tracking-pixel"></div>')))
+    angular = asyncio.run(read_html(chunked(b'<app-root ng-version="17.0.0"></app-root>')))
+    angularjs = asyncio.run(read_html(chunked(b'<html ng-app="hauntApp"><body></body></html>')))
+
+    assert plain.markers == frozenset()
+    assert angular.markers == {"angular"}
+    assert angularjs.markers == {"angularjs"}
+
+
+def test_fetch_html_caps_oversized_page():
+    """Benchmark: peak memory reading a 20 MB page in full vs streamed under a 1 MB budget"""
+    chunk = b"<p>" + b"Haunted " * 8190 + b"</p>"
+    total = 20 * 1024 * 1024
+
+    def handler(request):
+        return httpx.Response(
+            200, headers={"content-type": "text/html; charset=utf-8"},
+            content=chunked(*[chunk] * (total // len(chunk)))
+        )
+
+    async def measure(read):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            tracemalloc.start()
+            try:
+                result = await read(client)
+                return result, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    async def full_read(client):
+        response = await client.get("https://huge.example/")
+        return len(response.text)
+
+    full_length, full_peak = asyncio.run(measure(full_read))
+    (response, page), streamed_peak = asyncio.run(measure(
+        lambda client: fetch_html(client, "https://huge.example/", max_bytes=1024 * 1024)
+    ))
+
+    assert full_length > 19 * 1024 * 1024
+    assert response.status_code == 200
+    assert page.truncated
+    assert page.size == 1024 * 1024
+    assert len(page.text) == 1024 * 1024
+    assert streamed_peak < full_peak / 5
@@ -0,0 +1,166 @@
+"""
+Job Queue Tests
+SQLite job store, asyncio workers, progress reporting and recovery
+"""
+
+import asyncio
+import time
+
+from jobs import JobRunner, JobStore, report_progress
+
+
+def make_runner(store=None, workers=2):
+    runner = JobRunner(store or JobStore(""), workers=workers, poll_interval=0.05, heartbeat_interval=0.05)
+
+    @runner.handler("echo")
+    async def echo(params):
+        await asyncio.sleep(params.get("delay", 0))
+        return {"echo": params["value"]}
+
+    @runner.handler("boom")
+    async def boom(params):
+        raise RuntimeError("ectoplasm overflow")
+
+    return runner
+
+
+async def wait_finished(runner, job_id, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.store.get(job_id)
+        if job.finished:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_store_claims_oldest_job_once():
+    """Test claims are FIFO and a job is handed to only one worker"""
+    store = JobStore("")
+    first = store.create("echo", {"value": 1})
+    second = store.create("echo", {"value": 2})
+
+    claimed = [store.claim("w1"), store.claim("w2"), store.claim("w3")]
+
+    assert [job.id for job in claimed[:2]] == [first.id, second.id]
+    assert claimed[2] is None
+    assert claimed[0].status == "running" and claimed[0].attempts == 1
+    assert store.counts()["running"] == 2
+
+
+def test_runner_executes_jobs_and_records_results():
+    """Test submitted jobs run in the background and results/errors are stored"""
+    async def run():
+        runner = make_runner()
+        await runner.start()
+        ok = runner.submit("echo", {"value": "boo"})
+        bad = runner.submit("boom", {})
+        results = await wait_finished(runner, ok.id), await wait_finished(runner, bad.id)
+        await runner.stop()
+        return results, runner.get_stats()
+
+    (ok, bad), stats = asyncio.run(run())
+
+    assert ok.status == "succeeded" and ok.result == {"echo": "boo"} and ok.progress == 1
+    assert bad.status == "failed" and bad.error == "ectoplasm overflow"
+    assert stats["completed"] == 1 and stats["failed"] == 1
+
+
+def test_progress_reported_from_inside_handler():
+    """Test report_progress updates the running job and is a no-op elsewhere"""
+    async def run():
+        runner = make_runner()
+        release = asyncio.Event()
+
+        @runner.handler("crawl")
+        async def crawl(params):
+            report_progress(0.5, "Crawled 5 pages")
+            await release.wait()
+            return {}
+
+        report_progress(0.9, "not in a job")  # must not raise
+        await runner.start()
+        job = runner.submit("crawl", {})
+        for _ in range(100):
+            midway = runner.store.get(job.id)
+            if midway.progress:
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+        done = await wait_finished(runner, job.id)
+        await runner.stop()
+        return midway, done
+
+    midway, done = asyncio.run(run())
+
+    assert midway.status == "running"
+    assert (midway.progress, midway.message) == (0.5, "Crawled 5 pages")
+    assert done.progress == 1
+
+
+def test_cancel_running_job():
+    """Test cancelling interrupts the handler and the result is not stored"""
+    async def run():
+        runner = make_runner()
+        await runner.start()
+        job = runner.submit("echo", {"value": 1, "delay": 10})
+        while runner.store.get(job.id).status != "running":
+            await asyncio.sleep(0.01)
+        runner.cancel(job.id)
+        cancelled = await wait_finished(runner, job.id)
+        await asyncio.sleep(0.05)
+        after = runner.store.get(job.id)
+        await runner.stop()
+        return cancelled, after, runner.stats
+
+    cancelled, after, stats = asyncio.run(run())
+
+    assert cancelled.status == after.status == "cancelled"
+    assert after.result is None
+    assert stats["cancelled"] == 1
+
+
+def test_jobs_survive_restart(tmp_path):
+    """Test queued and interrupted jobs are picked up by the next process"""
+    path = str(tmp_path / "jobs.db")
+
+    async def first_process():
+        runner = make_runner(JobStore(path), workers=1)
+        await runner.start()
+        slow = runner.submit("echo", {"value": "slow", "delay": 10})
+        queued = runner.submit("echo", {"value": "queued"})
+        while runner.store.get(slow.id).status != "running":
+            await asyncio.sleep(0.01)
+        await runner.stop()  # deploy: the running job goes back to the queue
+        runner.store.close()
+        return slow.id, queued.id
+
+    async def second_process(job_ids):
+        runner = JobRunner(JobStore(path), poll_interval=0.05)
+
+        @runner.handler("echo")
+        async def instant_echo(params):
+            return {"echo": params["value"]}
+
+        await runner.start()
+        jobs = [await wait_finished(runner, job_id) for job_id in job_ids]
+        await runner.stop()
+        return jobs
+
+    job_ids = asyncio.run(first_process())
+    slow, queued = asyncio.run(second_process(job_ids))
+
+    assert slow.status == "succeeded" and slow.attempts == 2
+    assert queued.result == {"echo": "queued"}
+
+
+def test_stale_running_jobs_recovered():
+    """Test jobs left running by a crashed worker are requeued, then failed after max attempts"""
+    store = JobStore("", max_attempts=2)
+    job = store.create("echo", {"value": 1})
+    store.claim("crashed-worker")
+
+    assert store.requeue(stale_before=time.time() + 1) == 1
+    store.claim("crashed-again")
+    assert store.requeue(stale_before=time.time() + 1) == 0
+    assert store.get(job.id).status == "failed"
@@ -0,0 +1,246 @@
+"""
+JS Crawler Tests
+Context pool backpressure and recycling, crash recovery, render settling
+and request blocking - driven with stub browsers, no Chromium needed
+"""
+
+import asyncio
+
+import pytest
+
+import js_crawler
+from js_crawler import JavaScriptCrawler, PlaywrightError, RenderQueueFull, RequestBlocker
+
+
+class StubContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class StubBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = StubContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class StubPlaywright:
+    """Stands in for the started async_playwright(); every launch is a new browser"""
+
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+
+    async def launch(self, **options):
+        browser = StubBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        pass
+
+
+def stub_crawler(**options):
+    crawler = JavaScriptCrawler(**options)
+    crawler._playwright = StubPlaywright()
+    return crawler
+
+
+def test_queue_is_bounded_and_released_slots_are_handed_on():
+    """Test renders queue for a free context, and fail fast once the queue is full"""
+    async def scenario():
+        crawler = stub_crawler(pool_size=1, max_queue=1, queue_timeout=5)
+        await crawler.start()
+        slot = await crawler._acquire()
+        waiter = asyncio.ensure_future(crawler._acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(RenderQueueFull):
+            await crawler._acquire()
+        stats = crawler.get_stats()
+        await crawler._release(slot)
+        handed_on = await waiter
+        return slot, handed_on, stats
+
+    slot, handed_on, stats = asyncio.run(scenario())
+
+    assert handed_on is slot
+    assert stats["waiting"] == 1
+    assert stats["rejected"] == 1
+    assert stats["idle_contexts"] == 0
+
+
+def test_queue_timeout_rejects_render():
+    """Test a render waiting longer than queue_timeout gives up"""
+    async def scenario():
+        crawler = stub_crawler(pool_size=1, queue_timeout=0.01)
+        await crawler.start()
+        await crawler._acquire()
+        with pytest.raises(RenderQueueFull):
+            await crawler._acquire()
+        return crawler.get_stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["rejected"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_contexts_are_recycled_after_n_pages_or_failures():
+    """Test a context is closed after pages_per_context renders or an unhealthy one"""
+    async def scenario():
+        crawler = stub_crawler(pool_size=1, pages_per_context=2)
+        await crawler.start()
+        contexts = []
+        for healthy in (True, True, False, True):
+            slot = await crawler._acquire()
+            contexts.append(slot.context)
+            await crawler._release(slot, healthy)
+        return crawler, contexts
+
+    crawler, contexts = asyncio.run(scenario())
+
+    assert contexts[0] is contexts[1]
+    assert contexts[0].closed and contexts[2].closed
+    assert contexts[2] is not contexts[1] and contexts[3] is not contexts[2]
+    assert crawler.stats["recycled_contexts"] == 2
+
+
+def test_crashed_browser_is_relaunched_and_render_retried(monkeypatch):
+    """Test a render that crashes Chromium is retried once on a relaunched browser"""
+    async def scenario():
+        crawler = stub_crawler(pool_size=1)
+        await crawler.start()
+        used = []
+
+        async def render(context, url, wait_for_selector, timeout, blocker=None):
+            used.append(context)
+            if len(used) == 1:
+                context.browser.connected = False
+                raise PlaywrightError("Target page, context or browser has been closed")
+            return {"html": "<h1>Rendered</h1>", "url": url}
+
+        monkeypatch.setattr(crawler, "_render", render)
+        result = await crawler.fetch_rendered_html("https://spa.example/")
+        return crawler, used, result
+
+    crawler, used, result = asyncio.run(scenario())
+
+    assert result["html"] == "<h1>Rendered</h1>"
+    assert crawler.stats["browser_launches"] == 2
+    assert used[0].browser is not used[1].browser
+    assert used[1].browser.is_connected()
+    assert crawler.stats["renders"] == 1
+
+
+def test_render_failure_without_crash_is_not_retried(monkeypatch):
+    """Test ordinary render errors propagate after one attempt"""
+    async def scenario():
+        crawler = stub_crawler(pool_size=1)
+        await crawler.start()
+        calls = []
+
+        async def render(context, url, wait_for_selector, timeout, blocker=None):
+            calls.append(url)
+            raise RuntimeError("net::ERR_NAME_NOT_RESOLVED")
+
+        monkeypatch.setattr(crawler, "_render", render)
+        with pytest.raises(RuntimeError):
+            await crawler.fetch_rendered_html("https://nowhere.example/")
+        return crawler, calls
+
+    crawler, calls = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert crawler.get_stats()["idle_contexts"] == 1
+
+
+class NavigatingPage:
+    """Fake page whose first probe hits a client-side navigation"""
+
+    def __init__(self):
+        self.installs = 0
+        self.probes = 0
+
+    def is_closed(self):
+        return False
+
+    async def evaluate(self, script):
+        if script == js_crawler.INSTALL_MUTATION_OBSERVER_JS:
+            self.installs += 1
+            return None
+        self.probes += 1
+        if self.probes == 1:
+            raise PlaywrightError("Execution context was destroyed, most likely because of a navigation")
+        return {"quietMs": 10_000, "hasContent": True, "signature": "redirect target"}
+
+
+def test_settling_survives_client_side_navigation(monkeypatch):
+    """Test a JS redirect mid-settle reinstalls the observer and keeps polling"""
+    monkeypatch.setattr(js_crawler, "JS_SETTLE_IDLE_MS", 20)
+    monkeypatch.setattr(js_crawler, "JS_SETTLE_POLL_MS", 5)
+    page = NavigatingPage()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        return await JavaScriptCrawler()._wait_until_settled(page, set(), loop.time() + 2)
+
+    assert asyncio.run(scenario()) is True
+    assert page.installs == 2
+    assert page.probes > 2
+
+
+def test_settling_gives_up_on_a_closed_page():
+    """Test errors from a page that has been closed still propagate"""
+    class ClosedPage(NavigatingPage):
+        def is_closed(self):
+            return True
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        await JavaScriptCrawler()._wait_until_settled(ClosedPage(), set(), loop.time() + 2)
+
+    with pytest.raises(PlaywrightError):
+        asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("url, resource_type, keep_css, blocked", [
+    ("https://shop.example/hero.jpg", "image", False, True),
+    ("https://shop.example/intro.mp4", "media", False, True),
+    ("https://fonts.example/inter.woff2", "font", False, True),
+    ("https://shop.example/site.css", "stylesheet", False, True),
+    ("https://shop.example/site.css", "stylesheet", True, False),
+    ("https://shop.example/hero.jpg", "image", True, True),
+    ("https://shop.example/", "document", False, False),
+    ("https://shop.example/app.js", "script", False, False),
+    ("https://shop.example/api/products", "fetch", False, False),
+    ("https://www.googletagmanager.com/gtm.js", "script", False, True),
+    ("https://region1.google-analytics.com/g/collect", "xhr", False, True),
+    ("https://static.hotjar.com/c/hotjar.js", "script", True, True),
+    ("https://notgoogletagmanager.com/app.js", "script", False, False),
+    ("https://cdn.partner.example/widget.js", "script", False, True),
+    ("https://assets.allowed.example/logo.png", "image", False, False),
+])
+def test_request_blocker(url, resource_type, keep_css, blocked):
+    """Test which requests lightweight renders abort and which they let through"""
+    blocker = RequestBlocker(
+        blocked_types={"image", "media", "font"},
+        deny_domains={"partner.example"},
+        allow_domains={"allowed.example"},
+        keep_css=keep_css
+    )
+
+    assert blocker.should_block(url, resource_type) is blocked
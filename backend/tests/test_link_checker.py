@@ -0,0 +1,131 @@
+"""
+Broken Link Checker Tests
+Concurrency, per-host caps, dedupe and HEAD fallback
+"""
+
+import asyncio
+
+import httpx
+
+from link_checker import LinkChecker, collect_links, find_broken
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_collect_links_resolves_and_dedupes():
+    """Test relative links are resolved and duplicates collapsed"""
+    anchors = [
+        ("/about", "About"),
+        ("https://example.com/about#team", "About again"),
+        ("mailto:boo@example.com", "Mail"),
+        ("javascript:void(0)", "JS"),
+        ("#top", "Top"),
+        ("https://other.com/page", "Other"),
+    ]
+
+    links = collect_links(anchors, "https://example.com/")
+
+    assert list(links) == ["https://example.com/about", "https://other.com/page"]
+    assert links["https://example.com/about"] == "About"
+
+
+def test_checks_500_links_concurrently():
+    """Test 500+ links are checked in parallel rather than one by one"""
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(0.05)
+            return httpx.Response(404 if request.url.path.endswith("7") else 200)
+        finally:
+            in_flight["now"] -= 1
+
+    anchors = [(f"https://host{i % 25}.example/page{i}", f"Link {i}") for i in range(500)]
+
+    async def run():
+        async with make_client(handler) as client:
+            return await find_broken(client, anchors, "https://example.com/", max_concurrency=100, max_per_host=6)
+
+    result = asyncio.run(run())
+
+    # 25 hosts x 6 per host would allow 150; the global cap of 100 is what binds
+    assert in_flight["peak"] == 100
+    assert result["total_links_checked"] == 500
+    assert len(result["broken_links"]) == 50
+
+
+def test_per_host_concurrency_cap():
+    """Test no host ever sees more than the per-host limit at once"""
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(200)
+
+    async def run():
+        async with make_client(handler) as client:
+            checker = LinkChecker(client, max_concurrency=50, max_per_host=4)
+            return await checker.check_all([f"https://one-host.example/{i}" for i in range(40)])
+
+    results = asyncio.run(run())
+
+    assert len(results) == 40
+    assert in_flight["max"] <= 4
+
+
+def test_falls_back_to_ranged_get_when_head_rejected():
+    """Test servers rejecting HEAD are re-checked with a ranged GET"""
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.headers.get("Range")))
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        return httpx.Response(206, content=b"<")
+
+    async def run():
+        async with make_client(handler) as client:
+            return await LinkChecker(client).check("https://no-head.example/")
+
+    status = asyncio.run(run())
+
+    assert status.status == 206
+    assert status.method == "GET"
+    assert not status.is_broken
+    assert ("GET", "bytes=0-0") in seen
+
+
+def test_unreachable_links_reported_broken():
+    """Test connection failures are reported as unreachable ghosts"""
+    def handler(request):
+        raise httpx.ConnectError("no route to host", request=request)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await find_broken(client, [("https://dead.example/", "Dead")], "https://example.com/")
+
+    result = asyncio.run(run())
+
+    assert result["broken_links"] == [{"url": "https://dead.example/", "status": "unreachable", "text": "Dead"}]
+
+
+def test_budget_limits_links_checked():
+    """Test the configurable budget replaces the old hard 20-link cap"""
+    anchors = [(f"https://example.com/{i}", "") for i in range(30)]
+
+    async def run():
+        async with make_client(lambda request: httpx.Response(200)) as client:
+            return await find_broken(client, anchors, "https://example.com/", budget=25)
+
+    result = asyncio.run(run())
+
+    assert result["total_links_found"] == 30
+    assert result["total_links_checked"] == 25
+    assert result["budget_exhausted"] is True
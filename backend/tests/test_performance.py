@@ -4,12 +4,20 @@ Task 10.2: Test caching strategies, query optimization, and system performance
 """
 
 import pytest
+import threading
 import time
 import asyncio
-from backend.performance_optimizer import (
+from performance_optimizer import (
+    json_size,
     LRUCache,
     TTLCache,
     CacheManager,
+    SQLiteCacheStore,
+    InMemorySharedCache,
+    encode_cache_value,
+    decode_cache_value,
+    SingleFlight,
+    TinyLFU,
     QueryOptimizer,
     RateLimiter,
     PerformanceMonitor
@@ -132,11 +140,12 @@ def test_cache_manager_analysis_cache():
     url = "https://example.com"
     data = {"haunting_score": 45, "entities": []}
     
-    # Set and get
-    manager.set_analysis(url, data)
-    cached = manager.get_analysis(url)
+    async def test():
+        # Set and get
+        await manager.set_analysis(url, data)
+        return await manager.get_analysis(url)
     
-    assert cached == data
+    assert asyncio.run(test()) == data
 
 
 def test_cache_manager_entity_cache():
@@ -172,37 +181,42 @@ def test_cache_manager_invalidation():
     
     url = "https://example.com"
     
-    # Set data
-    manager.set_analysis(url, {"score": 45})
-    manager.set_entities(url, [{"type": "ghost"}])
-    
-    # Verify cached
-    assert manager.get_analysis(url) is not None
-    assert manager.get_entities(url) is not None
-    
-    # Invalidate
-    manager.invalidate_url(url)
+    async def test():
+        # Set data
+        await manager.set_analysis(url, {"score": 45})
+        manager.set_entities(url, [{"type": "ghost"}])
+        
+        # Verify cached
+        assert await manager.get_analysis(url) is not None
+        assert manager.get_entities(url) is not None
+        
+        # Invalidate
+        await manager.invalidate_url(url)
+        
+        # Verify cleared
+        assert await manager.get_analysis(url) is None
+        assert manager.get_entities(url) is None
     
-    # Verify cleared
-    assert manager.get_analysis(url) is None
-    assert manager.get_entities(url) is None
+    asyncio.run(test())
 
 
 def test_cache_manager_stats():
     """Test cache manager statistics"""
     manager = CacheManager()
     
-    # Add some data
-    manager.set_analysis("https://example.com", {"score": 45})
-    manager.set_entities("https://example.com", [])
-    
-    # Get some data (hits)
-    manager.get_analysis("https://example.com")
-    manager.get_entities("https://example.com")
-    
-    # Miss some data
-    manager.get_analysis("https://notfound.com")
+    async def test():
+        # Add some data
+        await manager.set_analysis("https://example.com", {"score": 45})
+        manager.set_entities("https://example.com", [])
+        
+        # Get some data (hits)
+        await manager.get_analysis("https://example.com")
+        manager.get_entities("https://example.com")
+        
+        # Miss some data
+        await manager.get_analysis("https://notfound.com")
     
+    asyncio.run(test())
     stats = manager.get_stats()
     
     assert "analysis_cache" in stats
@@ -387,12 +401,12 @@ def test_cache_improves_performance():
         # First call (cache miss)
         start = time.time()
         result1 = await expensive_operation(url)
-        manager.set_analysis(url, result1)
+        await manager.set_analysis(url, result1)
         time1 = time.time() - start
         
         # Second call (cache hit)
         start = time.time()
-        result2 = manager.get_analysis(url)
+        result2 = await manager.get_analysis(url)
         time2 = time.time() - start
         
         # Cache hit should be much faster
@@ -460,6 +474,500 @@ def test_cache_manager_memory_efficiency():
     assert stats["entity_cache"]["size"] <= 1000
 
 
+def test_ttl_cache_max_size_evicts_lru():
+    """Test a size-bounded TTL cache evicts the least recently used entry"""
+    cache = TTLCache(default_ttl=60, max_size=2)
+    
+    cache.set("key1", "value1")
+    cache.set("key2", "value2")
+    cache.get("key1")  # key2 is now least recently used
+    cache.set("key3", "value3")
+    
+    assert cache.get("key2") is None
+    assert cache.get("key1") == "value1"
+    assert cache.get("key3") == "value3"
+    assert cache.get_stats()["evictions"] == 1
+
+
+
+class FakeClock:
+    """Monotonic clock the test advances by hand"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_reclaims_expired_entries_on_writes():
+    """Test expired entries are freed by later writes without being read"""
+    clock = FakeClock()
+    cache = TTLCache(default_ttl=10, max_size=None, clock=clock)
+    for i in range(1000):
+        cache.set(f"old{i}", i)
+    
+    clock.now += 11
+    for i in range(200):
+        cache.set(f"new{i}", i)
+    
+    assert len(cache.cache) == 200
+    assert cache.get_stats()["expirations"] == 1000
+    assert cache.get_stats()["expired_entries"] == 1000
+    assert cache.cleanup_expired() == 0
+
+
+def test_ttl_cache_overwrite_keeps_new_deadline():
+    """Test a stale deadline left by an overwrite doesn't expire the new value"""
+    clock = FakeClock()
+    cache = TTLCache(default_ttl=10, clock=clock)
+    cache.set("key1", "old")
+    clock.now += 5
+    cache.set("key1", "new", ttl=60)
+    
+    clock.now += 10
+    assert cache.cleanup_expired() == 0
+    assert cache.get("key1") == "new"
+    
+    clock.now += 60
+    assert cache.cleanup_expired() == 1
+    assert cache.get("key1") is None
+
+
+def test_ttl_cache_is_bounded_by_default():
+    """Test TTL caches without an explicit max_size still have a hard capacity"""
+    cache = TTLCache(default_ttl=60)
+    
+    for i in range(cache.max_size + 50):
+        cache.set(f"key{i}", i)
+    
+    assert len(cache.cache) == cache.max_size
+    assert cache.get_stats()["evictions"] == 50
+
+
+def test_ttl_cache_stats_are_constant_time():
+    """Benchmark: get_stats on a 100k-entry cache vs scanning entries for expiry"""
+    cache = TTLCache(default_ttl=3600, max_size=None)
+    for i in range(100_000):
+        cache.set(f"key{i}", i)
+    polls = 100
+    
+    start = time.perf_counter()
+    for _ in range(polls):
+        now = cache.clock()
+        sum(1 for entry in cache.cache.values() if now >= entry.expires_at)
+    scan_ms = (time.perf_counter() - start) * 1000 / polls
+    
+    start = time.perf_counter()
+    for _ in range(polls):
+        stats = cache.get_stats()
+    stats_ms = (time.perf_counter() - start) * 1000 / polls
+    
+    assert stats["size"] == 100_000
+    assert stats_ms < scan_ms / 10
+
+
+def test_lru_cache_byte_budget_evicts_lru():
+    """Test a byte budget evicts least recently used entries until the new one fits"""
+    cache = LRUCache(capacity=100, max_bytes=1000, sizeof=len)
+    cache.set("small1", "x" * 300)
+    cache.set("small2", "x" * 300)
+    cache.get("small1")  # small2 is now least recently used
+    
+    cache.set("big", "x" * 600)
+    
+    assert cache.get("small2") is None
+    assert cache.get("small1") is not None
+    assert cache.get("big") is not None
+    assert cache.get_stats()["bytes"] == 900
+    
+    cache.set("huge", "x" * 5000)  # larger than the whole budget
+    assert cache.get("huge") is None
+    assert cache.get_stats()["rejections"] == 1
+    assert cache.get_stats()["bytes"] == 900
+
+
+def test_ttl_cache_tracks_bytes_through_overwrite_delete_and_expiry():
+    """Test the byte count follows overwrites, deletes and expirations"""
+    clock = FakeClock()
+    cache = TTLCache(default_ttl=10, clock=clock, max_bytes=10_000, sizeof=len)
+    cache.set("a", "x" * 100)
+    cache.set("a", "x" * 250)
+    cache.set("b", "x" * 50, ttl=60)
+    cache.set("c", "x" * 10)
+    cache.delete("c")
+    assert cache.get_stats()["bytes"] == 300
+    
+    clock.now += 11
+    cache.cleanup_expired()
+    assert cache.get_stats()["bytes"] == 50
+
+
+def test_cache_manager_memory_stays_within_budget():
+    """Test mixed small entity lists and multi-megabyte audits stay under each layer's budget"""
+    manager = CacheManager(disk_path="", analysis_max_bytes=8 * 1024 * 1024, layer_max_bytes=1024 * 1024)
+    audit = {"entities": [{"type": "ghost", "description": "x" * 1000}] * 1500}  # ~1.5 MB
+    
+    async def fill():
+        for i in range(50):
+            await manager.set_analysis(f"https://site{i}.example/", audit)
+            manager.set_entities(f"https://site{i}.example/", [{"type": "ghost"}] * 20)
+    
+    asyncio.run(fill())
+    stats = manager.get_stats()
+    
+    assert stats["analysis_cache"]["bytes"] <= 8 * 1024 * 1024
+    assert stats["analysis_cache"]["size"] == 5
+    assert stats["entity_cache"]["size"] == 50
+    assert stats["memory_bytes"] == sum(
+        layer["bytes"] for name, layer in stats.items() if name.endswith("_cache")
+    )
+    assert asyncio.run(manager.get_analysis("https://site49.example/")) == audit
+
+
+def test_tinylfu_counts_and_ages():
+    """Test the sketch estimates frequencies, saturates and halves them periodically"""
+    sketch = TinyLFU(capacity=100, sample_factor=10)
+    for _ in range(6):
+        sketch.record("popular")
+    sketch.record("rare")
+    
+    assert sketch.frequency("popular") >= 6
+    assert sketch.frequency("rare") >= 1
+    assert sketch.frequency("never") <= sketch.frequency("rare")
+    assert sketch.admit("popular", "rare")
+    assert not sketch.admit("never", "popular")
+    
+    for _ in range(100):
+        sketch.record("spammed")
+    assert sketch.frequency("spammed") == TinyLFU.MAX_COUNT
+    
+    before = sketch.frequency("popular")
+    sketch.additions = sketch.sample_size - 1
+    sketch.record("popular")  # the sample is full: every counter is halved
+    assert sketch.agings == 1
+    assert sketch.frequency("popular") == (before + 1) // 2
+    assert sketch.additions == sketch.sample_size // 2
+
+
+def test_lru_cache_admission_keeps_frequent_keys():
+    """Test a full cache with TinyLFU refuses one-off keys instead of evicting popular ones"""
+    cache = LRUCache(capacity=2, admission=TinyLFU(capacity=2))
+    for key in ("a", "b"):
+        for _ in range(3):
+            cache.get(key)
+        cache.set(key, key)
+    
+    cache.get("once")
+    cache.set("once", "once")
+    
+    assert cache.get("once") is None
+    assert cache.get("a") == "a" and cache.get("b") == "b"
+    assert cache.get_stats()["admission_rejections"] == 1
+    
+    cache.set("a", "updated")  # existing keys are always updated in place
+    assert cache.get("a") == "updated"
+
+
+def test_ttl_cache_admission_replaces_expired_victims():
+    """Test admission never protects an entry that has already expired"""
+    clock = FakeClock()
+    cache = TTLCache(default_ttl=10, max_size=1, clock=clock, admission=TinyLFU(capacity=1))
+    for _ in range(5):
+        cache.get("popular")
+    cache.set("popular", 1)
+    
+    cache.set("newcomer", 2)
+    assert cache.get("popular") == 1
+    
+    clock.now += 11
+    cache.set("newcomer", 2)
+    assert cache.get("newcomer") == 2
+
+
+def mixed_trace(requests=60_000, hot_keys=2000, seed=11):
+    """
+    Interactive users re-auditing a Zipf-skewed set of popular sites, interleaved
+    with batch crawls sweeping long runs of URLs nobody asks for twice
+    """
+    import random
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(hot_keys)]
+    trace = []
+    batch = 0
+    while len(trace) < requests:
+        trace.extend(f"https://site{k}.example/" for k in rng.choices(range(hot_keys), weights, k=200))
+        trace.extend(f"https://crawl.example/page{batch + i}" for i in range(rng.randint(0, 400)))
+        batch += 400
+    return trace[:requests]
+
+
+def test_tinylfu_hit_rate_benchmark():
+    """Benchmark: hit rate of plain LRU vs TinyLFU admission on a mixed interactive + batch trace"""
+    trace = mixed_trace()
+    rates = {}
+    
+    for name, admission in (("lru", None), ("tinylfu", TinyLFU(capacity=500))):
+        cache = LRUCache(capacity=500, admission=admission)
+        for key in trace:
+            if cache.get(key) is None:
+                cache.set(key, key)
+        rates[name] = cache.get_stats()["hit_rate"]
+    
+    assert rates["tinylfu"] > rates["lru"] + 5
+
+
+def test_analysis_cache_is_bounded():
+    """Test the analysis cache no longer grows without limit"""
+    manager = CacheManager(disk_path="", analysis_max_entries=100)
+    
+    async def test():
+        for i in range(1000):
+            await manager.set_analysis(f"https://example{i}.com", {"score": i})
+        
+        assert manager.get_stats()["analysis_cache"]["size"] == 100
+        assert await manager.get_analysis("https://example999.com") == {"score": 999}
+        assert await manager.get_analysis("https://example0.com") is None
+    
+    asyncio.run(test())
+
+
+def test_analysis_cache_normalizes_urls():
+    """Test equivalent URL forms share one analysis entry"""
+    manager = CacheManager(disk_path="")
+    
+    async def test():
+        await manager.set_analysis("https://Example.com/Blog/?utm_source=newsletter", {"score": 45})
+        
+        assert await manager.get_analysis("https://example.com/Blog") == {"score": 45}
+        assert await manager.get_analysis("HTTPS://EXAMPLE.COM:443/Blog/#comments") == {"score": 45}
+        assert await manager.get_analysis("https://example.com/Blog", variant="profile=fast") is None
+    
+    asyncio.run(test())
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    """Test analyses written to the SQLite tier are served after a restart"""
+    path = str(tmp_path / "cache.sqlite3")
+    
+    async def test():
+        manager = CacheManager(disk_path=path)
+        await manager.set_analysis("https://example.com/", {"score": 45, "entities": [{"type": "ghost"}]})
+        await manager.close()
+        
+        restarted = CacheManager(disk_path=path)
+        
+        assert await restarted.get_analysis("https://example.com") == {"score": 45, "entities": [{"type": "ghost"}]}
+        # Promoted into memory on the first read
+        assert restarted.get_stats()["analysis_cache"]["size"] == 1
+        await restarted.close()
+    
+    asyncio.run(test())
+
+
+def test_disk_tier_runs_off_the_event_loop_in_batches(tmp_path):
+    """Test disk reads and writes run in a worker thread, one call per batch"""
+    manager = CacheManager(disk_path=str(tmp_path / "cache.sqlite3"))
+    calls = []
+    
+    for name in ("get_many", "set_many"):
+        method = getattr(manager.disk_cache, name)
+        
+        def recording(batch, method=method, name=name):
+            calls.append((name, len(batch), threading.current_thread() is threading.main_thread()))
+            return method(batch)
+        
+        setattr(manager.disk_cache, name, recording)
+    
+    urls = [f"https://site{i}.example/" for i in range(20)]
+    
+    async def test():
+        await manager.set_analyses({url: {"score": i} for i, url in enumerate(urls)})
+        manager.analysis_cache.clear()
+        return await manager.get_analyses(urls + ["https://missing.example/"])
+    
+    found = asyncio.run(test())
+    manager.disk_cache.close()
+    
+    assert found == {url: {"score": i} for i, url in enumerate(urls)}
+    assert calls == [("set_many", 20, False), ("get_many", 21, False)]
+
+
+def test_disk_cache_expiry_and_pruning(tmp_path):
+    """Test the SQLite tier drops expired rows and keeps its size bound"""
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    
+    store.set("old", {"score": 1}, ttl=-1)
+    assert store.get("old") is None
+    
+    for i in range(25):
+        store.set(f"key{i}", {"score": i}, ttl=60)
+    removed = store.prune()
+    
+    assert removed == 15
+    assert store.size() == 10
+    assert store.get("key24") is not None
+    
+    store.set_many([("fresh", {"score": 1}, 60), ("unserializable", {1, 2}, 60), ("expired", {"score": 0}, -1)])
+    assert set(store.get_many(["fresh", "unserializable", "expired", "key24"])) == {"fresh", "key24"}
+    store.close()
+
+
+def test_shared_cache_serves_other_workers():
+    """Test one worker's analysis is a hit for another worker through the shared tier"""
+    shared = InMemorySharedCache()
+    worker_a = CacheManager(disk_path="", shared_cache=shared)
+    worker_b = CacheManager(disk_path="", shared_cache=shared)
+    
+    async def test():
+        await worker_a.set_analysis("https://spooky.example/", {"score": 66})
+        
+        assert await worker_b.get_analysis("https://spooky.example/") == {"score": 66}
+        assert worker_b.get_stats()["analysis_cache"]["size"] == 1  # promoted into worker B's memory
+        assert await worker_b.get_analysis("https://spooky.example/") == {"score": 66}
+        assert shared.get_stats()["hits"] == 1
+        
+        await worker_b.invalidate_url("https://spooky.example/")
+        assert await CacheManager(disk_path="", shared_cache=shared).get_analysis("https://spooky.example/") is None
+    
+    asyncio.run(test())
+
+
+def test_shared_cache_batches_round_trips_and_keeps_ttl():
+    """Test multi-get/multi-set cost one round trip and promoted entries keep their remaining TTL"""
+    clock = FakeClock()
+    shared = InMemorySharedCache(clock=clock)
+    writer = CacheManager(disk_path="", shared_cache=shared, analysis_stale_ttl=0, ttl_jitter=0)
+    urls = [f"https://site{i}.example/" for i in range(50)]
+    reader = CacheManager(disk_path="", shared_cache=shared, analysis_stale_ttl=0, ttl_jitter=0)
+    reader.analysis_cache.clock = clock
+    
+    async def test():
+        await writer.set_analyses({url: {"score": i} for i, url in enumerate(urls)}, ttl=100)
+        clock.now += 90
+        return await reader.get_analyses(urls + ["https://missing.example/"])
+    
+    found = asyncio.run(test())
+    
+    assert shared.get_stats()["round_trips"] == 2
+    assert found == {url: {"score": i} for i, url in enumerate(urls)}
+    clock.now += 11
+    assert reader.analysis_cache.get(reader._analysis_key(urls[0])) is None
+
+
+def test_shared_cache_serialization():
+    """Test values round-trip through the shared tier's encoding, large ones compressed"""
+    small = {"score": 1, "entities": []}
+    large = {"entities": [{"type": "ghost", "description": "boo " * 100}] * 200}
+    
+    assert encode_cache_value(small)[:1] == b"j"
+    assert encode_cache_value(large)[:1] == b"z"
+    assert len(encode_cache_value(large)) < json_size(large) / 10
+    assert decode_cache_value(encode_cache_value(small)) == small
+    assert decode_cache_value(encode_cache_value(large)) == large
+
+
+def test_shared_cache_outage_degrades_to_local_caches():
+    """Test a failing shared tier reads as misses and is skipped until the retry window passes"""
+    class DownCache(InMemorySharedCache):
+        async def _fetch(self, keys):
+            raise ConnectionError("connection refused")
+    
+    shared = DownCache(retry_after=60)
+    manager = CacheManager(disk_path="", shared_cache=shared)
+    
+    async def test():
+        await manager.set_analysis("https://spooky.example/", {"score": 66})
+        
+        assert await manager.get_analysis("https://spooky.example/") == {"score": 66}  # memory still works
+        assert await manager.get_analysis("https://other.example/") is None
+        assert await manager.get_analysis("https://third.example/") is None
+    
+    asyncio.run(test())
+    
+    assert shared.get_stats()["failures"] == 1
+    assert shared.get_stats()["available"] is False
+
+
+def test_slow_shared_tier_does_not_block_the_event_loop():
+    """Test other requests keep running while one waits on a shared-tier round trip"""
+    class SlowCache(InMemorySharedCache):
+        async def _fetch(self, keys):
+            await asyncio.sleep(0.2)
+            return await super()._fetch(keys)
+    
+    manager = CacheManager(disk_path="", shared_cache=SlowCache())
+    
+    async def test():
+        finished = []
+        
+        async def lookup():
+            await manager.get_analysis("https://spooky.example/")
+            finished.append("lookup")
+        
+        async def other_request():
+            await asyncio.sleep(0.01)
+            finished.append("other")
+        
+        await asyncio.gather(lookup(), other_request())
+        return finished
+    
+    assert asyncio.run(test()) == ["other", "lookup"]
+
+
+def test_ttl_cache_serves_stale_until_hard_deadline():
+    """Test entries go stale after ttl and are removed stale_ttl later"""
+    clock = FakeClock()
+    cache = TTLCache(default_ttl=10, clock=clock, stale_ttl=20)
+    cache.set("audit", {"score": 66})
+    
+    clock.now += 5
+    assert cache.get_entry("audit") == ({"score": 66}, True)
+    clock.now += 10
+    assert cache.get_entry("audit") == ({"score": 66}, False)
+    assert cache.get("audit") == {"score": 66}
+    clock.now += 16
+    assert cache.get_entry("audit") is None
+    assert cache.get_stats()["stale_hits"] == 2
+
+
+def test_staleness_survives_the_shared_tier():
+    """Test a worker promoting a stale entry from the shared tier sees it as stale"""
+    clock = FakeClock()
+    shared = InMemorySharedCache(clock=clock)
+    writer = CacheManager(disk_path="", shared_cache=shared, analysis_stale_ttl=600, ttl_jitter=0)
+    
+    async def test():
+        await writer.set_analysis("https://spooky.example/", {"score": 66}, ttl=60)
+        
+        clock.now += 30
+        early = CacheManager(disk_path="", shared_cache=shared, analysis_stale_ttl=600)
+        assert await early.get_analysis_entry("https://spooky.example/") == ({"score": 66}, True)
+        clock.now += 60
+        reader = CacheManager(disk_path="", shared_cache=shared, analysis_stale_ttl=600)
+        assert await reader.get_analysis_entry("https://spooky.example/") == ({"score": 66}, False)
+        assert reader.analysis_cache.get_entry(reader._analysis_key("https://spooky.example/"))[1] is False
+        
+        assert await reader.claim_refresh("https://spooky.example/")
+        assert not await writer.claim_refresh("https://spooky.example/")  # another worker already refreshing
+    
+    asyncio.run(test())
+
+
+def test_ttl_jitter_spreads_batch_expiry():
+    """Test entries written together get different deadlines, never beyond the configured TTL"""
+    clock = FakeClock()
+    manager = CacheManager(disk_path="", analysis_stale_ttl=0, ttl_jitter=0.1)
+    manager.analysis_cache.clock = clock
+    
+    asyncio.run(manager.set_analyses({f"https://site{i}.example/": {"score": i} for i in range(200)}, ttl=1000))
+    deadlines = [entry.fresh_until - clock.now for entry in manager.analysis_cache.cache.values()]
+    
+    assert len(set(deadlines)) == 200
+    assert 900 <= min(deadlines) and max(deadlines) <= 1000
+    assert max(deadlines) - min(deadlines) > 50
+
+
 def test_performance_under_load():
     """Test system performance under load"""
     manager = CacheManager()
@@ -470,13 +978,13 @@ def test_performance_under_load():
         
         # Check cache
         url = f"https://example{i % 100}.com"  # Reuse some URLs
-        cached = manager.get_analysis(url)
+        cached = await manager.get_analysis(url)
         
         if cached is None:
             # Simulate analysis
             await asyncio.sleep(0.01)
             result = {"score": i}
-            manager.set_analysis(url, result)
+            await manager.set_analysis(url, result)
         
         duration = (time.time() - start) * 1000
         monitor.record_response_time(duration)
@@ -495,5 +1003,122 @@ def test_performance_under_load():
     asyncio.run(test())
 
 
+
+# Single-flight Tests
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test concurrent calls for one key run the work once"""
+    flights = SingleFlight()
+    calls = []
+    
+    async def analyze(url):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return {"url": url, "score": 45}
+    
+    async def test():
+        results = await asyncio.gather(
+            *(flights.do("https://example.com/", lambda: analyze("https://example.com/")) for _ in range(10)),
+            flights.do("https://other.com/", lambda: analyze("https://other.com/"))
+        )
+        return results
+    
+    results = asyncio.run(test())
+    
+    assert sorted(calls) == ["https://example.com/", "https://other.com/"]
+    assert all(result == {"url": "https://example.com/", "score": 45} for result in results[:10])
+    assert flights.get_stats() == {"in_flight": 0, "started": 2, "coalesced": 9}
+
+
+def test_single_flight_propagates_errors():
+    """Test every waiter sees the shared failure and the key is retried afterwards"""
+    flights = SingleFlight()
+    attempts = []
+    
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ValueError("crawl failed")
+        return "ok"
+    
+    async def test():
+        first = await asyncio.gather(*(flights.do("key", flaky) for _ in range(5)), return_exceptions=True)
+        second = await flights.do("key", flaky)
+        return first, second
+    
+    first, second = asyncio.run(test())
+    
+    assert all(isinstance(result, ValueError) for result in first)
+    assert second == "ok"
+    assert len(attempts) == 2
+
+
+def test_single_flight_background_start():
+    """Test start() runs work once in the background, joined by do() callers and not cancelled with them"""
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+        
+        async def refresh():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "fresh"
+        
+        assert flights.start("page", refresh)
+        assert not flights.start("page", refresh)
+        impatient = asyncio.ensure_future(flights.do("page", refresh))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        await asyncio.sleep(0.01)
+        assert flights.running("page")
+        result = await flights.do("page", refresh)
+        return result, len(calls), flights.get_stats()
+    
+    result, calls, stats = asyncio.run(scenario())
+    
+    assert result == "fresh"
+    assert calls == 1
+    assert stats == {"in_flight": 0, "started": 1, "coalesced": 2}
+
+
+def test_single_flight_cancellation():
+    """Test one waiter leaving doesn't cancel shared work, but the last one does"""
+    flights = SingleFlight()
+    finished = []
+    
+    async def slow(tag):
+        try:
+            await asyncio.sleep(0.1)
+            finished.append(tag)
+            return tag
+        except asyncio.CancelledError:
+            finished.append(f"{tag}-cancelled")
+            raise
+    
+    async def test():
+        # Two waiters, one gives up: the other still gets the result
+        leaver = asyncio.create_task(flights.do("shared", lambda: slow("shared")))
+        stayer = asyncio.create_task(flights.do("shared", lambda: slow("shared")))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        shared_result = await stayer
+        
+        # Sole waiter gives up: the work itself is cancelled
+        lonely = asyncio.create_task(flights.do("lonely", lambda: slow("lonely")))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.gather(lonely, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return leaver.cancelled(), shared_result
+    
+    leaver_cancelled, shared_result = asyncio.run(test())
+    
+    assert leaver_cancelled
+    assert shared_result == "shared"
+    assert finished == ["shared", "lonely-cancelled"]
+    assert flights.in_flight() == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -3,9 +3,15 @@ Tests for predictive analytics and algorithm detection
 Task 9.4: Test predictive accuracy and reliability
 """
 
+import math
+import statistics
+import time
+
+import numpy as np
 import pytest
 from datetime import datetime, timedelta
-from backend.predictive_analytics import (
+from predictive_analytics import (
+    pad_series,
     PredictiveRankingModel,
     AlgorithmUpdateDetector,
     PerformanceForecaster,
@@ -399,5 +405,99 @@ def test_prediction_accuracy_validation(ranking_model):
     assert prediction.confidence_lower <= actual_future_position <= prediction.confidence_upper
 
 
+
+def reference_prediction(positions, days_ahead=30):
+    """The per-series pure-Python computation predict_batch replaced"""
+    n = len(positions)
+    x_mean = statistics.mean(range(n))
+    y_mean = statistics.mean(positions)
+    slope = (
+        sum((i - x_mean) * (positions[i] - y_mean) for i in range(n))
+        / sum((i - x_mean) ** 2 for i in range(n))
+    )
+    volatility = statistics.stdev(positions)
+    predicted = max(1, positions[-1] + slope * days_ahead)
+    spread = volatility * math.sqrt(days_ahead)
+    return slope, round(predicted, 1), round(max(1, predicted - spread), 1), round(predicted + spread, 1)
+
+
+def random_series(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return [
+        np.clip(rng.integers(1, 50) + np.cumsum(rng.normal(rng.normal(0, 0.3), 1.5, rng.integers(3, 120))), 1, 100).round()
+        for _ in range(count)
+    ]
+
+
+def test_batch_prediction_matches_per_series_math(ranking_model):
+    """Test vectorized predictions over ragged series match the per-series computation"""
+    series = random_series(300)
+    last_date = datetime(2026, 10, 1)
+
+    results = ranking_model.predict_batch(
+        [f"kw{i}" for i in range(len(series))], pad_series(series), [last_date] * len(series)
+    )
+
+    for values, result in zip(series, results):
+        if len(values) < ranking_model.min_data_points:
+            assert result is None
+            continue
+        slope, predicted, lower, upper = reference_prediction(values.tolist())
+        assert result.predicted_position == pytest.approx(predicted, abs=0.11)
+        assert result.confidence_lower == pytest.approx(lower, abs=0.11)
+        assert result.confidence_upper == pytest.approx(upper, abs=0.11)
+        assert result.current_position == int(values[-1])
+        assert result.prediction_date == last_date + timedelta(days=30)
+        if abs(abs(slope) - 0.2) > 1e-9:
+            assert result.trend == ("improving" if slope < -0.2 else "declining" if slope > 0.2 else "stable")
+
+
+def test_predict_rankings_by_keyword(ranking_model, improving_ranking_data, declining_ranking_data):
+    """Test the keyword mapping API keeps order and matches single-series predictions"""
+    results = ranking_model.predict_rankings({
+        "up": list(reversed(improving_ranking_data)),
+        "down": declining_ranking_data,
+        "new": declining_ranking_data[:3],
+    })
+
+    assert [r.keyword if r else None for r in results] == ["up", "down", None]
+    single = ranking_model.predict_ranking(improving_ranking_data)
+    assert results[0].predicted_position == single.predicted_position
+    assert results[0].trend == "improving"
+    assert results[1].trend == "declining"
+
+
+def test_batch_prediction_10k_keywords(ranking_model):
+    """Test one batch call forecasts every one of 10,000 keywords with enough history"""
+    series = random_series(10_000, seed=11)
+    keywords = [f"kw{i}" for i in range(len(series))]
+    last_dates = [datetime(2026, 10, 1)] * len(series)
+
+    results = ranking_model.predict_batch(keywords, pad_series(series), last_dates)
+
+    assert len(results) == 10_000
+    assert [r is not None for r in results] == [len(v) >= ranking_model.min_data_points for v in series]
+    assert all(r.keyword == keyword for r, keyword in zip(results, keywords) if r is not None)
+
+
+@pytest.mark.benchmark
+def test_batch_prediction_benchmark(ranking_model):
+    """Benchmark: daily forecast for 10,000 keywords, per-series loop vs one vectorized batch"""
+    series = random_series(10_000, seed=11)
+    keywords = [f"kw{i}" for i in range(len(series))]
+    last_dates = [datetime(2026, 10, 1)] * len(series)
+
+    start = time.perf_counter()
+    for values in series:
+        if len(values) >= ranking_model.min_data_points:
+            reference_prediction(values.tolist())
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranking_model.predict_batch(keywords, pad_series(series), last_dates)
+    batch_seconds = time.perf_counter() - start
+
+    assert batch_seconds < loop_seconds
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,300 @@
+"""
+Ranking History Store Tests
+Columnar appends, range views, persistence and the models reading from the store
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from predictive_analytics import (
+    AlgorithmUpdateDetector,
+    PerformanceForecaster,
+    PredictiveRankingModel,
+    RankingDataPoint,
+)
+from ranking_history import RankingHistoryStore
+
+
+START = datetime(2026, 1, 1)
+
+
+def days(count, start=START):
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def test_appends_keep_dates_sorted_and_overwrite_days():
+    """Test in-order appends, backfills and corrections of an existing day"""
+    store = RankingHistoryStore()
+    store.append("ghost tours", days(40), list(range(40)), url="https://spooky.example/tours")
+    store.append("ghost tours", days(5, START - timedelta(days=5)), [99] * 5)  # backfill
+    store.append("ghost tours", [START + timedelta(days=3)], [7], search_volume=[500])  # correction
+
+    series = store.series("ghost tours")
+
+    assert len(series) == 45
+    assert np.all(series.dates[1:] > series.dates[:-1])
+    assert series.positions[:5].tolist() == [99] * 5
+    assert series.positions[8] == 7
+    assert series.search_volume[8] == 500
+    assert series.url == "https://spooky.example/tours"
+
+
+def test_range_slices_are_views():
+    """Test time-range reads are binary searched and share the store's memory"""
+    store = RankingHistoryStore()
+    store.append("haunted house", days(365), np.arange(365.0))
+
+    window = store.series("haunted house", start=START + timedelta(days=100), end=START + timedelta(days=109))
+    everything = store.series("haunted house")
+
+    assert window.positions.tolist() == list(range(100, 110))
+    assert np.shares_memory(window.positions, everything.positions)
+    assert len(store.series("haunted house", start=START + timedelta(days=400))) == 0
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    """Test a saved store loads memory-mapped and copies a keyword only when appended to"""
+    store = RankingHistoryStore()
+    store.append("ghost tours", days(30), range(30), url="https://spooky.example/")
+    store.append("ghost walks", days(10), range(10, 20))
+    store.save(str(tmp_path))
+
+    loaded = RankingHistoryStore.load(str(tmp_path))
+
+    assert isinstance(loaded.series("ghost tours").positions.base, np.memmap)
+    assert loaded.series("ghost walks").positions.tolist() == list(range(10, 20))
+    assert loaded.series("ghost tours").url == "https://spooky.example/"
+
+    loaded.append("ghost walks", [START + timedelta(days=10)], [5])
+    assert loaded.series("ghost walks").positions.tolist() == list(range(10, 20)) + [5]
+    assert loaded.series("ghost tours").positions.tolist() == list(range(30))
+    assert RankingHistoryStore.load(str(tmp_path / "missing")).get_stats() == {"keywords": 0, "points": 0}
+
+
+def test_concurrent_saves_stay_consistent(tmp_path):
+    """Test overlapping saves from several threads neither fail nor mix index and columns"""
+    store = RankingHistoryStore(str(tmp_path))
+    for k in range(50):
+        store.append(f"kw{k}", days(100), range(100))
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: store.save(), range(8)))
+
+    loaded = RankingHistoryStore.load(str(tmp_path))
+    assert loaded.get_stats() == {"keywords": 50, "points": 5000}
+    assert sorted(os.listdir(tmp_path)) == ["ctr.npy", "dates.npy", "index.json", "positions.npy", "search_volume.npy"]
+
+
+def test_background_saves_are_debounced_and_flushed(tmp_path):
+    """Test a burst of appends is written once, from a snapshot, and flush saves what is left"""
+    async def scenario():
+        store = RankingHistoryStore(str(tmp_path))
+        for k in range(5):
+            store.append(f"kw{k}", days(10), range(10))
+            store.schedule_save(delay=0.05)
+        saving = store._save_task
+        await saving
+        saved_once = RankingHistoryStore.load(str(tmp_path)).get_stats()
+        store.append("late", days(3), range(3))
+        store.schedule_save(delay=60)
+        await store.flush()
+        return saving, saved_once, store.dirty
+
+    saving, saved_once, dirty = asyncio.run(scenario())
+
+    assert saved_once == {"keywords": 5, "points": 50}
+    assert saving.done() and not dirty
+    assert RankingHistoryStore.load(str(tmp_path)).get_stats() == {"keywords": 6, "points": 53}
+
+
+def test_empty_keyword_list_selects_nothing():
+    """Test an explicit empty keyword list is not read as 'all keywords'"""
+    store = RankingHistoryStore()
+    store.append("ghost tours", days(30), range(30))
+
+    assert store.padded([])[0] == []
+    assert store.aligned([])[0] == []
+    assert PredictiveRankingModel().predict_from_history(store, []) == []
+    assert store.padded()[0] == ["ghost tours"]
+
+
+def test_models_read_from_store(improving_points, volatile_points):
+    """Test predictions, detection and traffic forecasts from the store match the list APIs"""
+    store = RankingHistoryStore()
+    store.append_points(improving_points + volatile_points)
+    store.append("ghost tours", [improving_points[-1].date], [improving_points[-1].position], search_volume=[5000])
+    model = PredictiveRankingModel()
+    detector = AlgorithmUpdateDetector()
+
+    from_store = model.predict_from_history(store, ["ghost tours", "untracked"])
+    from_list = model.predict_ranking(improving_points)
+
+    assert len(from_store) == 1
+    assert from_store[0].predicted_position == from_list.predicted_position
+    assert from_store[0].trend == from_list.trend
+    assert detector.detect_from_history(store, "ghost walks").name == \
+        detector.detect_algorithm_update(volatile_points).name
+    assert detector.detect_from_history(store, "ghost walks", end=START + timedelta(days=10)) is None
+
+    forecast = PerformanceForecaster().forecast_traffic(from_store, history=store)
+    assert forecast["current_monthly_traffic"] == round(0.01 * 5000)
+
+
+def three_year_portfolio(keywords=2000, history_days=3 * 365):
+    """Store holding daily positions for every keyword, plus the positions themselves"""
+    rng = np.random.default_rng(3)
+    positions = rng.integers(1, 100, (keywords, history_days))
+    store = RankingHistoryStore()
+    for k in range(keywords):
+        store.append(f"kw{k}", np.arange(np.datetime64("2024-01-01"), history_days), positions[k])
+    return store, positions
+
+
+def test_portfolio_slicing_last_90_days():
+    """Test last-90-day windows for 2,000 keywords with 3 years of history come out as one matrix"""
+    store, positions = three_year_portfolio()
+
+    names, matrix, _ = store.padded(start=np.datetime64("2024-01-01") + 3 * 365 - 90)
+
+    assert names == [f"kw{k}" for k in range(2000)]
+    assert matrix.shape == (2000, 90)
+    assert (matrix == positions[:, -90:]).all()
+
+
+@pytest.mark.benchmark
+def test_portfolio_slicing_benchmark():
+    """Benchmark: last-90-day windows for 2,000 keywords with 3 years of history, objects vs store"""
+    keywords, history_days = 2000, 3 * 365
+    store, positions = three_year_portfolio(keywords, history_days)
+    sample = 200
+    points = [
+        [RankingDataPoint(date=START + timedelta(days=d), keyword=f"kw{k}", position=int(p), url="")
+         for d, p in enumerate(positions[k])]
+        for k in range(sample)
+    ]
+    cutoff = START + timedelta(days=history_days - 90)
+
+    start = time.perf_counter()
+    for series in points:
+        window = [d.position for d in sorted(series, key=lambda d: d.date) if d.date >= cutoff]
+    object_seconds = (time.perf_counter() - start) * keywords / sample
+
+    start = time.perf_counter()
+    store.padded(start=np.datetime64("2024-01-01") + history_days - 90)
+    store_seconds = time.perf_counter() - start
+
+    assert len(window) == 90
+    assert store_seconds < object_seconds
+
+
+def test_endpoints_use_recorded_history(monkeypatch, volatile_points):
+    """Test recorded positions replace the demo data in the predictive endpoints"""
+    monkeypatch.setattr(main, "ranking_history", RankingHistoryStore())
+    client = TestClient(main.app)
+
+    recorded = client.post("/api/rankings/history", json={"points": [
+        {"keyword": p.keyword, "date": p.date.isoformat(), "position": p.position, "url": p.url}
+        for p in volatile_points
+    ]})
+    predicted = client.post("/api/predict-rankings", json={"url": "https://spooky.example/"})
+    detected = client.post("/api/detect-algorithm", json={"url": "https://spooky.example/"})
+
+    assert recorded.json() == {"added": 14, "keywords": 1, "points": 14}
+    assert predicted.json()["demo_keywords"] == []
+    assert [p["keyword"] for p in predicted.json()["predictions"]] == ["ghost walks"]
+    assert predicted.json()["predictions"][0]["current_position"] == 18
+    assert detected.json()["update"]["affected_keywords"] == ["ghost walks"]
+
+
+
+def simulated_portfolio(keywords=2000, history_days=180, shift_day=120, hit_share=0.3, seed=5):
+    """Noisy stable rankings across 20 sites; a share of keywords drops 8 places on shift_day"""
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(3, 40, keywords)[:, None] + rng.normal(0, 1, (keywords, history_days))
+    hit = rng.random(keywords) < hit_share
+    positions[hit, shift_day:] += 8
+    store = RankingHistoryStore()
+    calendar = np.arange(np.datetime64("2026-01-01"), history_days)
+    for k in range(keywords):
+        store.append(f"kw{k}", calendar, positions[k].round(), url=f"https://site{k % 20}.example/page")
+    return store, {f"kw{k}" for k in np.flatnonzero(hit)}, calendar[shift_day]
+
+
+def test_portfolio_scan_finds_industry_wide_shift():
+    """Test one vectorized scan dates the shift and names the affected keywords and domains"""
+    store, hit, shift_day = simulated_portfolio()
+
+    scan = AlgorithmUpdateDetector().scan_portfolio(store)
+
+    assert len(scan.updates) == 1
+    update = scan.updates[0]
+    assert np.datetime64(update.date, "D") == shift_day
+    assert set(update.affected_keywords) == hit
+    assert len(update.affected_domains) == 20
+    assert update.impact_score < 0
+    assert len(scan.volatility_index) == len(scan.dates) == 180
+    assert scan.volatility_index[120] > 2 * scan.volatility_index[60]
+
+
+def test_portfolio_scan_ignores_isolated_movers():
+    """Test a few keywords moving on their own don't count as an update"""
+    store, hit, _ = simulated_portfolio(hit_share=0.03)
+
+    scan = AlgorithmUpdateDetector().scan_portfolio(store)
+
+    assert scan.updates == []
+    assert max(scan.affected_share) < 0.1
+
+
+def test_portfolio_scan_runs_on_a_snapshot():
+    """Test the thread-safe scan only reads the arrays it is given, not the live store"""
+    store, hit, _ = simulated_portfolio(keywords=200)
+    names, calendar, positions = store.aligned()
+    urls = [store.url(name) for name in names]
+    expected = AlgorithmUpdateDetector().scan_portfolio(store)
+
+    # Merging over existing days rewrites the store's columns in place
+    store.append("kw0", calendar, np.full(len(calendar), 99.0))
+    scan = AlgorithmUpdateDetector().scan_positions(names, calendar, positions, urls)
+
+    assert scan == expected
+    assert set(scan.updates[0].affected_keywords) == hit
+
+
+def test_algorithm_volatility_endpoint(monkeypatch):
+    """Test the portfolio scan endpoint, narrowed to one site"""
+    store, hit, shift_day = simulated_portfolio(keywords=200)
+    monkeypatch.setattr(main, "ranking_history", store)
+    client = TestClient(main.app)
+
+    site = client.get("/api/algorithm-volatility", params={"url": "https://site3.example/", "days": 120})
+    missing = client.get("/api/algorithm-volatility", params={"url": "https://nowhere.example/"})
+
+    assert site.json()["keywords_scanned"] == 10
+    assert len(site.json()["volatility_index"]) == 120
+    assert [u["date"] for u in site.json()["updates"]] == [str(shift_day)]
+    assert list(site.json()["updates"][0]["affected_domains"]) == ["site3.example"]
+    assert missing.status_code == 404
+
+@pytest.fixture
+def improving_points():
+    return [
+        RankingDataPoint(date=day, keyword="ghost tours", position=30 - i // 2, url="https://spooky.example/")
+        for i, day in enumerate(days(30))
+    ]
+
+
+@pytest.fixture
+def volatile_points():
+    return [
+        RankingDataPoint(date=day, keyword="ghost walks", position=8 if i < 7 else 18, url="https://spooky.example/")
+        for i, day in enumerate(days(14))
+    ]
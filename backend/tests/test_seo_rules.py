@@ -0,0 +1,111 @@
+"""
+SEO Rule Engine Tests
+Rule selection, per-rule timing and failure isolation
+"""
+
+import pytest
+
+from html_features import PageFeatures, extract_page_features
+from seo_rules import RuleContext, RuleEngine, SEORule, default_engine
+
+
+THIN_PAGE = "<html><head><title>Boo</title></head><body><p>Too short.</p></body></html>"
+
+
+class ExplodingRule(SEORule):
+    name = "exploding"
+    requires = ("title",)
+
+    def evaluate(self, features, context):
+        raise RuntimeError("the ghost escaped")
+
+
+class PointsRule(SEORule):
+    name = "points"
+    requires = ("word_count",)
+
+    def evaluate(self, features, context):
+        return [{"title": "Scored", "issue_points": 7}]
+
+
+def test_full_profile_runs_every_rule():
+    """Test the full profile runs all default rules and times each one"""
+    features = extract_page_features(THIN_PAGE)
+
+    result = default_engine.run(features, RuleContext(url="https://example.com"))
+
+    assert set(result.timings_ms) == set(default_engine.rules)
+    titles = {entity["title"] for entity in result.entities}
+    assert {"Short Title Tag", "Missing H1 Zombie", "Thin Content Phantom"} <= titles
+
+
+def test_fast_profile_skips_expensive_rules():
+    """Test the fast profile only runs rules tagged for bulk monitoring"""
+    features = extract_page_features(THIN_PAGE)
+
+    result = default_engine.run(features, RuleContext(url="https://example.com"), profile="fast")
+
+    assert "thin_content" not in result.timings_ms
+    assert "title" in result.timings_ms
+    assert all(entity["title"] != "Thin Content Phantom" for entity in result.entities)
+
+
+def test_enabled_and_disabled_rules():
+    """Test per-request rule selection"""
+    selected = default_engine.select(enabled=["title", "h1", "schema"], disabled=["schema"])
+
+    assert [rule.name for rule in selected] == ["title", "h1"]
+
+
+def test_unknown_rule_or_profile_rejected():
+    """Test invalid selections raise ValueError"""
+    with pytest.raises(ValueError):
+        default_engine.select(enabled=["poltergeist"])
+    with pytest.raises(ValueError):
+        default_engine.select(profile="haunted")
+
+
+def test_failing_rule_is_isolated():
+    """Test one failing rule doesn't stop the others"""
+    engine = RuleEngine([ExplodingRule(), PointsRule()])
+
+    result = engine.run(PageFeatures(), RuleContext(url="https://example.com"))
+
+    assert "exploding" in result.errors
+    assert set(result.timings_ms) == {"exploding", "points"}
+    assert result.entities == [{"title": "Scored"}]
+    assert result.issue_points == 7
+
+
+def test_register_validates_rules():
+    """Test duplicate names and unknown feature requirements are rejected"""
+    class UnknownFeatureRule(SEORule):
+        name = "unknown_feature"
+        requires = ("ectoplasm",)
+
+    engine = RuleEngine([PointsRule()])
+
+    with pytest.raises(ValueError):
+        engine.register(PointsRule())
+    with pytest.raises(ValueError):
+        engine.register(UnknownFeatureRule())
+
+
+def test_required_features_union():
+    """Test the engine reports which features a rule selection needs"""
+    rules = default_engine.select(enabled=["title", "schema"])
+
+    assert default_engine.required_features(rules) == ["json_ld", "title"]
+
+
+def test_needs_css_only_for_layout_rules():
+    """Test stylesheets are only requested when a layout-dependent rule is selected"""
+    class AboveTheFoldRule(SEORule):
+        name = "above_the_fold"
+        needs_css = True
+
+    engine = RuleEngine([PointsRule(), AboveTheFoldRule()])
+
+    assert not default_engine.needs_css(default_engine.select("full"))
+    assert not engine.needs_css(engine.select(enabled=["points"]))
+    assert engine.needs_css(engine.select("full"))
@@ -0,0 +1,103 @@
+"""
+SPA Detector Tests
+Scoring static HTML for client-side rendering and remembering render outcomes
+"""
+
+import asyncio
+
+from html_features import extract_page_features
+from http_client import read_html
+from performance_optimizer import CacheManager
+from spa_detector import detect_spa, rendering_changed
+
+
+ARTICLE = "<h1>Ghost Tours</h1><p>" + "Guided night walks through the old quarter. " * 40 + "</p>"
+
+REACT_SHELL = (
+    '<html><head><title>App</title><script src="/static/main.js" defer></script></head>'
+    '<body><noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div></body></html>'
+)
+NEXT_SHELL = (
+    '<html><body><div id="__next"></div>'
+    '<script id="__NEXT_DATA__" type="application/json">{"props":{"pageProps":{}},"page":"/"}</script></body></html>'
+)
+NEXT_SSR = (
+    f'<html><body><div id="__next">{ARTICLE}</div>'
+    '<script id="__NEXT_DATA__" type="application/json">' + '{"k":"v"}' * 500 + '</script></body></html>'
+)
+SMALL_STATIC = (
+    '<html><head><title>Contact</title><script src="/menu.js" defer></script></head>'
+    '<body><h1>Contact us</h1><p>Call 555-0100.</p></body></html>'
+)
+
+
+def verdict(html, **kwargs):
+    return detect_spa(html, extract_page_features(html), **kwargs)
+
+
+def test_app_shells_detected():
+    """Test empty mount nodes, noscript warnings and framework data mark SPAs"""
+    react = verdict(REACT_SHELL)
+    nextjs = verdict(NEXT_SHELL)
+
+    assert react.is_spa
+    assert {"empty_mount_node", "noscript_warning", "little_text"} <= set(react.signals)
+    assert nextjs.is_spa
+    assert nextjs.framework == "next"
+
+
+def test_server_rendered_pages_not_flagged():
+    """Test SSR pages skip rendering even with framework fingerprints or defer scripts"""
+    ssr = verdict(NEXT_SSR)
+
+    assert ssr.framework == "next"
+    assert "server_rendered_text" in ssr.signals
+    assert not ssr.is_spa
+    # The old heuristic rendered any short page containing "defer"
+    assert not verdict(SMALL_STATIC).is_spa
+    assert not verdict(f"<html><body>{ARTICLE}</body></html>").is_spa
+
+
+def test_threshold_is_tunable():
+    """Test the same score crosses a lower threshold"""
+    small = verdict(SMALL_STATIC)
+
+    assert 0 < small.score < 0.5
+    assert verdict(SMALL_STATIC, threshold=small.score).is_spa
+
+
+def test_streamed_markers_match_full_scan():
+    """Test markers from the streamed fetch give the same verdict as scanning the HTML"""
+    async def body(html):
+        yield html.encode()
+
+    for html in (REACT_SHELL, NEXT_SHELL, NEXT_SSR, SMALL_STATIC):
+        page = asyncio.run(read_html(body(html)))
+        assert verdict(html, markers=page.markers) == verdict(html)
+
+
+def test_rendering_changed():
+    """Test only SEO-relevant differences count as a change"""
+    shell = extract_page_features(REACT_SHELL)
+    rendered = extract_page_features(f"<html><head><title>App</title></head><body>{ARTICLE}</body></html>")
+    same = extract_page_features(REACT_SHELL.replace("main.js", "main.abc123.js"))
+
+    assert rendering_changed(shell, rendered)
+    assert not rendering_changed(shell, same)
+
+
+def test_render_decision_remembered_per_site():
+    """Test the render outcome is shared across a site's pages and hosts with www."""
+    cache = CacheManager(disk_path="")
+
+    async def scenario():
+        await cache.set_render_decision("https://www.ghosts.example/tours?utm_source=x", changed=False, score=0.7)
+        return (
+            await cache.get_render_decision("https://ghosts.example/contact"),
+            await cache.get_render_decision("https://other.example/")
+        )
+
+    same_site, other_site = asyncio.run(scenario())
+
+    assert same_site == {"changed": False, "score": 0.7}
+    assert other_site is None
@@ -0,0 +1,78 @@
+"""
+URL helpers for RankBeacon SEO Exorcist
+Normalization used for crawl dedup and cache keys
+"""
+
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only carry campaign/click tracking
+TRACKING_PARAMS = frozenset((
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'utm_id',
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl',
+    'yclid', 'igshid', 'ref_src'
+))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+SKIPPED_SCHEMES = ('javascript:', 'mailto:', 'tel:', 'data:', '#')
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Normalize a URL so equivalent forms compare equal
+
+    Lowercases scheme and host (keeping IPv6 brackets and any user:pass@),
+    drops default ports, fragments, tracking parameters and trailing
+    slashes (except the root path), and sorts the remaining query
+    parameters.
+
+    Args:
+        url: Absolute URL, or relative URL when `base` is given
+        base: Base URL to resolve relative links against
+
+    Returns:
+        Normalized URL, or None for non-HTTP links (mailto:, javascript:, ...)
+        and malformed ones (bad port, broken IPv6 literal)
+    """
+    url = url.strip()
+    if not url or url.startswith(SKIPPED_SCHEMES):
+        return None
+    try:
+        if base:
+            url = urljoin(base, url)
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None
+
+    host = (parts.hostname or '').lower()
+    if not host:
+        return None
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{host}:{port}"
+    if '@' in parts.netloc:
+        netloc = f"{parts.netloc.rpartition('@')[0]}@{netloc}"
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def site_host(url: str) -> str:
+    """Host without a leading www., used to decide whether a link is internal"""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host